@@ -5,13 +5,46 @@ import os
 SOURCE = "https://t.me/username/123456"
 TARGET = "https://t.me/c/987654/3210"
 
+# TARGETS (optional)
+# List of message links; if set, replaces TARGET.
+# Every post is read and its media downloaded / uploaded ONCE,
+# then delivered to each target (the rest re-send the same file by reference).
+# Example: TARGETS = ["https://t.me/c/987654/3210", "https://t.me/other_channel/1"]
+TARGETS = None
+
+# JOBS (optional)
+# Many SOURCE → TARGET pairs in ONE process, on one Telegram connection.
+# If set, SOURCE / TARGET / TARGETS above are ignored.
+# Each job: "source" + "target" (or "targets" list); optional "mode",
+# "strategy", "last_n", "date_from", "date_to" override the settings below.
+# Example:
+# JOBS = [
+#     {"source": "https://t.me/a/1", "target": "https://t.me/c/987654/3210"},
+#     {"source": "https://t.me/b/1", "targets": ["https://t.me/c/111/1", "https://t.me/c/222/1"],
+#      "mode": "last_n", "last_n": 50},
+# ]
+JOBS = None
+
+# How many JOBS run at the same time (all share the same request rate limits)
+JOB_CONCURRENCY = 8
+
 # FORWARD MODE
 # all       — forward all messages
 # last_n   — forward last N messages
 # date_range — forward messages by date
 # post_id  — forward one message (recommended)
+# live     — mirror new posts as they are published (runs until stopped);
+#            with RESUME, posts missed while it was not running are caught up first
 FORWARD_MODE = "all"
 
+# FORWARD STRATEGY
+# copy    — every post is re-created by the script (header, replies, quotes)
+# forward — posts from sources WITHOUT forwarding restrictions are sent
+#           by server-side forward in batches of up to 100 messages
+#           (without "Forwarded from" and without the timestamp header).
+#           Replies, quotes, forwarded and paid posts still go the copy way.
+FORWARD_STRATEGY = "copy"
+
 # LAST N SETTINGS
 LAST_N_MESSAGES = 100
 
@@ -21,14 +54,108 @@ LAST_N_MESSAGES = 100
 DATE_FROM = None
 DATE_TO = None
 
+# RESUME
+# If True  → progress of each SOURCE/TARGET job is saved (runtime/),
+#            the next run continues after the last forwarded post
+# If False → every run starts from the beginning
+RESUME = True
+
+# SYNC EDITS
+# If True  → edits and deletions in SOURCE are applied to already forwarded posts:
+#            live       — as they happen (one edit / delete per change)
+#            all / last_n / date_range — the whole range is re-read on every run,
+#            posts edited since they were forwarded get one edit (no re-forward)
+# If False → forwarded posts are never changed
+SYNC_EDITS = False
+
+# DEDUP
+# If True  → a post whose content (text + the same media files, album layout)
+#            is already in TARGET is not sent again, even from another source;
+#            duplicates are dropped before their media are downloaded
+# If False → every post is forwarded
+DEDUP = False
+
+# MEDIA BY REFERENCE (PERFORMANCE)
+# If True  → media from sources WITHOUT forwarding restrictions is re-sent
+#            by reference to the file on Telegram servers (no download/upload)
+#            Protected sources (noforwards) always use download + upload
+# If False → always download + upload
+MEDIA_BY_REFERENCE = True
+
+# LOOKAHEAD (PERFORMANCE)
+# Media of the next PREFETCH_POSTS posts is downloaded in background
+# while the current post is being uploaded. 0 → disabled.
+# PREFETCH_MAX_MB limits the total size of media downloaded ahead.
+PREFETCH_POSTS = 4
+PREFETCH_MAX_MB = 512
+
+# HISTORY READ-AHEAD (PERFORMANCE)
+# History pages are read in the background while posts are being sent.
+# At most HISTORY_READAHEAD messages / HISTORY_READAHEAD_MB of them wait in memory.
+# 0 → pages are read only when the next post is needed
+HISTORY_READAHEAD = 2000
+HISTORY_READAHEAD_MB = 32
+
+# TAKEOUT (PERFORMANCE)
+# If True  → history and files are read through a Telegram data export
+#            (takeout) session: much fewer flood waits on large histories.
+#            Telegram asks to confirm the export in another client;
+#            until it is confirmed, forwarding runs without takeout
+# If False → history is read with regular requests
+TAKEOUT = False
+
+# STREAM TRANSFERS (PERFORMANCE)
+# If True  → video / voice / documents are piped from source to target
+#            part by part, without writing the file to disk
+#            (photos still go through disk: they are re-encoded)
+# If False → every file is downloaded to DOWNLOAD_DIR first
+STREAM_TRANSFERS = True
+
+# PARALLEL TRANSFERS (PERFORMANCE)
+# Files bigger than 10 MB are downloaded / uploaded in parts,
+# TRANSFER_WORKERS parts at the same time. 1 → one part after another
+TRANSFER_WORKERS = 4
+
+# ALBUMS (PERFORMANCE)
+# How many album items are downloaded / uploaded at the same time.
+# The album itself is then sent with one request, caption included.
+ALBUM_CONCURRENCY = 4
+
+# RATE LIMITS (FLOOD WAIT)
+# Max requests per second for each kind of request (upper bound).
+# "send" / "edit" are also limited per target chat.
+# On FloodWait the script waits, retries the same request and lowers
+# the rate; learned rates are kept in runtime/ between runs.
+RATE_LIMITS = {
+    "send": 5.0,      # messages, media, albums, forwards
+    "edit": 5.0,      # edits, deletions
+    "history": 10.0,  # reading source history
+    "file": 50.0,     # download / upload parts (512 KB each)
+}
+
+# FloodWait longer than this (seconds) stops the run instead of waiting
+# (progress is saved, the next run continues from the same place)
+FLOOD_MAX_WAIT = 3600
+
 # FILE HANDLING
 # If True  → delete downloaded files after successful send
 # If False → keep files in DOWNLOAD_DIR
 DELETE_FILES_AFTER_SEND = True
 
+# MEDIA CACHE (PERFORMANCE)
+# Downloaded media are also kept in DOWNLOAD_DIR/cache, up to MEDIA_CACHE_MB.
+# Retries, reposts of the same file and re-runs take media from there
+# instead of downloading them again; least recently used files go first.
+# 0 → no cache
+MEDIA_CACHE_MB = 0
+
 # PATHS
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(BASE_DIR, ".."))
 
 DOWNLOAD_DIR = os.path.join(PROJECT_ROOT, "downloads")
-os.makedirs(DOWNLOAD_DIR, exist_ok=True)
\ No newline at end of file
+os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+
+# runtime state (id map, service databases)
+RUNTIME_DIR = os.path.join(PROJECT_ROOT, "runtime")
+os.makedirs(RUNTIME_DIR, exist_ok=True)
\ No newline at end of file
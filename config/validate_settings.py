@@ -9,6 +9,12 @@ _ALLOWED_FORWARD_MODES = {
     "all",
     "last_n",
     "date_range",
+    "live",
+}
+
+_ALLOWED_FORWARD_STRATEGIES = {
+    "copy",
+    "forward",
 }
 
 
@@ -23,6 +29,100 @@ def _parse_dt(value: str, name: str) -> datetime:
         )
 
 
+_JOB_KEYS = {
+    "source",
+    "target",
+    "targets",
+    "mode",
+    "strategy",
+    "last_n",
+    "date_from",
+    "date_to",
+}
+
+
+def _validate_job(job, job_no: int) -> None:
+    """Одна запись JOBS (режим — своё поле или глобальный из settings)."""
+    name = f"JOBS[{job_no}]"
+
+    if not isinstance(job, dict):
+        raise RuntimeError(f"Invalid {name}: expected a dict.\nGot: {job}")
+
+    unknown = set(job) - _JOB_KEYS
+    if unknown:
+        raise RuntimeError(
+            f"Invalid {name}: unknown keys {', '.join(sorted(unknown))}.\n"
+            f"Allowed keys: {', '.join(sorted(_JOB_KEYS))}"
+        )
+
+    source = parse_tme_link(job.get("source") or "")
+    if not source:
+        raise RuntimeError(
+            f"Invalid {name}['source'].\n"
+            "Expected a Telegram link, same as SOURCE.\n"
+            f"Got: {job.get('source')}"
+        )
+
+    targets = job.get("targets") or ([job["target"]] if job.get("target") else [])
+    if not isinstance(targets, (list, tuple)) or not targets:
+        raise RuntimeError(
+            f"Invalid {name}: 'target' (link) or 'targets' (list of links) is required"
+        )
+
+    for value in targets:
+        if not isinstance(value, str) or not parse_tme_link(value):
+            raise RuntimeError(
+                f"Invalid {name} target.\n"
+                "Expected a Telegram link, same as TARGET.\n"
+                f"Got: {value}"
+            )
+
+    if len(set(targets)) != len(targets):
+        raise RuntimeError(f"Invalid {name}: the same target is listed more than once.")
+
+    mode = job.get("mode") or settings.FORWARD_MODE
+    if mode not in _ALLOWED_FORWARD_MODES:
+        raise RuntimeError(
+            f"Invalid {name}['mode'].\n"
+            f"Allowed values: {', '.join(sorted(_ALLOWED_FORWARD_MODES))}\n"
+            f"Got: {mode}"
+        )
+
+    strategy = job.get("strategy") or settings.FORWARD_STRATEGY
+    if strategy not in _ALLOWED_FORWARD_STRATEGIES:
+        raise RuntimeError(
+            f"Invalid {name}['strategy'].\n"
+            f"Allowed values: {', '.join(sorted(_ALLOWED_FORWARD_STRATEGIES))}\n"
+            f"Got: {strategy}"
+        )
+
+    if mode == "post_id" and not source.message_id:
+        raise RuntimeError(
+            f"{name}: mode 'post_id' requires 'source' "
+            "to be a link to a specific message."
+        )
+
+    if mode == "last_n":
+        last_n = job.get("last_n", settings.LAST_N_MESSAGES)
+        if not isinstance(last_n, int) or last_n <= 0:
+            raise RuntimeError(f"{name}: 'last_n' must be an integer > 0")
+
+    if mode == "date_range":
+        date_from = job.get("date_from", settings.DATE_FROM)
+        date_to = job.get("date_to", settings.DATE_TO)
+
+        if not date_from and not date_to:
+            raise RuntimeError(
+                f"{name}: mode 'date_range' requires 'date_from' and/or 'date_to'"
+            )
+
+        dt_from = _parse_dt(date_from, f"{name}['date_from']") if date_from else None
+        dt_to = _parse_dt(date_to, f"{name}['date_to']") if date_to else None
+
+        if dt_from and dt_to and dt_from > dt_to:
+            raise RuntimeError(f"{name}: invalid date range, date_from > date_to")
+
+
 def validate_settings():
     """
     Validate user-provided configuration.
@@ -54,6 +154,31 @@ def validate_settings():
 
         parsed_links[name] = parsed
 
+    # -------------------------------------------------
+    # TARGETS
+    # -------------------------------------------------
+    if settings.TARGETS is not None:
+        if not isinstance(settings.TARGETS, (list, tuple)) or not settings.TARGETS:
+            raise RuntimeError(
+                "Invalid TARGETS.\n"
+                "Expected a non-empty list of Telegram links (or None).\n"
+                f"Got: {settings.TARGETS}"
+            )
+
+        for value in settings.TARGETS:
+            if not isinstance(value, str) or not parse_tme_link(value):
+                raise RuntimeError(
+                    "Invalid TARGETS entry.\n"
+                    "Every entry must be a Telegram link, same as TARGET.\n"
+                    f"Got: {value}"
+                )
+
+        if len(set(settings.TARGETS)) != len(settings.TARGETS):
+            raise RuntimeError(
+                "Invalid TARGETS.\n"
+                "The same target is listed more than once."
+            )
+
     # -------------------------------------------------
     # FORWARD MODE
     # -------------------------------------------------
@@ -64,6 +189,16 @@ def validate_settings():
             f"Got: {settings.FORWARD_MODE}"
         )
 
+    # -------------------------------------------------
+    # FORWARD STRATEGY
+    # -------------------------------------------------
+    if settings.FORWARD_STRATEGY not in _ALLOWED_FORWARD_STRATEGIES:
+        raise RuntimeError(
+            "Invalid FORWARD_STRATEGY.\n"
+            f"Allowed values: {', '.join(sorted(_ALLOWED_FORWARD_STRATEGIES))}\n"
+            f"Got: {settings.FORWARD_STRATEGY}"
+        )
+
     # -------------------------------------------------
     # POST_ID MODE — SOURCE MUST CONTAIN MESSAGE_ID
     # -------------------------------------------------
@@ -117,6 +252,127 @@ def validate_settings():
                 "Invalid date range: DATE_FROM > DATE_TO"
             )
 
+    # -------------------------------------------------
+    # JOBS
+    # -------------------------------------------------
+    if settings.JOBS is not None:
+        if not isinstance(settings.JOBS, (list, tuple)) or not settings.JOBS:
+            raise RuntimeError(
+                "Invalid JOBS.\n"
+                "Expected a non-empty list of dicts (or None).\n"
+                f"Got: {settings.JOBS}"
+            )
+
+        for job_no, job in enumerate(settings.JOBS):
+            _validate_job(job, job_no)
+
+    if not isinstance(settings.JOB_CONCURRENCY, int) or settings.JOB_CONCURRENCY < 1:
+        raise RuntimeError(
+            "JOB_CONCURRENCY must be an integer >= 1"
+        )
+
+    # -------------------------------------------------
+    # RESUME
+    # -------------------------------------------------
+    if not isinstance(settings.RESUME, bool):
+        raise RuntimeError(
+            "RESUME must be True or False"
+        )
+
+    # -------------------------------------------------
+    # SYNC_EDITS
+    # -------------------------------------------------
+    if not isinstance(settings.SYNC_EDITS, bool):
+        raise RuntimeError(
+            "SYNC_EDITS must be True or False"
+        )
+
+    # -------------------------------------------------
+    # DEDUP
+    # -------------------------------------------------
+    if not isinstance(settings.DEDUP, bool):
+        raise RuntimeError(
+            "DEDUP must be True or False"
+        )
+
+    # -------------------------------------------------
+    # MEDIA_BY_REFERENCE
+    # -------------------------------------------------
+    if not isinstance(settings.MEDIA_BY_REFERENCE, bool):
+        raise RuntimeError(
+            "MEDIA_BY_REFERENCE must be True or False"
+        )
+
+    # -------------------------------------------------
+    # LOOKAHEAD
+    # -------------------------------------------------
+    for name in ("PREFETCH_POSTS", "PREFETCH_MAX_MB"):
+        value = getattr(settings, name)
+        if not isinstance(value, int) or value < 0:
+            raise RuntimeError(
+                f"{name} must be an integer >= 0"
+            )
+
+    # -------------------------------------------------
+    # HISTORY READ-AHEAD
+    # -------------------------------------------------
+    for name in ("HISTORY_READAHEAD", "HISTORY_READAHEAD_MB"):
+        value = getattr(settings, name)
+        if not isinstance(value, int) or value < 0:
+            raise RuntimeError(
+                f"{name} must be an integer >= 0"
+            )
+
+    # -------------------------------------------------
+    # TAKEOUT
+    # -------------------------------------------------
+    if not isinstance(settings.TAKEOUT, bool):
+        raise RuntimeError(
+            "TAKEOUT must be True or False"
+        )
+
+    # -------------------------------------------------
+    # STREAM_TRANSFERS
+    # -------------------------------------------------
+    if not isinstance(settings.STREAM_TRANSFERS, bool):
+        raise RuntimeError(
+            "STREAM_TRANSFERS must be True or False"
+        )
+
+    # -------------------------------------------------
+    # TRANSFER_WORKERS
+    # -------------------------------------------------
+    if not isinstance(settings.TRANSFER_WORKERS, int) or settings.TRANSFER_WORKERS < 1:
+        raise RuntimeError(
+            "TRANSFER_WORKERS must be an integer >= 1"
+        )
+
+    # -------------------------------------------------
+    # ALBUM_CONCURRENCY
+    # -------------------------------------------------
+    if not isinstance(settings.ALBUM_CONCURRENCY, int) or settings.ALBUM_CONCURRENCY < 1:
+        raise RuntimeError(
+            "ALBUM_CONCURRENCY must be an integer >= 1"
+        )
+
+    # -------------------------------------------------
+    # RATE LIMITS
+    # -------------------------------------------------
+    if not isinstance(settings.RATE_LIMITS, dict):
+        raise RuntimeError("RATE_LIMITS must be a dict")
+
+    for name in ("send", "edit", "history", "file"):
+        value = settings.RATE_LIMITS.get(name)
+        if not isinstance(value, (int, float)) or value <= 0:
+            raise RuntimeError(
+                f"RATE_LIMITS['{name}'] must be a number > 0"
+            )
+
+    if not isinstance(settings.FLOOD_MAX_WAIT, int) or settings.FLOOD_MAX_WAIT < 0:
+        raise RuntimeError(
+            "FLOOD_MAX_WAIT must be an integer >= 0"
+        )
+
     # -------------------------------------------------
     # DELETE_FILES_AFTER_SEND
     # -------------------------------------------------
@@ -124,3 +380,11 @@ def validate_settings():
         raise RuntimeError(
             "DELETE_FILES_AFTER_SEND must be True or False"
         )
+
+    # -------------------------------------------------
+    # MEDIA_CACHE_MB
+    # -------------------------------------------------
+    if not isinstance(settings.MEDIA_CACHE_MB, int) or settings.MEDIA_CACHE_MB < 0:
+        raise RuntimeError(
+            "MEDIA_CACHE_MB must be an integer >= 0"
+        )
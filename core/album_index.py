@@ -0,0 +1,93 @@
+from typing import List, Tuple
+
+from core.storage import get_db
+
+# -------------------------------------------------
+# TUNING
+# -------------------------------------------------
+FLUSH_EVERY = 500   # записей в буфере до сброса на диск
+
+
+class AlbumIndex:
+    """
+    grouped_id → message ids для source-чатов.
+
+    Заполняется как побочный эффект любого скана истории (каждое
+    сообщение альбома, которое прошло через iter_posts) и лежит в
+    runtime/forwarder.sqlite3. По нему post_id знает, где лежит альбом,
+    и забирает его одним get_messages.
+
+    Скан с границей (date_range, min_id, max_id) может застать альбом
+    не целиком — известные id не обязательно весь альбом.
+    """
+
+    def __init__(self):
+        self._pending: List[Tuple[int, int, int]] = []
+        self._ready = False
+
+    def _db(self):
+        db = get_db()
+        if not self._ready:
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS album_index (
+                    peer_id    INTEGER NOT NULL,
+                    msg_id     INTEGER NOT NULL,
+                    grouped_id INTEGER NOT NULL,
+                    PRIMARY KEY (peer_id, msg_id)
+                ) WITHOUT ROWID
+                """
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS album_index_gid "
+                "ON album_index (peer_id, grouped_id)"
+            )
+            self._ready = True
+        return db
+
+    # ---------------------------------------------
+    # FILL
+    # ---------------------------------------------
+    def observe(self, peer_id: int, msg) -> None:
+        """Сообщение встретилось при скане (альбомные — запоминаются)."""
+        gid = getattr(msg, "grouped_id", None)
+        if gid is None:
+            return
+
+        self._pending.append((peer_id, msg.id, gid))
+        if len(self._pending) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+
+        rows, self._pending = self._pending, []
+        db = self._db()
+        with db:
+            db.executemany(
+                "INSERT OR REPLACE INTO album_index (peer_id, msg_id, grouped_id) "
+                "VALUES (?, ?, ?)",
+                rows,
+            )
+
+    # ---------------------------------------------
+    # LOOKUP
+    # ---------------------------------------------
+    def album_ids(self, peer_id: int, msg_id: int) -> List[int]:
+        """Все известные id альбома, в который входит msg_id ([] — не знаем)."""
+        self.flush()
+
+        rows = self._db().execute(
+            "SELECT msg_id FROM album_index "
+            "WHERE peer_id = ? AND grouped_id = ("
+            "    SELECT grouped_id FROM album_index "
+            "    WHERE peer_id = ? AND msg_id = ?"
+            ") ORDER BY msg_id",
+            (peer_id, peer_id, msg_id),
+        ).fetchall()
+
+        return [r[0] for r in rows]
+
+
+album_index = AlbumIndex()
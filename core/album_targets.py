@@ -0,0 +1,108 @@
+from typing import Dict, List, Tuple
+
+from core.ids_map import IdMapScope
+from core.storage import get_db
+
+# -------------------------------------------------
+# TUNING
+# -------------------------------------------------
+FLUSH_EVERY = 50   # альбомов в буфере до сброса на диск
+
+_Key = Tuple[IdMapScope, int]
+
+
+class AlbumTargets:
+    """
+    Из каких сообщений target состоит отправленный альбом:
+    (source → target/topic, первое сообщение альбома в target) → все его id.
+
+    id map ведёт каждый элемент альбома на первое сообщение (туда идут
+    replies), а SYNC_DELETES удаляет альбом целиком — ему нужны все.
+    """
+
+    def __init__(self):
+        self._pending: Dict[_Key, List[int]] = {}
+        self._ready = False
+
+    def _db(self):
+        db = get_db()
+        if not self._ready:
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS album_targets (
+                    source_chat INTEGER NOT NULL,
+                    target_chat INTEGER NOT NULL,
+                    topic_id    INTEGER NOT NULL,
+                    first_id    INTEGER NOT NULL,
+                    target_id   INTEGER NOT NULL,
+                    PRIMARY KEY (source_chat, target_chat, topic_id, first_id, target_id)
+                ) WITHOUT ROWID
+                """
+            )
+            self._ready = True
+        return db
+
+    # ---------------------------------------------
+    # READ
+    # ---------------------------------------------
+    def get(self, scope: IdMapScope, first_id: int) -> List[int]:
+        """Все id альбома в target ([first_id], если это не альбом)."""
+        key = (scope, first_id)
+        if key in self._pending:
+            return list(self._pending[key])
+
+        rows = self._db().execute(
+            "SELECT target_id FROM album_targets "
+            "WHERE source_chat = ? AND target_chat = ? AND topic_id = ? "
+            "AND first_id = ?",
+            (scope.source_chat, scope.target_chat, scope.topic_id, first_id),
+        ).fetchall()
+        return sorted(r[0] for r in rows) or [first_id]
+
+    # ---------------------------------------------
+    # WRITE
+    # ---------------------------------------------
+    def put(self, scope: IdMapScope, first_id: int, target_ids: List[int]) -> None:
+        target_ids = sorted(mid for mid in target_ids if mid)
+        if len(target_ids) < 2:
+            return
+
+        self._pending[(scope, first_id)] = target_ids
+        if len(self._pending) >= FLUSH_EVERY:
+            self.flush()
+
+    def forget(self, scope: IdMapScope, first_id: int) -> None:
+        """Альбом удалён из target."""
+        self._pending.pop((scope, first_id), None)
+
+        db = self._db()
+        with db:
+            db.execute(
+                "DELETE FROM album_targets "
+                "WHERE source_chat = ? AND target_chat = ? AND topic_id = ? "
+                "AND first_id = ?",
+                (scope.source_chat, scope.target_chat, scope.topic_id, first_id),
+            )
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+
+        rows = [
+            (s.source_chat, s.target_chat, s.topic_id, first_id, mid)
+            for (s, first_id), ids in self._pending.items()
+            for mid in ids
+        ]
+        self._pending.clear()
+
+        db = self._db()
+        with db:
+            db.executemany(
+                "INSERT OR REPLACE INTO album_targets "
+                "(source_chat, target_chat, topic_id, first_id, target_id) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+
+album_targets = AlbumTargets()
@@ -0,0 +1,168 @@
+import json
+import time
+from typing import Optional, Set
+
+from core.ids_map import store as id_map_store
+from core.storage import get_db
+
+# -------------------------------------------------
+# TUNING
+# -------------------------------------------------
+SAVE_EVERY = 20        # сохраняем checkpoint каждые N закоммиченных постов
+SAVE_INTERVAL = 2.0    # ...или раз в столько секунд
+
+
+def make_job_key(
+    source_chat: int,
+    source_topic_id: Optional[int],
+    target_chat: int,
+    target_topic_id: Optional[int],
+    mode: str,
+    mode_params: str = "",
+) -> str:
+    """
+    Ключ задачи SOURCE → TARGET.
+
+    В ключ входят режим и его параметры: date_range с другими датами
+    или last_n с другим N — это уже другая задача, старый checkpoint к ней
+    не относится.
+    """
+    return (
+        f"{source_chat}:{source_topic_id or 0}"
+        f">{target_chat}:{target_topic_id or 0}"
+        f"|{mode}|{mode_params}"
+    )
+
+
+class Checkpoint:
+    """
+    Точка продолжения для одной задачи SOURCE → TARGET.
+
+    Хранит:
+      - last_id — source message_id, до которого (включительно) все посты
+        полностью отправлены (все части, extra text, id map)
+      - sent_id — самый дальний отправленный пост: после ошибки last_id
+        стоит перед упавшим постом, а следующие уходят дальше — такие
+        (они уже в id map) следующий запуск пропускает, упавший — шлёт заново
+      - album — наполовину отправленный альбом:
+        {"grouped_id": ..., "parts": ["media", ...]}
+
+    Сохраняется в runtime/forwarder.sqlite3 батчами (SAVE_EVERY /
+    SAVE_INTERVAL) и всегда при остановке. Перед записью checkpoint
+    сбрасывается id map — checkpoint никогда не опережает id map.
+    """
+
+    def __init__(self, job_key: str):
+        self.job_key = job_key
+        self.last_id: int = 0
+        self.sent_id: int = 0
+        self.album: Optional[dict] = None
+
+        self._failed = False
+
+        self._dirty = 0
+        self._last_save = time.monotonic()
+
+        db = self._db()
+        row = db.execute(
+            "SELECT last_id, sent_id, album FROM checkpoints WHERE job_key = ?",
+            (job_key,),
+        ).fetchone()
+
+        if row:
+            self.last_id = row[0] or 0
+            self.sent_id = max(row[1] or 0, self.last_id)
+            self.album = json.loads(row[2]) if row[2] else None
+
+    # ---------------------------------------------
+    # INTERNAL
+    # ---------------------------------------------
+    @staticmethod
+    def _db():
+        db = get_db()
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                job_key TEXT PRIMARY KEY,
+                last_id INTEGER NOT NULL,
+                sent_id INTEGER NOT NULL,
+                album   TEXT,
+                updated REAL NOT NULL
+            )
+            """
+        )
+        return db
+
+    # ---------------------------------------------
+    # COMMIT
+    # ---------------------------------------------
+    def commit(self, last_id: int) -> None:
+        """Пост полностью отправлен."""
+        self.sent_id = max(self.sent_id, last_id)
+
+        # раньше в этом запуске пост упал — last_id (и недоотправленный
+        # альбом) остаются перед ним
+        if not self._failed:
+            self.last_id = max(self.last_id, last_id)
+            self.album = None
+
+        self._dirty += 1
+
+        if (
+            self._dirty >= SAVE_EVERY
+            or time.monotonic() - self._last_save >= SAVE_INTERVAL
+        ):
+            self.save()
+
+    def fail(self) -> None:
+        """
+        Пост не отправлен (ошибка): дальше него last_id в этом запуске
+        не двигается — следующий запуск попробует его снова.
+        """
+        self._failed = True
+
+    def delivered_after(self, last_id: int) -> bool:
+        """Пост после last_id мог уйти в прошлом запуске (сверять с id map)."""
+        return self.last_id < last_id <= self.sent_id
+
+    # ---------------------------------------------
+    # HALF-SENT ALBUM
+    # ---------------------------------------------
+    def album_parts(self, grouped_id: int) -> Set[str]:
+        if self.album and self.album.get("grouped_id") == grouped_id:
+            return set(self.album.get("parts", []))
+        return set()
+
+    def album_part_done(self, grouped_id: int, part: str) -> None:
+        """
+        Часть альбома (media / docs) отправлена.
+        Сохраняем сразу: это ровно то окно, в котором падение дало бы дубль.
+        """
+        parts = self.album_parts(grouped_id)
+        parts.add(part)
+        self.album = {"grouped_id": grouped_id, "parts": sorted(parts)}
+        self.save()
+
+    # ---------------------------------------------
+    # SAVE
+    # ---------------------------------------------
+    def save(self) -> None:
+        id_map_store.flush()
+
+        db = self._db()
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO checkpoints "
+                "(job_key, last_id, sent_id, album, updated) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    self.job_key,
+                    self.last_id,
+                    self.sent_id,
+                    json.dumps(self.album) if self.album else None,
+                    time.time(),
+                ),
+            )
+
+        self._dirty = 0
+        self._last_save = time.monotonic()
@@ -1,4 +1,97 @@
+import asyncio
+
 from telethon import TelegramClient
+from telethon.errors import (
+    FloodPremiumWaitError,
+    FloodWaitError,
+    SlowModeWaitError,
+    TakeoutInvalidError,
+)
+
 from config.secrets import API_ID, API_HASH, SESSION_NAME
+from config.settings import FLOOD_MAX_WAIT
+from core.logger import logger
+from core.ratelimit import limiter
+from core import takeout
+
+_FLOOD_ERRORS = (FloodWaitError, FloodPremiumWaitError, SlowModeWaitError)
+
+
+class _NoFloodMemory(dict):
+    """
+    Вместо telethon-овского _flood_waited_requests: ничего не запоминает.
+
+    Telethon помнит FloodWait по классу запроса (CONSTRUCTOR_ID), а не
+    по peer: после FloodWait на SendMessage в чат A отправка в чат B
+    падала бы FloodWaitError заранее, без запроса — и limiter.on_flood
+    зря урезал бы rate чату B. Паузы держат bucket-ы core.ratelimit.
+    """
+
+    def __setitem__(self, key, value) -> None:
+        pass
+
+
+class RateLimitedClient(TelegramClient):
+    """
+    TelegramClient, у которого каждый запрос (в т.ч. части файлов
+    через exported senders) идёт через core.ratelimit:
+
+    - перед отправкой — token bucket класса методов / target chat
+    - FloodWait ≤ FLOOD_MAX_WAIT → ждём и повторяем тот же запрос
+    - FloodWait длиннее — пробрасывается наверх (задача останавливается)
+    - TAKEOUT: чтение истории и файлов идёт через takeout-сессию
+
+    Опирается на внутренности telethon (сверено с 1.45):
+    переопределяет приватный _call(sender, request, ordered,
+    flood_sleep_threshold) и подменяет словарь _flood_waited_requests.
+    При обновлении telethon их надо сверить.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # FloodWait, который видит _call, — всегда настоящий ответ
+        # Telegram на этот запрос, а не ранний отказ telethon
+        self._flood_waited_requests = _NoFloodMemory()
+
+    async def _call(self, sender, request, ordered=False, flood_sleep_threshold=None):
+        keys = limiter.keys_for(request)
+
+        while True:
+            await limiter.acquire(keys)
+
+            try:
+                # flood_sleep_threshold=0: telethon не спит сам, FloodWait — нам
+                result = await super()._call(
+                    sender,
+                    takeout.wrap(request, self.session),
+                    ordered=ordered,
+                    flood_sleep_threshold=0,
+                )
+
+            except TakeoutInvalidError:
+                if self.session.takeout_id is None:
+                    raise
+                takeout.drop(self.session)
+                continue
+
+            except _FLOOD_ERRORS as e:
+                if e.seconds > FLOOD_MAX_WAIT:
+                    raise
+
+                logger.warning(
+                    f"⏳ FLOOD │ {request.__class__.__name__}: waiting "
+                    f"{e.seconds} s, then retrying"
+                )
+
+                if keys:
+                    # bucket на паузе → следующий acquire() и подождёт
+                    limiter.on_flood(keys, e.seconds)
+                else:
+                    await asyncio.sleep(e.seconds)
+                continue
+
+            limiter.on_success(keys)
+            return result
+
 
-client = TelegramClient(SESSION_NAME, API_ID, API_HASH)
+client = RateLimitedClient(SESSION_NAME, API_ID, API_HASH)
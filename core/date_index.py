@@ -0,0 +1,120 @@
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+from core.storage import get_db
+
+# -------------------------------------------------
+# TUNING
+# -------------------------------------------------
+SAMPLE_EVERY = 200   # при скане истории запоминаем каждое N-е сообщение
+
+
+def _ts(dt: datetime) -> int:
+    """naive datetime (как DATE_FROM / DATE_TO) считается UTC."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+class DateIndex:
+    """
+    Разреженный индекс date → message_id для source-чатов.
+
+    Сэмплы (peer, id, date) копятся как побочный эффект любого
+    скана истории и лежат в runtime/forwarder.sqlite3. По ним
+    date_range сразу получает безопасные границы по id:
+
+      - min_id — последний известный id с датой < DATE_FROM
+      - max_id — первый известный id с датой > DATE_TO
+
+    id в чате растут вместе с датой, поэтому всё нужное гарантированно
+    лежит между ними; повторный запрос того же диапазона не тратит
+    ни одного лишнего запроса истории.
+    """
+
+    def __init__(self):
+        self._pending: List[Tuple[int, int, int]] = []
+        self._counter = 0
+        self._ready = False
+
+    def _db(self):
+        db = get_db()
+        if not self._ready:
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS date_index (
+                    peer_id INTEGER NOT NULL,
+                    msg_id  INTEGER NOT NULL,
+                    date    INTEGER NOT NULL,
+                    PRIMARY KEY (peer_id, msg_id)
+                ) WITHOUT ROWID
+                """
+            )
+            self._ready = True
+        return db
+
+    # ---------------------------------------------
+    # FILL
+    # ---------------------------------------------
+    def observe(self, peer_id: int, msg, force: bool = False) -> None:
+        """Сообщение встретилось при скане (запоминается каждое N-е)."""
+        self._counter += 1
+        if force or self._counter % SAMPLE_EVERY == 0:
+            self._pending.append((peer_id, msg.id, _ts(msg.date)))
+
+    def mark_before(self, peer_id: int, msg_id: int, dt: datetime) -> None:
+        """
+        Все сообщения с id <= msg_id раньше dt
+        (msg_id + 1 — первое сообщение не раньше dt).
+        """
+        if msg_id > 0:
+            self._pending.append((peer_id, msg_id, _ts(dt) - 1))
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+
+        rows, self._pending = self._pending, []
+        db = self._db()
+        with db:
+            db.executemany(
+                "INSERT OR REPLACE INTO date_index (peer_id, msg_id, date) "
+                "VALUES (?, ?, ?)",
+                rows,
+            )
+
+    # ---------------------------------------------
+    # LOOKUP
+    # ---------------------------------------------
+    def bounds(
+        self,
+        peer_id: int,
+        dt_from: Optional[datetime],
+        dt_to: Optional[datetime],
+    ) -> Tuple[Optional[int], Optional[int]]:
+        """(min_id, max_id) — известные границы диапазона, или None."""
+        self.flush()
+        db = self._db()
+
+        min_id = max_id = None
+
+        if dt_from:
+            row = db.execute(
+                "SELECT MAX(msg_id) FROM date_index "
+                "WHERE peer_id = ? AND date < ?",
+                (peer_id, _ts(dt_from)),
+            ).fetchone()
+            min_id = row[0] if row else None
+
+        if dt_to:
+            row = db.execute(
+                "SELECT MIN(msg_id) FROM date_index "
+                "WHERE peer_id = ? AND date > ?",
+                (peer_id, _ts(dt_to)),
+            ).fetchone()
+            max_id = row[0] if row else None
+
+        return min_id, max_id
+
+
+date_index = DateIndex()
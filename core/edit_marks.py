@@ -0,0 +1,106 @@
+from typing import Dict, Tuple
+
+from core.ids_map import IdMapScope
+from core.storage import get_db
+
+# -------------------------------------------------
+# TUNING
+# -------------------------------------------------
+FLUSH_EVERY = 200   # записей в буфере до сброса на диск
+
+_Key = Tuple[IdMapScope, int]
+
+
+class EditMarks:
+    """
+    Какая версия source-сообщения сейчас лежит в target:
+    (source → target/topic, source_id) → edit_date (unix time, 0 — не правилось).
+
+    Пишется при отправке и после каждого применённого edit; SYNC_EDITS
+    в batch-режиме сравнивает с ним edit_date source-сообщения и правит
+    target только если source менялся с тех пор.
+
+    native — пост ушёл server-side forward'ом (FORWARD_STRATEGY = "forward"):
+    в target его текст как в source, без заголовка и цитаты.
+    """
+
+    def __init__(self):
+        self._pending: Dict[_Key, Tuple[int, bool]] = {}
+        self._ready = False
+
+    def _db(self):
+        db = get_db()
+        if not self._ready:
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS edit_marks (
+                    source_chat INTEGER NOT NULL,
+                    target_chat INTEGER NOT NULL,
+                    topic_id    INTEGER NOT NULL,
+                    source_id   INTEGER NOT NULL,
+                    edit_date   INTEGER NOT NULL,
+                    native      INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (source_chat, target_chat, topic_id, source_id)
+                ) WITHOUT ROWID
+                """
+            )
+            self._ready = True
+        return db
+
+    # ---------------------------------------------
+    # READ
+    # ---------------------------------------------
+    def _get(self, scope: IdMapScope, source_id: int) -> Tuple[int, bool]:
+        key = (scope, source_id)
+        if key in self._pending:
+            return self._pending[key]
+
+        row = self._db().execute(
+            "SELECT edit_date, native FROM edit_marks "
+            "WHERE source_chat = ? AND target_chat = ? AND topic_id = ? "
+            "AND source_id = ?",
+            (scope.source_chat, scope.target_chat, scope.topic_id, source_id),
+        ).fetchone()
+        return (row[0], bool(row[1])) if row else (0, False)
+
+    def get(self, scope: IdMapScope, source_id: int) -> int:
+        return self._get(scope, source_id)[0]
+
+    def native(self, scope: IdMapScope, source_id: int) -> bool:
+        return self._get(scope, source_id)[1]
+
+    # ---------------------------------------------
+    # WRITE
+    # ---------------------------------------------
+    def put(
+        self,
+        scope: IdMapScope,
+        source_id: int,
+        edit_date: int,
+        native: bool = False,
+    ) -> None:
+        self._pending[(scope, source_id)] = (edit_date, native)
+        if len(self._pending) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+
+        rows = [
+            (s.source_chat, s.target_chat, s.topic_id, src, ts, int(native))
+            for (s, src), (ts, native) in self._pending.items()
+        ]
+        self._pending.clear()
+
+        db = self._db()
+        with db:
+            db.executemany(
+                "INSERT OR REPLACE INTO edit_marks "
+                "(source_chat, target_chat, topic_id, source_id, edit_date, native) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+
+edit_marks = EditMarks()
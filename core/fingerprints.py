@@ -0,0 +1,119 @@
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from core.storage import get_db
+
+# -------------------------------------------------
+# TUNING
+# -------------------------------------------------
+FLUSH_EVERY = 200   # записей в буфере до сброса на диск
+
+# (target_chat, topic_id) — target без учёта source:
+# один и тот же пост из разных источников — дубль
+TargetKey = Tuple[int, int]
+_Key = Tuple[TargetKey, bytes]
+
+
+class Sent(NamedTuple):
+    """Где лежит первая копия: сообщение в target и пост source, из которого она."""
+    target_id: int
+    source_chat: int
+    source_id: int
+
+
+class FingerprintIndex:
+    """
+    Какое содержимое уже есть в target:
+    (target, отпечаток поста) → id сообщения в target
+    (+ source-пост, из которого оно пришло).
+
+    Отпечаток считает forwarding.dedup (текст + media id + состав альбома).
+    """
+
+    def __init__(self):
+        self._pending: Dict[_Key, Sent] = {}
+        self._ready = False
+
+    def _db(self):
+        db = get_db()
+        if not self._ready:
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS content_fingerprints (
+                    target_chat INTEGER NOT NULL,
+                    topic_id    INTEGER NOT NULL,
+                    fingerprint BLOB NOT NULL,
+                    target_id   INTEGER NOT NULL,
+                    source_chat INTEGER NOT NULL,
+                    source_id   INTEGER NOT NULL,
+                    PRIMARY KEY (target_chat, topic_id, fingerprint)
+                ) WITHOUT ROWID
+                """
+            )
+            # forget(): поиск по target_id (SYNC_DELETES)
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS content_fingerprints_target "
+                "ON content_fingerprints (target_chat, topic_id, target_id)"
+            )
+            self._ready = True
+        return db
+
+    # ---------------------------------------------
+    # READ
+    # ---------------------------------------------
+    def get(self, target: TargetKey, fingerprint: bytes) -> Optional[Sent]:
+        key = (target, fingerprint)
+        if key in self._pending:
+            return self._pending[key]
+
+        row = self._db().execute(
+            "SELECT target_id, source_chat, source_id FROM content_fingerprints "
+            "WHERE target_chat = ? AND topic_id = ? AND fingerprint = ?",
+            (target[0], target[1], fingerprint),
+        ).fetchone()
+        return Sent(*row) if row else None
+
+    # ---------------------------------------------
+    # WRITE
+    # ---------------------------------------------
+    def put(self, target: TargetKey, fingerprint: bytes, sent: Sent) -> None:
+        self._pending[(target, fingerprint)] = sent
+        if len(self._pending) >= FLUSH_EVERY:
+            self.flush()
+
+    def forget(self, target: TargetKey, target_ids: Iterable[int]) -> None:
+        """Сообщения удалены из target — их содержимого там больше нет."""
+        target_ids = set(target_ids)
+
+        for key, sent in list(self._pending.items()):
+            if key[0] == target and sent.target_id in target_ids:
+                del self._pending[key]
+
+        db = self._db()
+        with db:
+            db.executemany(
+                "DELETE FROM content_fingerprints "
+                "WHERE target_chat = ? AND topic_id = ? AND target_id = ?",
+                [(target[0], target[1], mid) for mid in target_ids],
+            )
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+
+        rows = [
+            (target[0], target[1], fp, *sent)
+            for (target, fp), sent in self._pending.items()
+        ]
+        self._pending.clear()
+
+        db = self._db()
+        with db:
+            db.executemany(
+                "INSERT OR REPLACE INTO content_fingerprints "
+                "(target_chat, topic_id, fingerprint, target_id, source_chat, source_id) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+
+fingerprints = FingerprintIndex()
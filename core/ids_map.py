@@ -1 +1,281 @@
-id_map = {}
\ No newline at end of file
+import atexit
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from core.logger import logger
+from core.storage import get_db
+
+# -------------------------------------------------
+# TUNING
+# -------------------------------------------------
+HOT_CACHE_SIZE = 50_000   # сколько пар source_id → target_id держим в памяти
+FLUSH_EVERY = 200         # сбрасываем на диск, когда накопилось столько записей
+FLUSH_INTERVAL = 2.0      # ...или прошло столько секунд с прошлого сброса
+
+
+# -------------------------------------------------
+# SCOPE
+# -------------------------------------------------
+@dataclass(frozen=True)
+class IdMapScope:
+    """
+    Область id map: откуда → куда.
+
+    source_chat / target_chat — peer id (формата utils.get_peer_id)
+    topic_id — тема в target (0, если не forum)
+    """
+    source_chat: int
+    target_chat: int
+    topic_id: int = 0
+
+
+_Key = Tuple[IdMapScope, int]
+
+
+# -------------------------------------------------
+# STORE
+# -------------------------------------------------
+class IdMapStore:
+    """
+    Персистентное соответствие source message_id → target message_id.
+
+    - данные лежат в SQLite (runtime/forwarder.sqlite3), ключ —
+      (source_chat, target_chat, topic_id, source_id)
+    - в памяти только ограниченный LRU горячих значений
+      (включая отрицательные ответы) + буфер ещё не записанных пар
+    - запись батчами: одна транзакция на FLUSH_EVERY пар или FLUSH_INTERVAL
+      секунд, а не sync-запись на каждое сообщение
+    - при падении теряется максимум последний несброшенный батч;
+      сама база при этом остаётся целой (транзакции SQLite атомарны)
+    """
+
+    def __init__(
+        self,
+        cache_size: int = HOT_CACHE_SIZE,
+        flush_every: int = FLUSH_EVERY,
+        flush_interval: float = FLUSH_INTERVAL,
+    ):
+        self.cache_size = cache_size
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+
+        self._cache: "OrderedDict[_Key, Optional[int]]" = OrderedDict()
+        self._pending: Dict[_Key, int] = {}
+        self._last_flush = time.monotonic()
+        self._ready = False
+
+    # ---------------------------------------------
+    # INTERNAL
+    # ---------------------------------------------
+    def _db(self):
+        db = get_db()
+        if not self._ready:
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS id_map (
+                    source_chat INTEGER NOT NULL,
+                    target_chat INTEGER NOT NULL,
+                    topic_id    INTEGER NOT NULL,
+                    source_id   INTEGER NOT NULL,
+                    target_id   INTEGER NOT NULL,
+                    PRIMARY KEY (source_chat, target_chat, topic_id, source_id)
+                ) WITHOUT ROWID
+                """
+            )
+            # sources(): обратный поиск по target_id (SYNC_DELETES)
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS id_map_target "
+                "ON id_map (source_chat, target_chat, topic_id, target_id)"
+            )
+            db.commit()
+            self._ready = True
+        return db
+
+    def _remember(self, key: _Key, value: Optional[int]) -> None:
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    # ---------------------------------------------
+    # READ
+    # ---------------------------------------------
+    def get(self, scope: IdMapScope, source_id: int) -> Optional[int]:
+        key = (scope, source_id)
+
+        if key in self._pending:
+            return self._pending[key]
+
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        row = self._db().execute(
+            "SELECT target_id FROM id_map "
+            "WHERE source_chat = ? AND target_chat = ? AND topic_id = ? "
+            "AND source_id = ?",
+            (scope.source_chat, scope.target_chat, scope.topic_id, source_id),
+        ).fetchone()
+
+        value = row[0] if row else None
+        self._remember(key, value)
+        return value
+
+    def sources(self, scope: IdMapScope, target_id: int) -> List[int]:
+        """Все source id, отправленные как target_id (альбом → несколько)."""
+        self.flush()
+        rows = self._db().execute(
+            "SELECT source_id FROM id_map "
+            "WHERE source_chat = ? AND target_chat = ? AND topic_id = ? "
+            "AND target_id = ?",
+            (scope.source_chat, scope.target_chat, scope.topic_id, target_id),
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    # ---------------------------------------------
+    # WRITE
+    # ---------------------------------------------
+    def put(self, scope: IdMapScope, source_id: int, target_id: int) -> None:
+        key = (scope, source_id)
+
+        self._pending[key] = target_id
+        self._remember(key, target_id)
+
+        if (
+            len(self._pending) >= self.flush_every
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Записывает накопленный батч одной транзакцией."""
+        self._last_flush = time.monotonic()
+
+        if not self._pending:
+            return
+
+        rows = [
+            (s.source_chat, s.target_chat, s.topic_id, src, dst)
+            for (s, src), dst in self._pending.items()
+        ]
+
+        db = self._db()
+        with db:
+            db.executemany(
+                "INSERT OR REPLACE INTO id_map "
+                "(source_chat, target_chat, topic_id, source_id, target_id) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+        self._pending.clear()
+
+
+store = IdMapStore()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        store.flush()
+    except Exception:
+        logger.exception("Failed to flush id map on exit")
+
+
+# -------------------------------------------------
+# SCOPED VIEW
+# -------------------------------------------------
+class ScopedIdMap:
+    """
+    dict-подобный вид на store для одной области (source → target/topic).
+    """
+
+    def __init__(self, scope: IdMapScope, backend: IdMapStore = store):
+        self.scope = scope
+        self._store = backend
+
+    def get(self, source_id: int, default=None):
+        value = self._store.get(self.scope, source_id)
+        return default if value is None else value
+
+    def __contains__(self, source_id) -> bool:
+        return self._store.get(self.scope, source_id) is not None
+
+    def __getitem__(self, source_id: int) -> int:
+        value = self._store.get(self.scope, source_id)
+        if value is None:
+            raise KeyError(source_id)
+        return value
+
+    def __setitem__(self, source_id: int, target_id: int) -> None:
+        self._store.put(self.scope, source_id, target_id)
+
+    def sources_of(self, target_id: int) -> List[int]:
+        return self._store.sources(self.scope, target_id)
+
+    def flush(self) -> None:
+        self._store.flush()
+
+
+_current: ContextVar[Optional[ScopedIdMap]] = ContextVar("id_map", default=None)
+
+
+def bind_id_map(
+    source_chat: int,
+    target_chat: int,
+    topic_id: Optional[int] = None,
+) -> ScopedIdMap:
+    """
+    Привязывает id_map текущего контекста (asyncio task) к области.
+
+    Вызывается в начале forward_history; handlers продолжают писать
+    id_map[msg.id] = sent.id и не знают про области.
+    """
+    scoped = ScopedIdMap(IdMapScope(source_chat, target_chat, topic_id or 0))
+    _current.set(scoped)
+    return scoped
+
+
+def use_id_map(scoped: ScopedIdMap) -> None:
+    """
+    Переключает id_map текущего контекста на уже созданную область
+    (один source → несколько TARGETS: перед отправкой в каждый target).
+    """
+    _current.set(scoped)
+
+
+class _IdMapProxy:
+    """
+    id_map — прокси на ScopedIdMap текущего контекста.
+    """
+
+    def _scoped(self) -> ScopedIdMap:
+        scoped = _current.get()
+        if scoped is None:
+            raise RuntimeError("id_map is not bound, call bind_id_map() first")
+        return scoped
+
+    @property
+    def scope(self) -> IdMapScope:
+        return self._scoped().scope
+
+    def get(self, source_id: int, default=None):
+        return self._scoped().get(source_id, default)
+
+    def __contains__(self, source_id) -> bool:
+        return source_id in self._scoped()
+
+    def __getitem__(self, source_id: int) -> int:
+        return self._scoped()[source_id]
+
+    def __setitem__(self, source_id: int, target_id: int) -> None:
+        self._scoped()[source_id] = target_id
+
+    def flush(self) -> None:
+        store.flush()
+
+
+id_map = _IdMapProxy()
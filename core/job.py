@@ -0,0 +1,57 @@
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from config import settings
+
+
+# -------------------------------------------------
+# JOB OPTIONS
+# -------------------------------------------------
+@dataclass(frozen=True)
+class JobOptions:
+    """
+    Параметры одной задачи SOURCE → TARGET(S), от которых зависит,
+    какие посты и как пересылаются.
+
+    По умолчанию — глобальные FORWARD_MODE / FORWARD_STRATEGY / ...
+    из settings; запись в JOBS может переопределить любой из них.
+    """
+    mode: str = "all"
+    strategy: str = "copy"
+    last_n: int = 0
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+
+    @classmethod
+    def from_settings(cls, **overrides) -> "JobOptions":
+        options = {
+            "mode": settings.FORWARD_MODE,
+            "strategy": settings.FORWARD_STRATEGY,
+            "last_n": settings.LAST_N_MESSAGES,
+            "date_from": settings.DATE_FROM,
+            "date_to": settings.DATE_TO,
+        }
+        options.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**options)
+
+
+_current: ContextVar[Optional[JobOptions]] = ContextVar("job", default=None)
+
+
+def bind_job(options: JobOptions) -> None:
+    """
+    Привязывает параметры задачи к текущему контексту (asyncio task).
+
+    Каждая задача планировщика работает в своей task, поэтому
+    filters / reply_handler / history_forwarder видят только свои.
+    """
+    _current.set(options)
+
+
+def current_job() -> JobOptions:
+    """Параметры текущей задачи (без bind_job — из settings)."""
+    options = _current.get()
+    if options is None:
+        options = JobOptions.from_settings()
+    return options
@@ -14,6 +14,7 @@ ICONS = {
     "PAID": "💰",
     "POLL": "📊",
     "TEXT": "💬",
+    "BATCH": "⏩",
     "OTHER": "ℹ️"
 }
 
@@ -0,0 +1,188 @@
+import os
+import shutil
+import time
+from typing import Optional
+
+from config.settings import DOWNLOAD_DIR, MEDIA_CACHE_MB
+from core.logger import logger
+from core.storage import get_db
+
+# -------------------------------------------------
+# PATH
+# -------------------------------------------------
+CACHE_DIR = os.path.join(DOWNLOAD_DIR, "cache")
+
+
+def _key(msg) -> Optional[str]:
+    """photo / document id + размер — одинаковы у всех копий файла в Telegram."""
+    media = getattr(msg, "media", None)
+    file = getattr(msg, "file", None)
+    size = (getattr(file, "size", None) or 0) if file else 0
+    if not size:
+        return None
+
+    photo = getattr(media, "photo", None)
+    if photo is not None:
+        return f"photo_{photo.id}_{size}"
+
+    document = getattr(media, "document", None)
+    if document is not None:
+        return f"doc_{document.id}_{size}"
+
+    return None
+
+
+def _link(src: str, dst: str) -> None:
+    """dst — ещё одно имя того же файла (hardlink), иначе копия."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+class MediaCache:
+    """
+    Локальный кэш скачанных media по содержимому:
+    photo / document id + размер → файл в downloads/cache/.
+
+    - перед download downloader смотрит сюда: повтор, репост того же
+      файла, перезапуск на пересекающемся диапазоне — без скачивания
+    - handler получает свою ссылку на файл (hardlink в tmp_<chat>_<id>.<ext>)
+      и переименовывает / удаляет её как обычно — копия кэша остаётся
+    - объём ограничен MEDIA_CACHE_MB, вытесняются давно не нужные (LRU)
+
+    MEDIA_CACHE_MB = 0 — кэш выключен.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._total: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _db(self):
+        db = get_db()
+        if self._total is None:
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS media_cache (
+                    key  TEXT PRIMARY KEY,
+                    file TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    used REAL NOT NULL
+                ) WITHOUT ROWID
+                """
+            )
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            self._total = db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM media_cache"
+            ).fetchone()[0]
+        return db
+
+    # ---------------------------------------------
+    # READ
+    # ---------------------------------------------
+    def has(self, msg) -> bool:
+        key = _key(msg) if self.enabled else None
+        if key is None:
+            return False
+        return self._lookup(key) is not None
+
+    def _lookup(self, key: str) -> Optional[str]:
+        row = self._db().execute(
+            "SELECT file, size FROM media_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        path = os.path.join(CACHE_DIR, row[0])
+        if not os.path.exists(path) or os.path.getsize(path) != row[1]:
+            # файл удалили руками / он битый — забываем
+            self._remove(key, row[0], row[1])
+            return None
+        return path
+
+    def get(self, msg, dst_base: str) -> Optional[str]:
+        """
+        Файл media из кэша как dst_base + <ext> (своя ссылка для handler)
+        или None — качать придётся.
+        """
+        key = _key(msg) if self.enabled else None
+        if key is None:
+            return None
+
+        path = self._lookup(key)
+        if path is None:
+            return None
+
+        dst = dst_base + os.path.splitext(path)[1]
+        if os.path.exists(dst):
+            os.remove(dst)
+        _link(path, dst)
+
+        db = self._db()
+        with db:
+            db.execute(
+                "UPDATE media_cache SET used = ? WHERE key = ?", (time.time(), key)
+            )
+        return dst
+
+    # ---------------------------------------------
+    # WRITE
+    # ---------------------------------------------
+    def put(self, msg, path: str) -> None:
+        """Только что скачанный файл (path) — в кэш; path остаётся у handler."""
+        key = _key(msg) if self.enabled else None
+        if key is None or not path or not os.path.exists(path):
+            return
+
+        size = os.path.getsize(path)
+        if size > self.max_bytes or self._lookup(key) is not None:
+            return
+
+        file = key + os.path.splitext(path)[1]
+        try:
+            _link(path, os.path.join(CACHE_DIR, file))
+        except OSError as e:
+            logger.warning(f"⚠️ CACHE │ {key}: not cached ({e})")
+            return
+
+        db = self._db()
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO media_cache (key, file, size, used) "
+                "VALUES (?, ?, ?, ?)",
+                (key, file, size, time.time()),
+            )
+        self._total += size
+
+        self._evict()
+
+    def _evict(self) -> None:
+        if self._total <= self.max_bytes:
+            return
+
+        rows = self._db().execute(
+            "SELECT key, file, size FROM media_cache ORDER BY used"
+        ).fetchall()
+
+        for key, file, size in rows:
+            if self._total <= self.max_bytes:
+                break
+            self._remove(key, file, size)
+
+    def _remove(self, key: str, file: str, size: int) -> None:
+        try:
+            os.remove(os.path.join(CACHE_DIR, file))
+        except FileNotFoundError:
+            pass
+
+        db = self._db()
+        with db:
+            db.execute("DELETE FROM media_cache WHERE key = ?", (key,))
+        self._total -= size
+
+
+media_cache = MediaCache(MEDIA_CACHE_MB * 1024 * 1024)
@@ -0,0 +1,202 @@
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Union
+
+from telethon.tl.types import (
+    Document,
+    InputDocument,
+    InputMediaDocument,
+    InputMediaPhoto,
+    InputPhoto,
+    MessageMediaDocument,
+    MessageMediaPhoto,
+    Photo,
+)
+
+from core.storage import get_db
+
+# -------------------------------------------------
+# TUNING
+# -------------------------------------------------
+CACHE_SIZE = 5_000   # сколько source media держим в памяти
+FLUSH_EVERY = 50     # новых ссылок в буфере до сброса на диск
+
+_Ref = Union[InputPhoto, InputDocument]
+_Key = Tuple[str, int]
+
+
+def _key(msg) -> Optional[_Key]:
+    """
+    Source media, а не сообщение: репост того же файла в source
+    (другое сообщение, тот же photo / document id) — тот же ключ.
+    """
+    media = getattr(msg, "media", None)
+
+    if isinstance(media, MessageMediaPhoto) and isinstance(media.photo, Photo):
+        return "photo", media.photo.id
+
+    if isinstance(media, MessageMediaDocument) and isinstance(media.document, Document):
+        return "doc", media.document.id
+
+    return None
+
+
+def _ref_from_media(media) -> Optional[_Ref]:
+    """InputPhoto / InputDocument из MessageMedia* или InputMedia*."""
+    if isinstance(media, MessageMediaPhoto) and isinstance(media.photo, Photo):
+        p = media.photo
+        return InputPhoto(id=p.id, access_hash=p.access_hash, file_reference=p.file_reference)
+
+    if isinstance(media, MessageMediaDocument) and isinstance(media.document, Document):
+        d = media.document
+        return InputDocument(id=d.id, access_hash=d.access_hash, file_reference=d.file_reference)
+
+    if isinstance(media, (InputMediaPhoto, InputMediaDocument)):
+        if isinstance(media.id, (InputPhoto, InputDocument)):
+            return media.id
+
+    return None
+
+
+def _row(key: _Key, ref: _Ref) -> tuple:
+    kind = "photo" if isinstance(ref, InputPhoto) else "doc"
+    return key[0], key[1], kind, ref.id, ref.access_hash, ref.file_reference
+
+
+def _ref_from_row(kind: str, ref_id: int, access_hash: int, file_reference: bytes) -> _Ref:
+    cls = InputPhoto if kind == "photo" else InputDocument
+    return cls(id=ref_id, access_hash=access_hash, file_reference=file_reference)
+
+
+class MediaRegistry:
+    """
+    source media → файл, который мы уже залили в Telegram.
+
+    Первый target получает media обычным путём (download + upload),
+    а отправленное сообщение (или результат messages.uploadMedia для
+    альбома) даёт InputPhoto / InputDocument. Остальные targets, репосты
+    того же файла в source и следующие запуски шлют этот же файл
+    по ссылке — один send RPC, ни download, ни upload.
+
+    Ссылки хранятся в SQLite (media_refs); горячие — ещё и в памяти (LRU).
+    file_reference со временем протухает: отправка по такой ссылке падает
+    (FILE_REFERENCE_EXPIRED и т.п.), handler вызывает forget() и заливает
+    файл заново — новая ссылка заменяет старую.
+    """
+
+    def __init__(self, cache_size: int = CACHE_SIZE):
+        self.cache_size = cache_size
+        self._refs: "OrderedDict[_Key, _Ref]" = OrderedDict()
+        self._pending: Dict[_Key, _Ref] = {}
+        self._ready = False
+
+    def _db(self):
+        db = get_db()
+        if not self._ready:
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS media_refs (
+                    source_kind    TEXT NOT NULL,
+                    source_id      INTEGER NOT NULL,
+                    kind           TEXT NOT NULL,
+                    id             INTEGER NOT NULL,
+                    access_hash    INTEGER NOT NULL,
+                    file_reference BLOB NOT NULL,
+                    PRIMARY KEY (source_kind, source_id)
+                ) WITHOUT ROWID
+                """
+            )
+            self._ready = True
+        return db
+
+    def _cache(self, key: _Key, ref: _Ref) -> None:
+        self._refs[key] = ref
+        self._refs.move_to_end(key)
+        while len(self._refs) > self.cache_size:
+            self._refs.popitem(last=False)
+
+    # ---------------------------------------------
+    # FILL
+    # ---------------------------------------------
+    def remember(self, msg, media) -> None:
+        """media — MessageMedia* отправленного сообщения или InputMedia*."""
+        key = _key(msg)
+        ref = _ref_from_media(media)
+        if key is None or ref is None:
+            return
+
+        self._cache(key, ref)
+        self._pending[key] = ref
+        if len(self._pending) >= FLUSH_EVERY:
+            self.flush()
+
+    def remember_sent(self, msg, sent) -> None:
+        """msg ушёл в target как sent."""
+        if sent is not None:
+            self.remember(msg, getattr(sent, "media", None))
+
+    def forget(self, msg) -> None:
+        """Ссылка не сработала (например, истёк file_reference) — больше не пробуем."""
+        key = _key(msg)
+        if key is None:
+            return
+
+        self._refs.pop(key, None)
+        self._pending.pop(key, None)
+
+        db = self._db()
+        with db:
+            db.execute(
+                "DELETE FROM media_refs WHERE source_kind = ? AND source_id = ?",
+                key,
+            )
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+
+        rows = [_row(key, ref) for key, ref in self._pending.items()]
+        self._pending.clear()
+
+        db = self._db()
+        with db:
+            db.executemany(
+                "INSERT OR REPLACE INTO media_refs "
+                "(source_kind, source_id, kind, id, access_hash, file_reference) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    # ---------------------------------------------
+    # LOOKUP
+    # ---------------------------------------------
+    def _lookup(self, key: _Key) -> Optional[_Ref]:
+        ref = self._refs.get(key)
+        if ref is not None:
+            self._refs.move_to_end(key)
+            return ref
+
+        row = self._db().execute(
+            "SELECT kind, id, access_hash, file_reference FROM media_refs "
+            "WHERE source_kind = ? AND source_id = ?",
+            key,
+        ).fetchone()
+        if row is None:
+            return None
+
+        ref = _ref_from_row(*row)
+        self._cache(key, ref)
+        return ref
+
+    def ref_for(self, msg, spoiler: bool = False):
+        """InputMediaPhoto / InputMediaDocument для повторной отправки (или None)."""
+        key = _key(msg)
+        ref = self._lookup(key) if key is not None else None
+
+        if isinstance(ref, InputPhoto):
+            return InputMediaPhoto(id=ref, spoiler=spoiler)
+        if isinstance(ref, InputDocument):
+            return InputMediaDocument(id=ref, spoiler=spoiler)
+        return None
+
+
+media_registry = MediaRegistry()
@@ -0,0 +1,189 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from telethon import utils
+from telethon.tl.types import Channel, Chat, User
+
+from core.storage import get_db
+
+# -------------------------------------------------
+# TUNING
+# -------------------------------------------------
+CACHE_SIZE = 10_000          # сколько peer держим в памяти
+TTL = 24 * 60 * 60           # имена меняются → через сутки перечитываем
+
+
+# -------------------------------------------------
+# PEER INFO
+# -------------------------------------------------
+@dataclass(frozen=True)
+class PeerInfo:
+    """То, что нужно для заголовков сообщений (и ничего больше)."""
+    title: str = ""          # канал / группа
+    first_name: str = ""     # пользователь
+    last_name: str = ""
+    broadcast: bool = False  # канал (а не группа / пользователь)
+
+    @property
+    def full_name(self) -> str:
+        return " ".join(x for x in (self.first_name, self.last_name) if x).strip()
+
+
+def _info_from_entity(entity) -> Optional[PeerInfo]:
+    if isinstance(entity, User):
+        return PeerInfo(
+            first_name=entity.first_name or "",
+            last_name=entity.last_name or "",
+        )
+    if isinstance(entity, (Chat, Channel)):
+        return PeerInfo(
+            title=entity.title or "",
+            broadcast=bool(getattr(entity, "broadcast", False)),
+        )
+    return None
+
+
+class PeerCache:
+    """
+    peer id → PeerInfo для заголовков ("Имя · время", "Переслано от ...").
+
+    Порядок поиска (сеть — только в последнюю очередь):
+      1) LRU в памяти (CACHE_SIZE, TTL)
+      2) runtime/forwarder.sqlite3 — то, что видели в прошлых запусках
+      3) client.get_entity — и результат запоминается
+
+    Наполняется в основном бесплатно: remember_message() берёт users / chats,
+    которые Telegram и так присылает вместе с каждой страницей истории.
+    """
+
+    def __init__(self, cache_size: int = CACHE_SIZE, ttl: float = TTL):
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self._cache: "OrderedDict[int, tuple[PeerInfo, float]]" = OrderedDict()
+        self._ready = False
+
+    # ---------------------------------------------
+    # INTERNAL
+    # ---------------------------------------------
+    def _db(self):
+        db = get_db()
+        if not self._ready:
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS peers (
+                    peer_id    INTEGER PRIMARY KEY,
+                    title      TEXT NOT NULL,
+                    first_name TEXT NOT NULL,
+                    last_name  TEXT NOT NULL,
+                    broadcast  INTEGER NOT NULL,
+                    updated    REAL NOT NULL
+                )
+                """
+            )
+            self._ready = True
+        return db
+
+    def _cache_put(self, peer_id: int, info: PeerInfo, updated: float) -> None:
+        self._cache[peer_id] = (info, updated)
+        self._cache.move_to_end(peer_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _fresh(self, updated: float) -> bool:
+        return time.time() - updated < self.ttl
+
+    # ---------------------------------------------
+    # FILL
+    # ---------------------------------------------
+    def remember(self, entity) -> None:
+        """User / Chat / Channel, уже полученный от Telegram."""
+        info = _info_from_entity(entity)
+        if info is None:
+            return
+
+        peer_id = utils.get_peer_id(entity)
+        cached = self._cache.get(peer_id)
+        now = time.time()
+
+        # тот же самый peer недавно уже записан — диск не трогаем
+        if cached and cached[0] == info and self._fresh(cached[1]):
+            return
+
+        self._cache_put(peer_id, info, now)
+
+        db = self._db()
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO peers "
+                "(peer_id, title, first_name, last_name, broadcast, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    peer_id,
+                    info.title,
+                    info.first_name,
+                    info.last_name,
+                    int(info.broadcast),
+                    now,
+                ),
+            )
+
+    def remember_message(self, msg) -> None:
+        """
+        Entities, пришедшие вместе с сообщением (без сети):
+        чат, отправитель и источник пересылки.
+        """
+        for entity in (
+            getattr(msg, "chat", None),
+            getattr(msg, "sender", None),
+            getattr(getattr(msg, "forward", None), "chat", None),
+            getattr(getattr(msg, "forward", None), "sender", None),
+        ):
+            if entity is not None:
+                self.remember(entity)
+
+    # ---------------------------------------------
+    # LOOKUP
+    # ---------------------------------------------
+    def get_cached(self, peer) -> Optional[PeerInfo]:
+        """PeerInfo из памяти / базы, без сети (None — не знаем или устарел)."""
+        try:
+            peer_id = utils.get_peer_id(peer)
+        except (TypeError, ValueError):
+            return None
+
+        cached = self._cache.get(peer_id)
+        if cached and self._fresh(cached[1]):
+            self._cache.move_to_end(peer_id)
+            return cached[0]
+
+        row = self._db().execute(
+            "SELECT title, first_name, last_name, broadcast, updated "
+            "FROM peers WHERE peer_id = ?",
+            (peer_id,),
+        ).fetchone()
+
+        if row and self._fresh(row[4]):
+            info = PeerInfo(row[0], row[1], row[2], bool(row[3]))
+            self._cache_put(peer_id, info, row[4])
+            return info
+
+        return None
+
+    async def get(self, peer, client) -> Optional[PeerInfo]:
+        """PeerInfo; в сеть — только если peer не встречался (или устарел)."""
+        info = self.get_cached(peer)
+        if info is not None:
+            return info
+
+        try:
+            entity = await client.get_entity(peer)
+        except Exception:
+            return None
+
+        self.remember(entity)
+        return _info_from_entity(entity)
+
+
+peer_cache = PeerCache()
@@ -0,0 +1,228 @@
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from telethon import utils
+from telethon.tl.functions import channels, messages, upload
+
+from config.settings import RATE_LIMITS
+from core.storage import get_db
+
+# -------------------------------------------------
+# METHOD CLASSES
+# -------------------------------------------------
+# request → класс лимита; остальные запросы (resolve, get_entity, ...)
+# не ограничиваются, но FloodWait для них тоже пережидается
+METHOD_CLASSES = {
+    "send": (
+        messages.SendMessageRequest,
+        messages.SendMediaRequest,
+        messages.SendMultiMediaRequest,
+        messages.ForwardMessagesRequest,
+        messages.UploadMediaRequest,
+    ),
+    "edit": (
+        messages.EditMessageRequest,
+        messages.DeleteMessagesRequest,
+        channels.DeleteMessagesRequest,
+    ),
+    "history": (
+        messages.GetHistoryRequest,
+        messages.GetMessagesRequest,
+        messages.GetRepliesRequest,
+        messages.SearchRequest,
+        channels.GetMessagesRequest,
+    ),
+    "file": (
+        upload.GetFileRequest,
+        upload.SaveFilePartRequest,
+        upload.SaveBigFilePartRequest,
+    ),
+}
+
+# у этих классов лимит ещё и на каждый target chat отдельно
+PER_PEER_CLASSES = {"send", "edit"}
+
+# -------------------------------------------------
+# ADAPTATION
+# -------------------------------------------------
+BACKOFF = 0.5          # FloodWait → rate × BACKOFF
+RECOVER = 1.1          # каждые RECOVER_EVERY успешных запросов → rate × RECOVER
+RECOVER_EVERY = 50
+MIN_RATE = 0.05        # не реже одного запроса в 20 s
+
+
+def classify(request) -> Optional[str]:
+    for name, types in METHOD_CLASSES.items():
+        if isinstance(request, types):
+            return name
+    return None
+
+
+def _peer_id(request) -> Optional[int]:
+    # ForwardMessages: to_peer — target, from_peer — source
+    peer = getattr(request, "to_peer", None) or getattr(request, "peer", None)
+    if peer is None:
+        return None
+    try:
+        return utils.get_peer_id(peer)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    rate запросов в секунду, burst — сколько можно сразу после простоя.
+    pause() — FloodWait: никто из ждущих не идёт раньше срока.
+
+    Ждущие получают токены строго по очереди (FIFO): несколько задач
+    на одном client делят bucket поровну, ни одна не голодает.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.not_before = 0.0
+        self._queue = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        async with self._queue:
+            while True:
+                now = time.monotonic()
+
+                if now < self.not_before:
+                    await asyncio.sleep(self.not_before - now)
+                    continue
+
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        self.not_before = max(self.not_before, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class RateLimiter:
+    """
+    Token buckets на класс методов (+ на target chat для send / edit).
+
+    - RATE_LIMITS из settings — потолок для каждого класса
+    - FloodWait: bucket ставится на паузу, rate падает вдвое
+    - длинная серия без FloodWait: rate понемногу растёт обратно к потолку
+    - выученные rate хранятся в runtime/forwarder.sqlite3 и
+      подхватываются при следующем запуске
+    """
+
+    def __init__(self):
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._successes: Dict[str, int] = {}
+        self._learned: Optional[Dict[str, float]] = None
+
+    # ---------------------------------------------
+    # STORAGE
+    # ---------------------------------------------
+    @staticmethod
+    def _db():
+        db = get_db()
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                key     TEXT PRIMARY KEY,
+                rate    REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+            """
+        )
+        return db
+
+    def _load(self) -> Dict[str, float]:
+        if self._learned is None:
+            rows = self._db().execute("SELECT key, rate FROM rate_limits")
+            self._learned = {key: rate for key, rate in rows}
+        return self._learned
+
+    def _save(self, key: str, rate: float) -> None:
+        self._load()[key] = rate
+        db = self._db()
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO rate_limits (key, rate, updated) "
+                "VALUES (?, ?, ?)",
+                (key, rate, time.time()),
+            )
+
+    # ---------------------------------------------
+    # BUCKETS
+    # ---------------------------------------------
+    def _bucket(self, key: str, method_class: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            ceiling = RATE_LIMITS[method_class]
+            rate = min(ceiling, self._load().get(key, ceiling))
+            bucket = TokenBucket(rate, burst=max(1.0, ceiling))
+            self._buckets[key] = bucket
+        return bucket
+
+    def keys_for(self, request) -> List[str]:
+        """Ключи bucket'ов запроса: класс и (для send / edit) класс:peer."""
+        if isinstance(request, list):
+            request = request[0] if request else None
+
+        method_class = classify(request)
+        if method_class is None:
+            return []
+
+        keys = [method_class]
+        if method_class in PER_PEER_CLASSES:
+            peer_id = _peer_id(request)
+            if peer_id is not None:
+                keys.append(f"{method_class}:{peer_id}")
+        return keys
+
+    # ---------------------------------------------
+    # PUBLIC API
+    # ---------------------------------------------
+    async def acquire(self, keys: List[str]) -> None:
+        # сначала узкий bucket (target chat), потом общий: задача, которая
+        # ждёт свой чат, не держит токен общего бюджета
+        for key in reversed(keys):
+            await self._bucket(key, key.split(":", 1)[0]).acquire()
+
+    def on_flood(self, keys: List[str], seconds: float) -> None:
+        """FloodWait: пауза + меньший rate на самом узком bucket'е."""
+        if not keys:
+            return
+
+        key = keys[-1]
+        bucket = self._bucket(key, key.split(":", 1)[0])
+        bucket.pause(seconds)
+        bucket.rate = max(MIN_RATE, bucket.rate * BACKOFF)
+        self._successes[key] = 0
+        self._save(key, bucket.rate)
+
+    def on_success(self, keys: List[str]) -> None:
+        for key in keys:
+            count = self._successes.get(key, 0) + 1
+            if count < RECOVER_EVERY:
+                self._successes[key] = count
+                continue
+
+            self._successes[key] = 0
+            bucket = self._bucket(key, key.split(":", 1)[0])
+            ceiling = RATE_LIMITS[key.split(":", 1)[0]]
+            if bucket.rate < ceiling:
+                bucket.rate = min(ceiling, bucket.rate * RECOVER)
+                self._save(key, bucket.rate)
+
+
+limiter = RateLimiter()
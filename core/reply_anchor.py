@@ -1,3 +1,4 @@
+import asyncio
 import json
 import os
 from typing import Literal, Optional
@@ -23,6 +24,10 @@ ANCHOR_TEXTS = {
 
 AnchorType = Literal["reply", "quote"]
 
+# state.json читается и перезаписывается целиком: JOBS (JOB_CONCURRENCY)
+# не должны затирать anchors друг друга или создать один anchor дважды
+_state_lock = asyncio.Lock()
+
 
 # -------------------------------------------------
 # STATE HELPERS
@@ -75,7 +80,16 @@ async def get_or_create_anchor(
 
     Создаётся автоматически при первом использовании.
     """
+    async with _state_lock:
+        return await _get_or_create_anchor(target_chat, anchor_type, target_topic_id)
+
 
+async def _get_or_create_anchor(
+    target_chat: int,
+    anchor_type: AnchorType,
+    target_topic_id: Optional[int],
+) -> int:
+    """get_or_create_anchor под _state_lock."""
     state = _load_state()
 
     anchors_root = state.setdefault("anchors", {})
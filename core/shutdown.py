@@ -0,0 +1,82 @@
+import asyncio
+import signal
+from contextvars import ContextVar
+from typing import Optional
+
+from core.logger import logger
+
+# сигнал (Ctrl-C / SIGTERM) — останавливает все задачи
+_stop_requested = False
+
+
+class _JobStop:
+    """Флаг остановки одной задачи JOBS (общий для её дочерних tasks)."""
+
+    def __init__(self):
+        self.requested = False
+
+
+_job_stop: ContextVar[Optional[_JobStop]] = ContextVar("job_stop", default=None)
+
+
+def bind_job_stop() -> None:
+    """
+    Своя остановка для задачи текущего контекста (asyncio task):
+    request_stop() внутри неё не трогает остальные JOBS.
+    """
+    _job_stop.set(_JobStop())
+
+
+def stop_requested() -> bool:
+    """Остановка всего процесса (сигнал) или текущей задачи."""
+    if _stop_requested:
+        return True
+    job_stop = _job_stop.get()
+    return job_stop is not None and job_stop.requested
+
+
+def request_stop() -> None:
+    """
+    Мягкая остановка изнутри (например, FloodWait длиннее FLOOD_MAX_WAIT):
+    только текущей задачи; без bind_job_stop() — всего процесса.
+    """
+    global _stop_requested
+
+    job_stop = _job_stop.get()
+    if job_stop is not None:
+        job_stop.requested = True
+    else:
+        _stop_requested = True
+
+
+def install_signal_handlers() -> None:
+    """
+    SIGINT / SIGTERM → мягкая остановка.
+
+    Первый сигнал:
+      - текущий пост досылается до конца
+      - checkpoint и id map сбрасываются на диск
+      - цикл пересылки завершается
+    Второй сигнал — немедленная остановка (KeyboardInterrupt).
+    """
+    loop = asyncio.get_running_loop()
+
+    def _request_stop(signame: str):
+        global _stop_requested
+
+        if _stop_requested:
+            logger.warning(f"⏹ STOP │ {signame} again, aborting")
+            raise KeyboardInterrupt
+
+        _stop_requested = True
+        logger.warning(
+            f"⏹ STOP │ {signame} received, finishing current post "
+            "(press Ctrl-C again to abort)"
+        )
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, _request_stop, sig.name)
+        except (NotImplementedError, RuntimeError):
+            # Windows: add_signal_handler нет → обычный signal.signal
+            signal.signal(sig, lambda s, f, name=sig.name: _request_stop(name))
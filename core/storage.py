@@ -0,0 +1,42 @@
+import os
+import sqlite3
+from typing import Optional
+
+from config.settings import RUNTIME_DIR
+
+# -------------------------------------------------
+# PATH
+# -------------------------------------------------
+DB_PATH = os.path.join(RUNTIME_DIR, "forwarder.sqlite3")
+
+_conn: Optional[sqlite3.Connection] = None
+
+
+def get_db() -> sqlite3.Connection:
+    """
+    Единое SQLite-хранилище runtime-состояния (runtime/forwarder.sqlite3).
+
+    - одно соединение на процесс (весь код живёт в одном event loop)
+    - WAL: запись батчами не блокирует чтение, а оборванная транзакция
+      просто откатывается при следующем открытии
+    - synchronous=NORMAL: в WAL-режиме это безопасно для целостности базы
+
+    Таблицы создают модули-владельцы (CREATE TABLE IF NOT EXISTS).
+    """
+    global _conn
+
+    if _conn is None:
+        os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+        _conn = sqlite3.connect(DB_PATH)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+
+    return _conn
+
+
+def close_db() -> None:
+    global _conn
+
+    if _conn is not None:
+        _conn.close()
+        _conn = None
@@ -0,0 +1,132 @@
+import sys
+from contextlib import asynccontextmanager
+
+from telethon.errors import RPCError, TakeoutInitDelayError
+from telethon.tl.functions import InvokeWithTakeoutRequest, account, channels, messages, upload
+
+from config.settings import TAKEOUT
+from core.logger import logger
+
+# -------------------------------------------------
+# TUNING
+# -------------------------------------------------
+MAX_FILE_SIZE = 4 * 1024 * 1024 * 1024   # самый большой файл Telegram (4 GB)
+
+# чтение истории и скачивание файлов — то, ради чего takeout и существует;
+# отправка в target идёт обычными запросами
+TAKEOUT_REQUESTS = (
+    messages.GetHistoryRequest,
+    messages.GetMessagesRequest,
+    messages.GetRepliesRequest,
+    messages.SearchRequest,
+    channels.GetMessagesRequest,
+    upload.GetFileRequest,
+)
+
+
+def wrap(request, session):
+    """
+    Запрос чтения → InvokeWithTakeoutRequest, если takeout-сессия открыта.
+    Остальные запросы (и всё, пока takeout нет) — как есть.
+    """
+    takeout_id = session.takeout_id
+    if takeout_id is None or not isinstance(request, TAKEOUT_REQUESTS):
+        return request
+    return InvokeWithTakeoutRequest(takeout_id=takeout_id, query=request)
+
+
+def drop(session) -> None:
+    """Telegram больше не принимает takeout (истёк / отозван) — читаем как обычно."""
+    if session.takeout_id is not None:
+        session.takeout_id = None
+        logger.warning("📦 TAKEOUT │ session is no longer valid, reading without it")
+
+
+async def _finish_stale(client) -> None:
+    """
+    takeout_id прошлого запуска, который не дошёл до finally (kill, падение),
+    лежит в файле сессии — telethon с ним новую сессию не откроет.
+    Закрываем её (без success) и забываем.
+    """
+    takeout_id = client.session.takeout_id
+    if takeout_id is None:
+        return
+
+    # сразу забываем: id передаём явно, а wrap / drop в core.client
+    # не должны принять её за текущую
+    client.session.takeout_id = None
+
+    try:
+        await client(InvokeWithTakeoutRequest(
+            takeout_id=takeout_id,
+            query=account.FinishTakeoutSessionRequest(success=False),
+        ))
+    except RPCError as e:
+        # уже истекла / отозвана — закрывать нечего
+        logger.debug(f"📦 TAKEOUT │ stale session not finished ({e.__class__.__name__})")
+
+    logger.info("📦 TAKEOUT │ previous run left a takeout session open, finished it")
+
+
+@asynccontextmanager
+async def takeout_session(client):
+    """
+    TAKEOUT = True: на время работы открывает takeout-сессию
+    (экспорт данных — у чтения истории и файлов заметно мягче лимиты).
+
+    Запросы чтения заворачиваются в неё в core.client (wrap), поэтому
+    iter_posts, prefetch и downloader ничего про takeout не знают.
+
+    Если Telegram не даёт takeout сразу (пользователь ещё не подтвердил
+    запрос в другом клиенте) или отказывает — работаем без него.
+    """
+    if not TAKEOUT:
+        yield False
+        return
+
+    takeout = client.takeout(
+        finalize=True,
+        chats=True,
+        megagroups=True,
+        channels=True,
+        files=True,
+        max_file_size=MAX_FILE_SIZE,
+    )
+
+    try:
+        await _finish_stale(client)
+        await takeout.__aenter__()
+
+    except TakeoutInitDelayError as e:
+        logger.warning(
+            f"📦 TAKEOUT │ confirm the data export request in Telegram "
+            f"(available in {e.seconds} s), continuing without takeout"
+        )
+        yield False
+        return
+
+    except (RPCError, ValueError) as e:
+        logger.warning(
+            f"📦 TAKEOUT │ not available ({e.__class__.__name__}), "
+            f"continuing without takeout"
+        )
+        yield False
+        return
+
+    logger.info("📦 TAKEOUT │ history and files are read through a takeout session")
+
+    exc_info = (None, None, None)
+    try:
+        yield True
+
+    except BaseException:
+        exc_info = sys.exc_info()
+        raise
+
+    finally:
+        # FinishTakeoutSession(success = без исключения)
+        if client.session.takeout_id is not None:
+            try:
+                await takeout.__aexit__(*exc_info)
+            except (RPCError, ValueError) as e:
+                logger.warning(f"📦 TAKEOUT │ failed to finish ({e.__class__.__name__})")
@@ -0,0 +1,446 @@
+import asyncio
+import hashlib
+import math
+import os
+from typing import Dict, Iterable, Optional, Union
+
+from telethon import utils
+from telethon.tl.functions.upload import SaveBigFilePartRequest, SaveFilePartRequest
+from telethon.tl.types import InputFile, InputFileBig
+
+from config.settings import TRANSFER_WORKERS
+from core.client import client
+from core.transfer_state import (
+    FLUSH_EVERY,
+    PART_TTL,
+    UPLOAD_TTL,
+    PartLog,
+    transfer_state,
+)
+
+# -------------------------------------------------
+# LIMITS
+# -------------------------------------------------
+PART_SIZE = 512 * 1024               # максимум и для GetFile, и для SaveFilePart
+BIG_FILE_SIZE = 10 * 1024 * 1024     # больше → upload.saveBigFilePart
+BUFFER_PARTS = 8                     # ring buffer между download и upload (~4 MB)
+RUN_PARTS = 16                       # частей в одном iter_download у worker
+
+# key → lock: один и тот же файл (репост в другом source, другой JOB)
+# не качается в общий .part дважды одновременно; lock живёт, пока
+# key кто-то качает или ждёт (_part_users)
+_part_locks: Dict[str, asyncio.Lock] = {}
+_part_users: Dict[str, int] = {}
+
+# брошенные .part уже убраны (один раз за процесс)
+_parts_swept = False
+
+
+# ============================================================
+# HELPERS
+# ============================================================
+def is_big_file(size: int) -> bool:
+    """
+    Файл передаётся частями: до TRANSFER_WORKERS частей одновременно,
+    с докачкой после обрыва. Маленькие файлы — как раньше: им хватает
+    пары запросов.
+    """
+    return size > BIG_FILE_SIZE
+
+
+def upload_part_size(size: int) -> int:
+    """
+    Размер части upload по размеру файла (как в telethon):
+    128 / 256 / 512 KB — так число частей укладывается в лимит Telegram.
+    """
+    return utils.get_appropriated_part_size(size) * 1024
+
+
+def _part_len(log: PartLog, index: int, size: int) -> int:
+    return min(log.part_size, size - index * log.part_size)
+
+
+def _done_bytes(log: PartLog, size: int) -> int:
+    return sum(
+        _part_len(log, i, size) for i in range(log.total_parts) if log.has(i)
+    )
+
+
+async def _run_all(coros: Iterable) -> None:
+    """Все корутины одновременно; первая ошибка отменяет остальные."""
+    tasks = [asyncio.ensure_future(c) for c in coros]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        # дожидаемся отмены: iter_download должен вернуть borrowed sender
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _fetch_parts(media, size: int, log: PartLog, on_part) -> None:
+    """
+    Качает недостающие части log и отдаёт их в on_part(index, data).
+
+    Недостающее режется на непрерывные куски (не длиннее RUN_PARTS),
+    до TRANSFER_WORKERS worker-ов берут их из общей очереди; каждый
+    кусок — один iter_download(offset=...) через sender DC файла.
+    """
+    run_len = max(1, min(RUN_PARTS, math.ceil(log.total_parts / TRANSFER_WORKERS)))
+    runs = log.runs(run_len)
+    queue = iter(runs)
+
+    async def _worker():
+        for first, count in queue:
+            async with client.iter_download(
+                media,
+                offset=first * log.part_size,
+                limit=count,
+                request_size=log.part_size,
+                file_size=size,
+            ) as chunks:
+                index = first
+                async for chunk in chunks:
+                    data = bytes(chunk)
+                    if len(data) != _part_len(log, index, size):
+                        raise RuntimeError(
+                            f"Unexpected part {index} size: {len(data)} bytes"
+                        )
+
+                    await on_part(index, data)
+                    index += 1
+
+    await _run_all(_worker() for _ in range(min(TRANSFER_WORKERS, len(runs))))
+
+
+def _part_path(path: str, key: Optional[str]) -> str:
+    """
+    .part файл докачки назван по key (документ + размер), а не по path:
+    bitmap в transfer_state и байты в файле всегда от одного документа.
+    """
+    if key is None:
+        return path + ".part"
+    return os.path.join(os.path.dirname(path), _part_name(key))
+
+
+def _part_name(key: str) -> str:
+    return key.replace(":", "_") + ".part"
+
+
+def _sweep_parts(directory: str) -> None:
+    """.part передач, прогресс которых истёк (PART_TTL), удаляются с ним."""
+    global _parts_swept
+    if _parts_swept:
+        return
+    _parts_swept = True
+
+    for key in transfer_state.expire(PART_TTL):
+        try:
+            os.remove(os.path.join(directory, _part_name(key)))
+        except FileNotFoundError:
+            pass
+
+
+async def _save_part(request) -> None:
+    if not await client(request):
+        raise RuntimeError(f"Failed to upload file part {request.file_part}")
+
+
+# ============================================================
+# DOWNLOAD
+# ============================================================
+async def download_file(
+    media,
+    path: str,
+    size: int,
+    progress_callback=None,
+    key: Optional[str] = None,
+) -> str:
+    """
+    Скачивает media в path частями по PART_SIZE, до TRANSFER_WORKERS
+    запросов GetFile одновременно.
+
+    Части пишутся в <key>.part рядом с path (без key — в <path>.part),
+    готовые отмечаются в transfer_state (key):
+    после обрыва или рестарта докачиваются только недостающие,
+    с их offset. Готовый файл переименовывается в path.
+
+    Запросы идут через sender DC файла (telethon выбирает его сам,
+    в т.ч. после FILE_MIGRATE) — одно соединение, но N запросов в полёте
+    вместо одного: скорость упирается в канал, а не в RTT.
+    """
+    if key is None:
+        return await _download_parts(media, path, size, progress_callback, None)
+
+    _sweep_parts(os.path.dirname(path))
+
+    lock = _part_locks.setdefault(key, asyncio.Lock())
+    _part_users[key] = _part_users.get(key, 0) + 1
+    try:
+        async with lock:
+            return await _download_parts(media, path, size, progress_callback, key)
+    finally:
+        _part_users[key] -= 1
+        if not _part_users[key]:
+            del _part_users[key]
+            del _part_locks[key]
+
+
+async def _download_parts(media, path: str, size: int, progress_callback, key) -> str:
+    part_path = _part_path(path, key)
+    total_parts = max(1, math.ceil(size / PART_SIZE))
+
+    log = transfer_state.open(key, PART_SIZE, total_parts)
+    if not os.path.exists(part_path):
+        log.reset()
+
+    done = _done_bytes(log, size)
+    if done and progress_callback:
+        progress_callback(done, size)
+
+    with open(part_path, "r+b" if log.count() else "wb") as f:
+
+        def _checkpoint():
+            # сначала данные на диск, потом отметка «часть готова»
+            f.flush()
+            os.fsync(f.fileno())
+            transfer_state.save(log)
+
+        async def _on_part(index: int, data: bytes):
+            nonlocal done
+            f.seek(index * PART_SIZE)
+            f.write(data)
+            log.add(index)
+
+            done += len(data)
+            if progress_callback:
+                progress_callback(done, size)
+
+            if log.unsaved >= FLUSH_EVERY:
+                _checkpoint()
+
+        try:
+            await _fetch_parts(media, size, log, _on_part)
+        finally:
+            if log.unsaved:
+                _checkpoint()
+
+        f.truncate(size)
+
+    if log.count() != total_parts:
+        raise RuntimeError(
+            f"Download incomplete: {log.count()} parts, expected {total_parts}"
+        )
+
+    os.replace(part_path, path)
+    transfer_state.drop(log)
+    return path
+
+
+# ============================================================
+# UPLOAD
+# ============================================================
+async def upload_file(
+    path: str,
+    file_name: str,
+    progress_callback=None,
+    key: Optional[str] = None,
+) -> Union[InputFile, InputFileBig]:
+    """
+    client.upload_file, но большой файл (is_big_file) заливается
+    saveBigFilePart-ами параллельно: до TRANSFER_WORKERS частей сразу,
+    размер части — по размеру файла (upload_part_size).
+
+    key (source media): file_id и принятые части запоминаются —
+    повторная попытка (в т.ч. после рестарта) досылает только недостающие.
+    """
+    size = os.path.getsize(path)
+    if not is_big_file(size):
+        return await client.upload_file(
+            path,
+            file_name=file_name,
+            progress_callback=progress_callback,
+        )
+
+    part_size = upload_part_size(size)
+    total_parts = math.ceil(size / part_size)
+
+    log = transfer_state.open(key, part_size, total_parts, ttl=UPLOAD_TTL)
+    sent_bytes = _done_bytes(log, size)
+
+    # общий итератор: каждая часть достаётся ровно одному worker
+    parts = iter([i for i in range(total_parts) if not log.has(i)])
+
+    with open(path, "rb") as f:
+
+        async def _worker():
+            nonlocal sent_bytes
+            for index in parts:
+                f.seek(index * part_size)
+                data = f.read(part_size)
+
+                await _save_part(
+                    SaveBigFilePartRequest(log.file_id, index, total_parts, data)
+                )
+                log.add(index)
+
+                sent_bytes += len(data)
+                if progress_callback:
+                    progress_callback(sent_bytes, size)
+
+                if log.unsaved >= FLUSH_EVERY:
+                    transfer_state.save(log)
+
+        try:
+            await _run_all(
+                _worker() for _ in range(min(TRANSFER_WORKERS, total_parts))
+            )
+        except BaseException:
+            transfer_state.save(log)
+            raise
+
+    transfer_state.drop(log)
+    return InputFileBig(log.file_id, total_parts, file_name)
+
+
+# ============================================================
+# STREAM (SOURCE → TARGET WITHOUT DISK)
+# ============================================================
+async def stream_upload(
+    msg,
+    file_name: str,
+    size: int,
+    progress_callback=None,
+    key: Optional[str] = None,
+) -> Union[InputFile, InputFileBig]:
+    """
+    Переливает media сообщения из source в target без диска.
+
+    Большой файл (is_big_file): TRANSFER_WORKERS worker-ов качают свои
+    части и сразу отдают их saveBigFilePart — порядок частей для big file
+    не важен, в памяти ~N частей. С key принятые части запоминаются,
+    как в upload_file.
+
+    Остальное:
+
+        client.iter_download  →  bounded queue (BUFFER_PARTS частей)  →  saveFilePart
+
+    - download и upload идут одновременно; если upload отстаёт,
+      download ждёт (очередь ограничена) → пиковая память — несколько MB
+    - size должен быть известен заранее (msg.file.size): по нему
+      выбирается путь, а для big file число частей передаётся
+      в каждом saveBigFilePart
+
+    Возвращает InputFile / InputFileBig для SendMediaRequest / send_file.
+    Ошибка download или upload пробрасывается (handler уйдёт на диск).
+    """
+    if is_big_file(size):
+        return await _stream_parts(msg, file_name, size, progress_callback, key)
+
+    total_parts = max(1, math.ceil(size / PART_SIZE))
+    file_id = int.from_bytes(os.urandom(8), "big", signed=True)
+
+    queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(maxsize=BUFFER_PARTS)
+
+    # ---------------------------------------------
+    # PRODUCER: source → parts
+    # ---------------------------------------------
+    async def _produce():
+        buf = bytearray()
+        try:
+            async for chunk in client.iter_download(
+                msg.media,
+                request_size=PART_SIZE,
+                file_size=size,
+            ):
+                buf += chunk
+                while len(buf) >= PART_SIZE:
+                    await queue.put(bytes(buf[:PART_SIZE]))
+                    del buf[:PART_SIZE]
+
+            if buf:
+                await queue.put(bytes(buf))
+
+        except Exception:
+            # будим consumer; саму ошибку он получит из await producer
+            await queue.put(None)
+            raise
+
+        await queue.put(None)
+
+    producer = asyncio.create_task(_produce())
+
+    # ---------------------------------------------
+    # CONSUMER: parts → target
+    # ---------------------------------------------
+    md5 = hashlib.md5()
+    part = 0
+    sent_bytes = 0
+
+    try:
+        while True:
+            data = await queue.get()
+            if data is None:
+                break
+
+            md5.update(data)
+            await _save_part(SaveFilePartRequest(file_id, part, data))
+
+            part += 1
+            sent_bytes += len(data)
+
+            if progress_callback:
+                progress_callback(sent_bytes, size)
+
+        # ошибка download (если была) всплывает здесь
+        await producer
+
+    finally:
+        if not producer.done():
+            producer.cancel()
+
+    if part != total_parts:
+        raise RuntimeError(
+            f"Stream size mismatch: {part} parts, expected {total_parts}"
+        )
+
+    return InputFile(file_id, part, file_name, md5.hexdigest())
+
+
+async def _stream_parts(msg, file_name: str, size: int, progress_callback, key):
+    log = transfer_state.open(
+        key,
+        PART_SIZE,
+        math.ceil(size / PART_SIZE),
+        ttl=UPLOAD_TTL,
+    )
+    sent_bytes = _done_bytes(log, size)
+
+    async def _on_part(index: int, data: bytes):
+        nonlocal sent_bytes
+        await _save_part(
+            SaveBigFilePartRequest(log.file_id, index, log.total_parts, data)
+        )
+        log.add(index)
+
+        sent_bytes += len(data)
+        if progress_callback:
+            progress_callback(sent_bytes, size)
+
+        if log.unsaved >= FLUSH_EVERY:
+            transfer_state.save(log)
+
+    try:
+        await _fetch_parts(msg.media, size, log, _on_part)
+    except BaseException:
+        transfer_state.save(log)
+        raise
+
+    if log.count() != log.total_parts:
+        raise RuntimeError(
+            f"Stream incomplete: {log.count()} parts, expected {log.total_parts}"
+        )
+
+    transfer_state.drop(log)
+    return InputFileBig(log.file_id, log.total_parts, file_name)
@@ -0,0 +1,196 @@
+import os
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from core.storage import get_db
+
+# -------------------------------------------------
+# TUNING
+# -------------------------------------------------
+FLUSH_EVERY = 32          # частей между записями прогресса на диск
+UPLOAD_TTL = 6 * 3600     # столько считаем, что Telegram ещё хранит залитые части, s
+PART_TTL = 7 * 24 * 3600  # столько храним прогресс (и .part) брошенной передачи, s
+
+
+@dataclass
+class PartLog:
+    """
+    Прогресс одной передачи по частям.
+
+    file_id — id upload-а (saveBigFilePart), для download не нужен.
+    done    — bitmap готовых частей (скачанных и записанных / принятых Telegram).
+    """
+    key: str
+    file_id: int
+    part_size: int
+    total_parts: int
+    done: bytearray
+    unsaved: int = field(default=0, compare=False)
+
+    def has(self, index: int) -> bool:
+        return bool(self.done[index >> 3] & (1 << (index & 7)))
+
+    def add(self, index: int) -> None:
+        self.done[index >> 3] |= 1 << (index & 7)
+        self.unsaved += 1
+
+    def reset(self) -> None:
+        self.done = bytearray(len(self.done))
+        self.unsaved = 0
+
+    def count(self) -> int:
+        return sum(bin(b).count("1") for b in self.done)
+
+    def runs(self, max_len: int) -> List[Tuple[int, int]]:
+        """
+        Недостающие части кусками (first, count) не длиннее max_len:
+        каждый кусок — один iter_download(offset=...) у worker.
+        """
+        result = []
+        index = 0
+        while index < self.total_parts:
+            if self.has(index):
+                index += 1
+                continue
+
+            first = index
+            while (
+                index < self.total_parts
+                and not self.has(index)
+                and index - first < max_len
+            ):
+                index += 1
+            result.append((first, index - first))
+
+        return result
+
+
+class TransferState:
+    """
+    Докуда дошли передачи больших файлов, переживает обрыв и рестарт:
+    key → file_id, размер части, bitmap готовых частей.
+
+    - download: части пишутся в <key>.part, повторная попытка качает
+      только недостающие
+    - upload: Telegram держит принятые saveBigFilePart у себя —
+      повторная попытка с тем же file_id досылает только недостающие
+      (пока не прошло UPLOAD_TTL)
+
+    key строит вызывающий (направление + id media + размер).
+    """
+
+    def __init__(self):
+        self._ready = False
+
+    def _db(self):
+        db = get_db()
+        if not self._ready:
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS transfer_parts (
+                    key         TEXT PRIMARY KEY,
+                    file_id     INTEGER NOT NULL,
+                    part_size   INTEGER NOT NULL,
+                    total_parts INTEGER NOT NULL,
+                    done        BLOB NOT NULL,
+                    updated     INTEGER NOT NULL
+                ) WITHOUT ROWID
+                """
+            )
+            self._ready = True
+        return db
+
+    # ---------------------------------------------
+    # READ
+    # ---------------------------------------------
+    def open(
+        self,
+        key: Optional[str],
+        part_size: int,
+        total_parts: int,
+        ttl: Optional[int] = None,
+    ) -> PartLog:
+        """
+        Сохранённый прогресс key или новый (key=None, другая разбивка
+        на части, старше ttl — начинаем с нуля с новым file_id).
+        """
+        if key is not None:
+            row = self._db().execute(
+                "SELECT file_id, part_size, total_parts, done, updated "
+                "FROM transfer_parts WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+            if (
+                row
+                and row[1] == part_size
+                and row[2] == total_parts
+                and (ttl is None or time.time() - row[4] < ttl)
+            ):
+                return PartLog(key, row[0], part_size, total_parts, bytearray(row[3]))
+
+        return PartLog(
+            key=key or "",
+            file_id=int.from_bytes(os.urandom(8), "big", signed=True),
+            part_size=part_size,
+            total_parts=total_parts,
+            done=bytearray((total_parts + 7) // 8),
+        )
+
+    # ---------------------------------------------
+    # WRITE
+    # ---------------------------------------------
+    def save(self, log: PartLog) -> None:
+        log.unsaved = 0
+        if not log.key:
+            return
+
+        db = self._db()
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO transfer_parts "
+                "(key, file_id, part_size, total_parts, done, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    log.key,
+                    log.file_id,
+                    log.part_size,
+                    log.total_parts,
+                    bytes(log.done),
+                    int(time.time()),
+                ),
+            )
+
+    def expire(self, ttl: int) -> List[str]:
+        """
+        Удаляет прогресс передач, не двигавшихся дольше ttl
+        (пост пропущен, задача снята). Возвращает их key — вызывающий
+        убирает то, что лежит на диске.
+        """
+        db = self._db()
+        cutoff = int(time.time()) - ttl
+
+        keys = [
+            row[0]
+            for row in db.execute(
+                "SELECT key FROM transfer_parts WHERE updated < ?", (cutoff,)
+            )
+        ]
+        if keys:
+            with db:
+                db.execute("DELETE FROM transfer_parts WHERE updated < ?", (cutoff,))
+        return keys
+
+    def drop(self, log: PartLog) -> None:
+        """Передача завершена (или её прогресс больше не годится)."""
+        log.unsaved = 0
+        if not log.key:
+            return
+
+        db = self._db()
+        with db:
+            db.execute("DELETE FROM transfer_parts WHERE key = ?", (log.key,))
+
+
+transfer_state = TransferState()
@@ -2,40 +2,126 @@ import os
 import time
 import asyncio
 
+from telethon.errors import FloodWaitError, RPCError
 from telethon.tl.types import (
     MessageMediaDocument,
     MessageMediaPaidMedia,
     MessageExtendedMediaPreview,
+    DocumentAttributeFilename,
     DocumentAttributeSticker,
+    DocumentAttributeVideo,
     InputDocument,
+    InputMediaDocument,
+    InputMediaUploadedDocument,
+    InputMediaUploadedPhoto,
 )
 
-from config.settings import DOWNLOAD_DIR, DELETE_FILES_AFTER_SEND
+from config.settings import (
+    ALBUM_CONCURRENCY,
+    DELETE_FILES_AFTER_SEND,
+    MEDIA_BY_REFERENCE,
+)
 from core.client import client
+from core.album_targets import album_targets
 from core.ids_map import id_map
 from core.logger import logger, tag
+from core.media_registry import media_registry
 from core.progress import make_progress
+from core.transfer import upload_file
 
 from forwarding.message_builder import build_final_text
 from forwarding.reply_handler import handle_reply
+from forwarding.downloader import download_media, media_size, transfer_key, upload_media
+from forwarding.media_sender import send_album, upload_album_media
 
-from forwarding.handlers.media_utils import detect_media_kind
+from forwarding.handlers.media_utils import detect_media_kind, input_media_ref
 
 from utils.caption_policy import apply_caption_policy
 
 from utils.media import (
-    prepare_image_file,
+    prepare_image,
     prepare_generic_file,
     cleanup_file,
 )
 
 
+# ============================================================
+# ITEM → InputMedia (без отправки)
+# ============================================================
+def _uploaded_input_media(m, kind: str, file, file_name: str):
+    """
+    InputMediaUploaded* для залитого файла.
+
+    Атрибуты (длительность, размеры видео) берутся у source-документа,
+    имя файла — оригинальное.
+    """
+    if kind == "PHOTO":
+        return InputMediaUploadedPhoto(file=file)
+
+    doc = getattr(m.media, "document", None)
+    mime_type = getattr(doc, "mime_type", None) or "application/octet-stream"
+
+    attributes = [DocumentAttributeFilename(file_name)]
+
+    if kind == "VIDEO":
+        attributes += [
+            a for a in getattr(doc, "attributes", [])
+            if isinstance(a, DocumentAttributeVideo)
+        ]
+
+    return InputMediaUploadedDocument(
+        file=file,
+        mime_type=mime_type,
+        attributes=attributes,
+        force_file=(kind == "DOCUMENT"),
+    )
+
+
+async def _upload_item(m, kind: str, original_name: str):
+    """
+    Заливает файл элемента в target.
+
+    Stream path (без диска), если можно; иначе download → prepare → upload.
+    Возвращает (InputFile, size_bytes) или (None, 0).
+    """
+    uploaded = await upload_media(m)
+    if uploaded is not None:
+        return uploaded, media_size(m)
+
+    raw_path = await download_media(m)
+    if not raw_path:
+        return None, 0
+
+    prepared = None
+
+    try:
+        if kind == "PHOTO":
+            prepared = await prepare_image(raw_path, original_name)
+        else:
+            prepared = prepare_generic_file(raw_path, original_name)
+
+        uploaded = await upload_file(
+            prepared.path,
+            file_name=prepared.original_name,
+            # фото перекодировано — байты уже не те, что в source
+            key=None if kind == "PHOTO" else transfer_key(m, "up"),
+        )
+        return uploaded, os.path.getsize(prepared.path)
+
+    finally:
+        if DELETE_FILES_AFTER_SEND:
+            if prepared and prepared.path:
+                cleanup_file(prepared.path)
+            cleanup_file(raw_path)
+
+
 async def forward_album(
     group_msgs,
     public_cid,
     album_no: int,
     target_chat,
     target_topic_id=None,
+    checkpoint=None,
 ):
     """
     Пересылает grouped_id как альбом.
@@ -43,12 +129,18 @@ async def forward_album(
     ПОВЕДЕНИЕ ПРИ ПЕРЕПОЛНЕНИИ CAPTION:
     - в альбоме остаётся служебка + notice
     - оригинальный текст отправляется одним reply ниже
+
+    checkpoint (опционально):
+    - если media-часть уже ушла до падения, а документы нет —
+      после перезапуска отправляются только документы
     """
 
     if not group_msgs:
         return
 
     album_tag = tag("ALBUM", album_no)
+    grouped_id = getattr(group_msgs[0], "grouped_id", None)
+    done_parts = checkpoint.album_parts(grouped_id) if checkpoint else set()
 
     # -------------------------------------------------
     # 1. SORT + CAPTION MESSAGE
@@ -107,249 +199,264 @@ async def forward_album(
         task = asyncio.create_task(_spinner())
         return task, finish
 
-    caption_attached = False
-
-    async def _attach_caption(sent):
-        nonlocal caption_attached
-        if caption_attached:
-            return None
+    # caption уже ушёл вместе с media-частью до перезапуска
+    caption_attached = "media" in done_parts and bool(media_msgs)
 
-        messages = sent if isinstance(sent, list) else [sent]
-        caption_target = messages[0]
+    # одновременно передаются не больше ALBUM_CONCURRENCY элементов
+    semaphore = asyncio.Semaphore(ALBUM_CONCURRENCY)
 
-        await client.edit_message(
-            target_chat,
-            caption_target.id,
-            caption,
-            formatting_entities=caption_entities,
+    # -------------------------------------------------
+    # helper: один элемент → InputMedia для sendMultiMedia
+    # -------------------------------------------------
+    async def _prepare_item(m, idx, total, force_upload=False):
+        """
+        Возвращает (InputMedia, by_reference) или (None, False).
+        """
+        kind = detect_media_kind(m)
+        item_tag = f"{album_tag} │ item {idx}/{total}"
+
+        # ---------- STICKER (всегда по InputDocument) ----------
+        media = m.media
+        if kind == "DOCUMENT" and isinstance(media, MessageMediaDocument):
+            doc = media.document
+            if any(isinstance(a, DocumentAttributeSticker) for a in doc.attributes):
+                logger.info(f"{item_tag} STICKER")
+                return InputMediaDocument(
+                    id=InputDocument(
+                        id=doc.id,
+                        access_hash=doc.access_hash,
+                        file_reference=doc.file_reference,
+                    )
+                ), False
+
+        label = "FILE" if kind == "DOCUMENT" else kind
+
+        # ---------- BY REFERENCE (уже залит / source без noforwards) ----------
+        ref = None
+        if force_upload:
+            media_registry.forget(m)
+        else:
+            ref = media_registry.ref_for(m)
+            if ref is None and MEDIA_BY_REFERENCE:
+                ref = input_media_ref(m)
+
+        if ref is not None:
+            logger.info(f"{item_tag} {label} (by reference)")
+            return ref, True
+
+        # ---------- TRANSFER ----------
+        original_name = (
+            getattr(getattr(m, "file", None), "name", None)
+            or f"{m.id}"
         )
 
-        caption_attached = True
-        return caption_target.id
+        async with semaphore:
+            started = time.time()
 
-    # -------------------------------------------------
-    # helper: reply_to for send_file (int)
-    # -------------------------------------------------
-    def _base_reply_to_from_ctx():
-        if not reply_ctx:
-            return None
-        return reply_ctx.reply_to_msg_id or reply_ctx.top_msg_id
+            try:
+                file, size = await _upload_item(m, kind, original_name)
+                if file is None:
+                    logger.warning(f"{album_tag} │ failed download item {idx}/{total}")
+                    return None, False
 
-    base_reply_to = _base_reply_to_from_ctx()
+                uploaded = await upload_album_media(
+                    target_chat,
+                    _uploaded_input_media(m, kind, file, original_name),
+                )
+                media_registry.remember(m, uploaded)
 
-    # -------------------------------------------------
-    # 3. PHOTO + VIDEO ALBUM
-    # -------------------------------------------------
-    if media_msgs:
-        upload_paths = []
-        original_ids = []
+            except FloodWaitError:
+                raise
 
-        for idx, m in enumerate(media_msgs, start=1):
-            media = m.media
+            except Exception as e:
+                # один битый элемент не должен ронять весь альбом
+                logger.warning(
+                    f"{album_tag} │ failed item {idx}/{total} "
+                    f"({e.__class__.__name__})"
+                )
+                return None, False
 
-            # ---------- PAID ----------
-            if isinstance(media, MessageMediaPaidMedia):
-                unlocked = getattr(media, "extended_media", None)
-                if not unlocked or isinstance(unlocked[0], MessageExtendedMediaPreview):
-                    has_locked_paid = True
-                    logger.warning(
-                        f"💰 PAID │ album #{album_no} │ locked item {idx}/{len(media_msgs)}"
-                    )
-                    continue
-                m.media = unlocked[0]
+        logger.info(
+            f"{item_tag} {label} "
+            f"({size / (1024 * 1024):.1f} MB, {time.time() - started:.1f} s)"
+        )
+        return uploaded, False
 
-            original_name = (
-                getattr(getattr(m, "file", None), "name", None)
-                or f"{m.id}"
+    # -------------------------------------------------
+    # helper: не все элементы передались → ошибка поста
+    # -------------------------------------------------
+    def _check_ready(ready, total):
+        if len(ready) < total:
+            raise RuntimeError(
+                f"{album_tag} │ {total - len(ready)} of {total} items failed"
             )
 
-            kind = detect_media_kind(m)
-            tmp_path = os.path.join(DOWNLOAD_DIR, f"tmp_{m.id}")
-
-            progress = None
-            finish = None
+    # -------------------------------------------------
+    # helper: часть альбома → один sendMultiMedia
+    # -------------------------------------------------
+    async def _send_part(msgs, part_caption, part_entities):
+        """
+        Все элементы передаются параллельно, затем альбом уходит
+        одним запросом с caption внутри.
 
-            if kind == "VIDEO":
-                progress, finish = make_progress(
-                    f"{album_tag} │ item {idx}/{len(media_msgs)} VIDEO"
-                )
+        Если Telegram не принял файл по ссылке (например, истёк
+        file_reference) — такие элементы заливаются заново, один повтор.
 
-            raw_path = await m.download_media(
-                file=tmp_path,
-                progress_callback=progress,
-            )
+        Хоть один элемент не передался — RuntimeError, часть не уходит.
 
-            if not raw_path:
-                logger.warning(
-                    f"{album_tag} │ failed download item {idx}/{len(media_msgs)}"
-                )
-                continue
+        Возвращает (sent_ids, original_ids).
+        """
+        total = len(msgs)
 
-            elapsed = finish() if finish else None
-            size_mb = os.path.getsize(raw_path) / (1024 * 1024)
+        spinner, finish = await _run_spinner(
+            f"{album_tag} │ transferring {total} items"
+        )
 
-            try:
-                if kind == "PHOTO":
-                    prepared = prepare_image_file(raw_path, original_name)
-                    logger.info(
-                        f"{album_tag} │ item {idx}/{len(media_msgs)} PHOTO "
-                        f"({size_mb:.1f} MB)"
-                    )
-                else:
-                    prepared = prepare_generic_file(raw_path, original_name)
-                    logger.info(
-                        f"{album_tag} │ item {idx}/{len(media_msgs)} VIDEO "
-                        f"({size_mb:.1f} MB, {elapsed:.1f} s)"
-                    )
+        try:
+            prepared = await asyncio.gather(*(
+                _prepare_item(m, idx, total)
+                for idx, m in enumerate(msgs, start=1)
+            ))
+        finally:
+            spinner.cancel()
+            finish()
 
-                upload_paths.append(prepared.path)
-                original_ids.append(m.id)
+        ready = [
+            (idx, m, media, by_ref)
+            for idx, (m, (media, by_ref)) in enumerate(zip(msgs, prepared), start=1)
+            if media is not None
+        ]
+        # альбом без части элементов не отправляем: пост уходит в ошибку,
+        # checkpoint его не пропустит. Залитые элементы уже в media_registry —
+        # повтор отправит их по ссылке
+        _check_ready(ready, total)
+
+        try:
+            sent_ids = await send_album(
+                target_chat,
+                [media for _, _, media, _ in ready],
+                part_caption,
+                part_entities,
+                reply_ctx,
+            )
 
-            finally:
-                if DELETE_FILES_AFTER_SEND:
-                    cleanup_file(raw_path)
+        except FloodWaitError:
+            raise
 
-        if upload_paths:
-            if has_locked_paid:
-                caption += "\n\n⚠ Часть контента доступна только за звезды."
+        except RPCError as e:
+            if not any(by_ref for *_, by_ref in ready):
+                raise
 
-            spinner, finish = await _run_spinner(
-                f"{album_tag} │ uploading album"
+            logger.warning(
+                f"{album_tag} │ re-send by reference failed "
+                f"({e.__class__.__name__}), falling back to upload"
             )
 
-            sent = await client.send_file(
+            for pos, (idx, m, media, by_ref) in enumerate(ready):
+                if by_ref:
+                    media, _ = await _prepare_item(m, idx, total, force_upload=True)
+                    ready[pos] = (idx, m, media, False)
+
+            ready = [r for r in ready if r[2] is not None]
+            _check_ready(ready, total)
+
+            sent_ids = await send_album(
                 target_chat,
-                upload_paths,
-                caption="",
-                reply_to=base_reply_to,
-                supports_streaming=True,
+                [media for _, _, media, _ in ready],
+                part_caption,
+                part_entities,
+                reply_ctx,
             )
 
-            spinner.cancel()
-            finish()
+        return sent_ids, [m.id for _, m, _, _ in ready]
 
-            caption_mid = await _attach_caption(sent)
-            if caption_mid:
-                for mid in original_ids:
-                    id_map[mid] = caption_mid
+    # -------------------------------------------------
+    # helper: id map + extra text для отправленной части
+    # -------------------------------------------------
+    async def _after_part(sent_ids, original_ids, with_caption):
+        nonlocal caption_attached
+
+        first_mid = next((mid for mid in sent_ids if mid), None)
+        if not first_mid:
+            return None
+
+        # replies на любой элемент альбома ведут на его первое сообщение,
+        # остальные id нужны, чтобы удалить альбом целиком (SYNC_DELETES)
+        for mid in original_ids:
+            id_map[mid] = first_mid
+        album_targets.put(id_map.scope, first_mid, sent_ids)
+
+        if with_caption:
+            caption_attached = True
 
             # ----- SEND EXTRA TEXT BELOW -----
-            if caption_mid and extra_text:
+            if extra_text:
                 await client.send_message(
                     target_chat,
                     extra_text,
                     formatting_entities=extra_entities,
-                    reply_to=caption_mid,
+                    reply_to=first_mid,
                 )
 
             logger.info(
-                f"{album_tag} │ sent, caption attached to msg {caption_mid}"
+                f"{album_tag} │ sent, caption attached to msg {first_mid}"
             )
+        else:
+            logger.info(f"{album_tag} │ sent, first msg {first_mid}")
 
-            if DELETE_FILES_AFTER_SEND:
-                for p in upload_paths:
-                    cleanup_file(p)
+        return first_mid
 
     # -------------------------------------------------
-    # 4. DOCUMENT ALBUM
+    # 3. PHOTO + VIDEO ALBUM
     # -------------------------------------------------
-    if doc_msgs:
-        upload_paths = []
-        original_ids = []
+    if "media" in done_parts:
+        logger.info(f"{album_tag} │ media part already sent, skipping")
 
-        for idx, m in enumerate(doc_msgs, start=1):
+    elif media_msgs:
+        ready_msgs = []
+
+        for idx, m in enumerate(media_msgs, start=1):
             media = m.media
 
-            if isinstance(media, MessageMediaDocument):
-                doc = media.document
-                if any(isinstance(a, DocumentAttributeSticker) for a in doc.attributes):
-                    upload_paths.append(
-                        InputDocument(
-                            id=doc.id,
-                            access_hash=doc.access_hash,
-                            file_reference=doc.file_reference,
-                        )
-                    )
-                    original_ids.append(m.id)
-                    logger.info(
-                        f"{album_tag} │ item {idx}/{len(doc_msgs)} STICKER"
+            # ---------- PAID ----------
+            if isinstance(media, MessageMediaPaidMedia):
+                unlocked = getattr(media, "extended_media", None)
+                if not unlocked or isinstance(unlocked[0], MessageExtendedMediaPreview):
+                    has_locked_paid = True
+                    logger.warning(
+                        f"💰 PAID │ album #{album_no} │ locked item {idx}/{len(media_msgs)}"
                     )
                     continue
+                m.media = unlocked[0]
 
-            original_name = (
-                getattr(getattr(m, "file", None), "name", None)
-                or f"{m.id}"
-            )
-
-            tmp_path = os.path.join(DOWNLOAD_DIR, f"tmp_{m.id}")
-
-            progress, finish = make_progress(
-                f"{album_tag} │ item {idx}/{len(doc_msgs)} FILE"
-            )
-
-            raw_path = await m.download_media(
-                file=tmp_path,
-                progress_callback=progress,
-            )
-
-            if not raw_path:
-                logger.warning(
-                    f"{album_tag} │ failed download item {idx}/{len(doc_msgs)}"
-                )
-                continue
-
-            elapsed = finish()
-            size_mb = os.path.getsize(raw_path) / (1024 * 1024)
-
-            try:
-                prepared = prepare_generic_file(raw_path, original_name)
-                upload_paths.append(prepared.path)
-                original_ids.append(m.id)
-
-                logger.info(
-                    f"{album_tag} │ item {idx}/{len(doc_msgs)} FILE "
-                    f"({size_mb:.1f} MB, {elapsed:.1f} s)"
-                )
-
-            finally:
-                if DELETE_FILES_AFTER_SEND:
-                    cleanup_file(raw_path)
+            ready_msgs.append(m)
 
-        if upload_paths:
-            spinner, finish = await _run_spinner(
-                f"{album_tag} │ uploading album"
-            )
+        if ready_msgs:
+            if has_locked_paid:
+                caption += "\n\n⚠ Часть контента доступна только за звезды."
 
-            sent = await client.send_file(
-                target_chat,
-                upload_paths,
-                caption="",
-                reply_to=base_reply_to,
-                force_document=True,
+            sent_ids, original_ids = await _send_part(
+                ready_msgs,
+                caption,
+                caption_entities,
             )
 
-            spinner.cancel()
-            finish()
+            if await _after_part(sent_ids, original_ids, with_caption=True):
+                if checkpoint and doc_msgs:
+                    checkpoint.album_part_done(grouped_id, "media")
 
-            caption_mid = await _attach_caption(sent)
-            if caption_mid:
-                for mid in original_ids:
-                    id_map[mid] = caption_mid
-
-            # ----- SEND EXTRA TEXT BELOW -----
-            if caption_mid and extra_text:
-                await client.send_message(
-                    target_chat,
-                    extra_text,
-                    formatting_entities=extra_entities,
-                    reply_to=caption_mid,
-                )
+    # -------------------------------------------------
+    # 4. DOCUMENT ALBUM
+    # -------------------------------------------------
+    # Telegram не смешивает документы с фото / видео в одном альбоме,
+    # поэтому документы — отдельный sendMultiMedia
+    if doc_msgs:
+        with_caption = not caption_attached
 
-            logger.info(
-                f"{album_tag} │ sent, caption attached to msg {caption_mid}"
-            )
+        sent_ids, original_ids = await _send_part(
+            doc_msgs,
+            caption if with_caption else "",
+            caption_entities if with_caption else None,
+        )
 
-            if DELETE_FILES_AFTER_SEND:
-                for p in upload_paths:
-                    if isinstance(p, str):
-                        cleanup_file(p)
+        await _after_part(sent_ids, original_ids, with_caption=with_caption)
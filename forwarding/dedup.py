@@ -0,0 +1,170 @@
+import hashlib
+import re
+from typing import AsyncIterator, Optional
+
+from telethon.tl.types import (
+    MessageMediaDocument,
+    MessageMediaPhoto,
+    MessageMediaPoll,
+    MessageMediaWebPage,
+)
+
+from core.fingerprints import Sent, TargetKey, fingerprints
+from core.logger import logger
+
+from forwarding.filters import Post
+from forwarding.live import Deleted, Edited
+
+_SPACES = re.compile(r"\s+")
+
+
+# ============================================================
+# FINGERPRINT
+# ============================================================
+def _items(post: Post) -> list:
+    return sorted(post, key=lambda m: m.id) if isinstance(post, list) else [post]
+
+
+def _media_id(msg) -> Optional[str]:
+    """
+    Id файла / опроса на серверах Telegram (у репоста — тот же).
+    "" — media нет (или это превью ссылки из текста).
+    None — что внутри, не понять: такой пост не дедупим.
+    """
+    media = getattr(msg, "media", None)
+
+    if media is None or isinstance(media, MessageMediaWebPage):
+        return ""
+    if isinstance(media, MessageMediaPhoto) and media.photo:
+        return f"p{media.photo.id}"
+    if isinstance(media, MessageMediaDocument) and media.document:
+        return f"d{media.document.id}"
+    if isinstance(media, MessageMediaPoll):
+        return f"q{media.poll.id}"
+    return None
+
+
+def fingerprint(post: Post) -> Optional[bytes]:
+    """
+    Отпечаток содержимого поста: текст (без регистра и лишних пробелов)
+    + id media каждого элемента в порядке альбома.
+
+    None — пост не дедупится (пустой, неизвестное media).
+    """
+    items = _items(post)
+
+    media_ids = [_media_id(m) for m in items]
+    if None in media_ids:
+        return None
+
+    text = " ".join(m.message for m in items if getattr(m, "message", None))
+    text = _SPACES.sub(" ", text).strip().casefold()
+
+    if not text and not any(media_ids):
+        return None
+
+    data = "\x1f".join([text, *media_ids]).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+# ============================================================
+# PER TARGET
+# ============================================================
+def _target_key(target) -> TargetKey:
+    return target.ids.scope.target_chat, target.ids.scope.topic_id
+
+
+def duplicate_of(target, post: Post, fp: Optional[bytes] = None) -> Optional[int]:
+    """
+    Id сообщения в target с тем же содержимым, или None.
+    Сам оригинал (тот пост, что и записал отпечаток) дублем не считается.
+    """
+    fp = fp or fingerprint(post)
+    if fp is None:
+        return None
+
+    sent = fingerprints.get(_target_key(target), fp)
+    if sent is None:
+        return None
+
+    if (sent.source_chat, sent.source_id) == (target.ids.scope.source_chat, _items(post)[0].id):
+        return None
+    return sent.target_id
+
+
+def skip_in_target(target, post: Post) -> bool:
+    """
+    Пост — дубль того, что уже есть в target: не отправляем, а ответы
+    на него ведут на уже отправленную копию.
+    """
+    target_id = duplicate_of(target, post)
+    if target_id is None:
+        return False
+
+    for m in _items(post):
+        target.ids[m.id] = target_id
+
+    logger.info(
+        f"♻️ DEDUP │ post {_items(post)[0].id}: already in target as {target_id}, skipped"
+    )
+    return True
+
+
+def copy_pending(posts: list, post: Post) -> bool:
+    """
+    То же содержимое ждёт отправки в posts (native-батч): копии в target
+    ещё нет — батч нужно отправить, прежде чем решать, дубль ли post.
+    """
+    fp = fingerprint(post)
+    return fp is not None and any(fingerprint(p) == fp for p in posts)
+
+
+def remember(target, post: Post) -> None:
+    """Пост ушёл в target — запоминаем его отпечаток."""
+    fp = fingerprint(post)
+    if fp is None:
+        return
+
+    source_id = _items(post)[0].id
+    target_id = target.ids.get(source_id)
+    if target_id:
+        fingerprints.put(
+            _target_key(target),
+            fp,
+            Sent(target_id, target.ids.scope.source_chat, source_id),
+        )
+
+
+def forget(target, target_ids) -> None:
+    """Сообщения удалены из target (SYNC_DELETES) — дублем их больше не считаем."""
+    fingerprints.forget(_target_key(target), target_ids)
+
+
+# ============================================================
+# STREAM STAGE (ДО PREFETCH)
+# ============================================================
+async def skip_duplicates(posts: AsyncIterator, targets: list) -> AsyncIterator:
+    """
+    Стадия между iter_posts и prefetch: убирает посты, которые уже есть
+    во всех targets, — до того, как их media начнут качаться.
+
+    Дубль поста, который идёт раньше в этом же потоке и ещё не отправлен,
+    проходит дальше: его копии в target пока нет (она может и не дойти —
+    ошибка, остановка). При отправке его проверит skip_in_target —
+    к тому времени копия уже отправлена или точно не отправлена.
+
+    None / Edited / Deleted (live) проходят как есть.
+    """
+    async for post in posts:
+        if post is None or isinstance(post, (Edited, Deleted)):
+            yield post
+            continue
+
+        fp = fingerprint(post)
+        if fp is not None and all(duplicate_of(t, post, fp) for t in targets):
+            # ответы на дубль ведут на отправленную копию
+            for target in targets:
+                skip_in_target(target, post)
+            continue
+
+        yield post
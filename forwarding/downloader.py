@@ -0,0 +1,228 @@
+import asyncio
+import glob
+import os
+from typing import Dict, Optional, Tuple
+
+from telethon.errors import FloodWaitError
+
+from config.settings import DOWNLOAD_DIR, STREAM_TRANSFERS
+from core.logger import logger
+from core.media_cache import media_cache
+from core.transfer import download_file, is_big_file, stream_upload
+
+from forwarding.handlers.media_utils import detect_media_kind, is_sticker
+from forwarding.handlers.by_reference import can_send_by_reference
+
+from utils.media import cleanup_file
+
+# -------------------------------------------------
+# IN-FLIGHT PREFETCH TRANSFERS
+# -------------------------------------------------
+# (chat_id, message_id) → task:
+#   - качает media в tmp-файл (disk path)
+#   - или сразу переливает его в target (stream path) → InputFile
+_inflight: Dict[Tuple[int, int], asyncio.Task] = {}
+
+
+def _key(msg) -> Tuple[int, int]:
+    return getattr(msg, "chat_id", None) or 0, msg.id
+
+
+def tmp_path_for(msg) -> str:
+    # id сообщений у разных source совпадают, а JOBS качают одновременно —
+    # в имени и source chat, и id
+    chat_id, msg_id = _key(msg)
+    return os.path.join(DOWNLOAD_DIR, f"tmp_{abs(chat_id)}_{msg_id}")
+
+
+def _cleanup_tmp(msg) -> None:
+    # telethon сам дописывает расширение: tmp_<chat>_<id>.jpg / .mp4 / ...
+    # недокачанный down_<doc>_<size>.part сюда не попадает — с него
+    # продолжит следующая попытка (core.transfer_state)
+    # только свой stem: tmp_<chat>_12.* не должен задеть tmp_<chat>_120.*
+    base = glob.escape(tmp_path_for(msg))
+    for path in glob.glob(base + ".*") + glob.glob(base):
+        cleanup_file(path)
+
+
+def needs_transfer(msg) -> bool:
+    """Media придётся передавать байтами (диском или потоком)."""
+    if detect_media_kind(msg) not in ("PHOTO", "VIDEO", "DOCUMENT"):
+        return False
+    if is_sticker(msg):
+        return False
+    return not can_send_by_reference(msg)
+
+
+def wants_stream(msg) -> bool:
+    """
+    Media уходит из source в target потоком, минуя диск.
+
+    Только VIDEO / DOCUMENT (в т.ч. voice) известного размера:
+    фото идут через диск — их перекодирует prepare_image.
+    """
+    if not STREAM_TRANSFERS or not needs_transfer(msg):
+        return False
+    if detect_media_kind(msg) == "PHOTO":
+        return False
+    # файл уже в кэше — только upload с диска
+    if media_cache.has(msg):
+        return False
+    return media_size(msg) > 0
+
+
+def media_size(msg) -> int:
+    file = getattr(msg, "file", None)
+    return (getattr(file, "size", None) or 0) if file else 0
+
+
+def upload_name(msg) -> str:
+    """Имя файла для target: оригинальное или <id><ext по mime>."""
+    file = getattr(msg, "file", None)
+    if file and file.name:
+        return file.name
+    return f"{msg.id}{(file.ext if file else '') or ''}"
+
+
+def transfer_key(msg, direction: str) -> Optional[str]:
+    """
+    Ключ прогресса передачи по частям (core.transfer_state):
+    "down" / "up" + id документа + размер. Фото — None (они маленькие).
+    """
+    document = getattr(getattr(msg, "media", None), "document", None)
+    if document is None:
+        return None
+    return f"{direction}:{document.id}:{media_size(msg)}"
+
+
+def wants_parts(msg) -> bool:
+    """Большой VIDEO / DOCUMENT известного размера качается частями, с докачкой."""
+    if detect_media_kind(msg) not in ("VIDEO", "DOCUMENT"):
+        return False
+    return is_big_file(media_size(msg))
+
+
+async def _download(msg, progress_callback=None) -> Optional[str]:
+    cached = media_cache.get(msg, tmp_path_for(msg))
+    if cached:
+        logger.info(f"💾 CACHE │ msg {msg.id}: media taken from cache")
+        return cached
+
+    if wants_parts(msg):
+        path = await download_file(
+            msg.media,
+            tmp_path_for(msg) + (msg.file.ext or ""),
+            media_size(msg),
+            progress_callback=progress_callback,
+            key=transfer_key(msg, "down"),
+        )
+    else:
+        path = await msg.download_media(
+            file=tmp_path_for(msg),
+            thumb=None,
+            progress_callback=progress_callback,
+        )
+
+    media_cache.put(msg, path)
+    return path
+
+
+async def _stream(msg, progress_callback=None):
+    return await stream_upload(
+        msg,
+        upload_name(msg),
+        media_size(msg),
+        progress_callback=progress_callback,
+        key=transfer_key(msg, "up"),
+    )
+
+
+async def _take_prefetched(msg):
+    """Результат prefetch-задачи или None (нет / упала — делаем сами)."""
+    task = _inflight.pop(_key(msg), None)
+    if task is None:
+        return None
+
+    try:
+        return await task
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.warning(f"⚠️ PREFETCH │ msg {msg.id} failed ({e}), retrying")
+        return None
+
+
+# -------------------------------------------------
+# PUBLIC API
+# -------------------------------------------------
+def prefetch(msg) -> None:
+    """Начинает фоновую передачу media (если ещё не начата)."""
+    key = _key(msg)
+    if key in _inflight:
+        return
+
+    if wants_stream(msg):
+        _inflight[key] = asyncio.create_task(_stream(msg))
+    else:
+        _inflight[key] = asyncio.create_task(_download(msg))
+
+
+def discard(msg) -> None:
+    """
+    Пост пройден, а prefetch-передача не понадобилась
+    (ошибка, пропуск, остановка) — отменяем и убираем tmp-файл.
+    Загруженные в target части без отправки Telegram удалит сам.
+    """
+    task = _inflight.pop(_key(msg), None)
+    if task is None:
+        return
+
+    if not task.done():
+        task.cancel()
+
+    def _cleanup(t: asyncio.Task):
+        if not t.cancelled():
+            t.exception()  # ошибка не нужна, но помечаем её прочитанной
+        _cleanup_tmp(msg)
+
+    task.add_done_callback(_cleanup)
+
+
+async def download_media(msg, progress_callback=None) -> Optional[str]:
+    """
+    Скачивает media сообщения в DOWNLOAD_DIR/tmp_<chat>_<id>.
+
+    Если файл уже качается (или скачан) lookahead-окном —
+    ждём его, а не качаем второй раз.
+    Если prefetch упал — качаем заново, уже с progress.
+    """
+    path = await _take_prefetched(msg)
+    if isinstance(path, str):
+        return path
+
+    return await _download(msg, progress_callback)
+
+
+async def upload_media(msg, progress_callback=None):
+    """
+    Stream path: source → target без диска, возвращает InputFile / InputFileBig.
+
+    None — если потоком нельзя (STREAM_TRANSFERS выключен, фото, размер
+    неизвестен) или передача упала; handler тогда идёт через диск.
+    """
+    if not wants_stream(msg):
+        return None
+
+    uploaded = await _take_prefetched(msg)
+    if uploaded is not None and not isinstance(uploaded, str):
+        return uploaded
+
+    try:
+        return await _stream(msg, progress_callback)
+    except (asyncio.CancelledError, FloodWaitError):
+        raise
+    except Exception as e:
+        logger.warning(
+            f"⚠️ STREAM │ msg {msg.id} failed ({e}), falling back to disk"
+        )
+        return None
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
-from datetime import datetime
-from typing import AsyncIterator, List, Optional, Union
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Callable, List, Optional, Union
 
+from telethon import utils
+from telethon.tl.functions.messages import GetHistoryRequest, GetRepliesRequest
 from telethon.tl.types import Message, MessageService
 
-import config.settings as settings
+from core.album_index import album_index
+from core.date_index import date_index
+from core.job import current_job
 from core.logger import logger
 
 # ======================================================
@@ -13,6 +17,11 @@ from core.logger import logger
 # ======================================================
 DEBUG_FILTERS = False   # ← включай при отладке
 
+LAST_N_PAGE = 100       # максимум сообщений в одной странице истории
+ALBUM_MAX = 10          # сообщений в альбоме Telegram, не больше
+ALBUM_WINDOW = 9        # post_id: соседи альбома ищутся в ±N id (альбом ≤ 10)
+ALBUM_EDGE = 3          # альбом ближе к краю окна → смотрим следующее окно
+
 Post = Union[Message, List[Message]]  # одиночное сообщение или альбом
 
 
@@ -50,9 +59,32 @@ async def _yield_post_by_id(client, source_peer, post_id: int) -> AsyncIterator[
       - Message (если одиночный)
       - List[Message] (если часть альбома)
     Если сообщения нет / удалено / сервисное → ничего не yield-ит.
+
+    Один get_messages(ids=[...]):
+      - окно ±ALBUM_WINDOW вокруг post_id (альбом — до 10 сообщений);
+        если альбом дошёл до края окна — добираем следующее окно
+      - альбом уже встречался (album_index) → окно вокруг его известных id:
+        скан мог застать альбом не целиком (граница диапазона, min_id),
+        поэтому известные id — не весь альбом, а только где его искать
     """
+    peer_id = utils.get_peer_id(source_peer)
+    fetched = {}
+
+    async def _fetch(ids):
+        for m in await client.get_messages(source_peer, ids=list(ids)):
+            if m is not None:
+                fetched[m.id] = m
 
-    msg = await client.get_messages(source_peer, ids=post_id)
+    known = album_index.album_ids(peer_id, post_id)
+    if known:
+        # все элементы альбома — в пределах ALBUM_WINDOW от каждого из них
+        lo, hi = max(1, known[-1] - ALBUM_WINDOW), known[0] + ALBUM_WINDOW
+    else:
+        lo, hi = max(1, post_id - ALBUM_WINDOW), post_id + ALBUM_WINDOW
+
+    await _fetch(range(lo, hi + 1))
+
+    msg = fetched.get(post_id)
 
     if not msg or isinstance(msg, MessageService):
         logger.warning(f"⚠️ POST_ID │ message {post_id} not found or deleted")
@@ -66,21 +98,113 @@ async def _yield_post_by_id(client, source_peer, post_id: int) -> AsyncIterator[
         return
 
     # ---------- альбом ----------
-    album: List[Message] = []
+    def _album():
+        return sorted(
+            (m for m in fetched.values() if getattr(m, "grouped_id", None) == gid),
+            key=lambda m: m.id,
+        )
+
+    album = _album()
+
+    # альбом дошёл до края окна → соседи могут быть дальше
+    # (полный альбом — уже весь здесь)
+    while len(album) < ALBUM_MAX and album[0].id - lo < ALBUM_EDGE and lo > 1:
+        new_lo = max(1, lo - 2 * ALBUM_WINDOW - 1)
+        await _fetch(range(new_lo, lo))
+        lo = new_lo
+        album = _album()
+
+    while len(album) < ALBUM_MAX and hi - album[-1].id < ALBUM_EDGE:
+        new_hi = hi + 2 * ALBUM_WINDOW + 1
+        await _fetch(range(hi + 1, new_hi + 1))
+        hi = new_hi
+        album = _album()
+
+    for m in album:
+        album_index.observe(peer_id, m)
+    album_index.flush()
+
+    yield album
+
+
+async def _last_n_start(
+    client,
+    source_peer,
+    last_n: int,
+    source_topic_id: Optional[int] = None,
+    min_id: Optional[int] = None,
+) -> Optional[int]:
+    """
+    id первого сообщения N-го с конца поста (альбом = один пост).
+
+    Лёгкий скан новые → старые сырыми страницами истории: смотрим только
+    id и grouped_id, Message-объекты не собираются и не копятся —
+    память не зависит от N.
+
+    min_id: уже отправленные посты не считаем (скан до min_id).
+    None — постов нет.
+    """
+    peer = await client.get_input_entity(source_peer)
+    peer_id = utils.get_peer_id(source_peer)
+
+    posts = 0
+    last_gid = None
+    start_id = None
+    offset_id = 0
+
+    while True:
+        if source_topic_id:
+            request = GetRepliesRequest(
+                peer=peer,
+                msg_id=source_topic_id,
+                offset_id=offset_id,
+                offset_date=None,
+                add_offset=0,
+                limit=LAST_N_PAGE,
+                max_id=0,
+                min_id=0,
+                hash=0,
+            )
+        else:
+            request = GetHistoryRequest(
+                peer=peer,
+                offset_id=offset_id,
+                offset_date=None,
+                add_offset=0,
+                limit=LAST_N_PAGE,
+                max_id=0,
+                min_id=0,
+                hash=0,
+            )
+
+        page = (await client(request)).messages
+        if not page or page[-1].id == offset_id:
+            return start_id
+
+        for m in page:
+            if min_id and m.id <= min_id:
+                return start_id
 
-    # Альбомы компактные; берём окно вокруг id и собираем по grouped_id
-    async for m in client.iter_messages(
-        source_peer,
-        min_id=post_id - 20,
-        max_id=post_id + 20,
-    ):
-        if isinstance(m, MessageService):
-            continue
-        if getattr(m, "grouped_id", None) == gid:
-            album.append(m)
+            if not isinstance(m, Message):  # service / empty
+                continue
+
+            album_index.observe(peer_id, m)
+            gid = m.grouped_id
 
-    if album:
-        yield sorted(album, key=lambda m: m.id)
+            # ---------- продолжение альбома ----------
+            if gid is not None and gid == last_gid:
+                start_id = m.id
+                continue
+
+            # ---------- новый пост ----------
+            if posts >= last_n:
+                return start_id
+
+            posts += 1
+            last_gid = gid
+            start_id = m.id
+
+        offset_id = page[-1].id
 
 
 # ------------------------------------------------------
@@ -91,6 +215,9 @@ async def iter_posts(
     source_peer,
     post_id: Optional[int] = None,        # ← msg_id из resolve_source(SOURCE)
     source_topic_id: Optional[int] = None, # ← ДОБАВИЛИ (topic/thread id для forum)
+    min_id: Optional[int] = None,          # продолжить после этого id (checkpoint)
+    max_id: Optional[int] = None,          # только посты с id < max_id (live: пропуск)
+    pace: Optional[Callable[[], float]] = None,  # пауза перед следующей страницей истории
 ) -> AsyncIterator[Post]:
     """
     Итератор постов (streaming):
@@ -102,9 +229,22 @@ async def iter_posts(
       - date_range
       - last_n   (N последних постов всего чата, с учётом альбомов)
       - post_id
+      - live     (здесь — как all: догоняем историю, дальше события — forwarding.live)
+
+    min_id (кроме post_id): отдаются только посты с id > min_id,
+    история запрашивается сразу с этой точки, без повторного скана.
+
+    date_range: чтение начинается сразу с DATE_FROM (offset_date или
+    граница из date_index) и заканчивается на первом сообщении после DATE_TO.
+
+    Страницы истории идут без пауз telethon (wait_time=0): темп задаёт
+    core.ratelimit, а pace() (forwarding.readahead) — сколько ждать перед
+    следующей страницей, если потребитель не успевает.
     """
 
-    mode = (settings.FORWARD_MODE or "all").lower().strip()
+    job = current_job()
+
+    mode = (job.mode or "all").lower().strip()
     if mode not in {"all", "date_range", "last_n", "post_id"}:
         mode = "all"
 
@@ -128,35 +268,101 @@ async def iter_posts(
     # --------------------------------------------------
     # FILTER PARAMS
     # --------------------------------------------------
-    dt_from = _parse_dt(settings.DATE_FROM) if mode == "date_range" else None
-    dt_to   = _parse_dt(settings.DATE_TO)   if mode == "date_range" else None
-    last_n  = int(settings.LAST_N_MESSAGES or 0) if mode == "last_n" else None
+    dt_from = _parse_dt(job.date_from) if mode == "date_range" else None
+    dt_to   = _parse_dt(job.date_to)   if mode == "date_range" else None
+    last_n  = int(job.last_n or 0) if mode == "last_n" else None
 
     # --------------------------------------------------
-    # LAST_N MODE — берём N последних постов (с конца чата)
+    # LAST_N MODE — находим начало N последних постов,
+    # дальше обычный поток старые → новые
     # --------------------------------------------------
     if mode == "last_n":
         if not last_n or last_n <= 0:
             return
 
-        collected: List[Post] = []
+        start_id = await _last_n_start(
+            client,
+            source_peer,
+            last_n,
+            source_topic_id=source_topic_id,
+            min_id=min_id,
+        )
+        if start_id is None:
+            return
 
-        current_gid = None
-        album_buf: List[Message] = []
+        min_id = max(min_id or 0, start_id - 1)
 
-        iter_kwargs = {
-            "reverse": False,  # новые → старые
-            "limit": None,
-        }
-        if source_topic_id:
-            iter_kwargs["reply_to"] = source_topic_id  # ← ДОБАВИЛИ
+    # --------------------------------------------------
+    # STREAM MESSAGES (all / date_range / last_n)
+    # --------------------------------------------------
+    current_gid = None
+    album_buf: List[Message] = []
+
+    peer_id = utils.get_peer_id(source_peer)
+
+    iter_kwargs = {
+        "reverse": True,  # старые → новые
+        "limit": None,
+        "wait_time": 0,   # иначе telethon спит 1 s между страницами (limit=None)
+    }
+    if source_topic_id:
+        iter_kwargs["reply_to"] = source_topic_id  # ← ДОБАВИЛИ
+
+    known_min = known_max = None
+
+    if mode == "date_range":
+        # известные по прошлым сканам границы по id (date_index)
+        known_min, known_max = date_index.bounds(peer_id, dt_from, dt_to)
+        if known_max:
+            iter_kwargs["max_id"] = known_max
+
+    if max_id:
+        iter_kwargs["max_id"] = min(max_id, iter_kwargs.get("max_id") or max_id)
+
+    start_id = max(min_id or 0, known_min or 0)
+
+    if start_id:
+        iter_kwargs["min_id"] = start_id  # reverse=True: начинаем сразу после min_id
+    elif dt_from:
+        # seek сразу к DATE_FROM, без скана всей истории
+        # (минута запаса: граница offset_date у Telegram exclusive)
+        iter_kwargs["offset_date"] = dt_from - timedelta(minutes=1)
+
+    # читаем с начала диапазона (а не с checkpoint) → первое сообщение
+    # не раньше DATE_FROM и есть его граница для date_index
+    first_in_range = (
+        mode == "date_range"
+        and dt_from is not None
+        and start_id == (known_min or 0)
+    )
+
+    history = client.iter_messages(source_peer, **iter_kwargs)
+
+    try:
+        async for msg in history:
+            if pace is not None:
+                history.wait_time = pace()
+
+            date_index.observe(peer_id, msg)
+            album_index.observe(peer_id, msg)
+
+            # первое сообщение не раньше DATE_FROM: всё до него — раньше
+            if first_in_range and _normalize_dt(msg.date) >= dt_from:
+                first_in_range = False
+                date_index.mark_before(peer_id, msg.id - 1, dt_from)
 
-        async for msg in client.iter_messages(source_peer, **iter_kwargs):
             if isinstance(msg, MessageService):
                 continue
 
             gid = getattr(msg, "grouped_id", None)
 
+            # ---------- после DATE_TO дальше не читаем ----------
+            # (кроме хвоста альбома, который начался внутри диапазона)
+            in_album = current_gid is not None and gid == current_gid
+            if dt_to and not in_album and _normalize_dt(msg.date) > dt_to:
+                date_index.observe(peer_id, msg, force=True)
+                break
+
             # ---------- продолжаем альбом ----------
             if current_gid is not None:
                 if gid == current_gid:
@@ -164,9 +370,12 @@ async def iter_posts(
                     continue
                 else:
                     album = sorted(album_buf, key=lambda m: m.id)
-                    collected.append(album)
-                    if len(collected) >= last_n:
-                        break
+
+                    if mode != "date_range" or any(
+                        _in_range(m, dt_from, dt_to) for m in album
+                    ):
+                        yield album
+
                     album_buf = []
                     current_gid = None
 
@@ -176,68 +385,15 @@ async def iter_posts(
                 album_buf = [msg]
                 continue
 
-            # ---------- одиночное ----------
-            collected.append(msg)
-            if len(collected) >= last_n:
-                break
-
-        # Если вышли из цикла посреди альбома — добьём его
-        if len(collected) < last_n and current_gid and album_buf:
-            album = sorted(album_buf, key=lambda m: m.id)
-            collected.append(album)
-
-        # Мы собирали новые→старые, а отдавать хотим старые→новые
-        for p in reversed(collected):
-            yield p
-
-        return
-
-    # --------------------------------------------------
-    # STREAM MESSAGES (all / date_range)
-    # --------------------------------------------------
-    current_gid = None
-    album_buf: List[Message] = []
-
-    iter_kwargs = {
-        "reverse": True,  # старые → новые
-        "limit": None,
-    }
-    if source_topic_id:
-        iter_kwargs["reply_to"] = source_topic_id  # ← ДОБАВИЛИ
-
-    async for msg in client.iter_messages(source_peer, **iter_kwargs):
-        if isinstance(msg, MessageService):
-            continue
-
-        gid = getattr(msg, "grouped_id", None)
-
-        # ---------- продолжаем альбом ----------
-        if current_gid is not None:
-            if gid == current_gid:
-                album_buf.append(msg)
+            # ---------- одиночное сообщение ----------
+            if mode == "date_range" and not _in_range(msg, dt_from, dt_to):
                 continue
-            else:
-                album = sorted(album_buf, key=lambda m: m.id)
-
-                if mode != "date_range" or any(
-                    _in_range(m, dt_from, dt_to) for m in album
-                ):
-                    yield album
-
-                album_buf = []
-                current_gid = None
 
-        # ---------- начинаем альбом ----------
-        if gid is not None:
-            current_gid = gid
-            album_buf = [msg]
-            continue
+            yield msg
 
-        # ---------- одиночное сообщение ----------
-        if mode == "date_range" and not _in_range(msg, dt_from, dt_to):
-            continue
-
-        yield msg
+    finally:
+        date_index.flush()
+        album_index.flush()
 
     # --------------------------------------------------
     # FLUSH LAST ALBUM
@@ -0,0 +1,117 @@
+from telethon.errors import FloodWaitError, RPCError
+
+from config.settings import MEDIA_BY_REFERENCE
+from core.ids_map import id_map
+from core.logger import logger
+from core.media_registry import media_registry
+
+from forwarding.media_sender import send_media_ref, send_text
+from forwarding.reply_handler import ReplyCtx
+from forwarding.handlers.media_utils import input_media_ref
+
+from utils.caption_policy import apply_caption_policy
+
+
+def _media_ref(msg, spoiler: bool = False):
+    """
+    Ссылка на файл для отправки без download + upload:
+      1) файл, который уже ушёл в предыдущий target (TARGETS)
+      2) файл самого source-сообщения (MEDIA_BY_REFERENCE, без noforwards)
+    """
+    media = media_registry.ref_for(msg, spoiler=spoiler)
+    if media is None and MEDIA_BY_REFERENCE:
+        media = input_media_ref(msg, spoiler=spoiler)
+    return media
+
+
+def can_send_by_reference(msg) -> bool:
+    """Можно ли отправить media без download + upload."""
+    return _media_ref(msg) is not None
+
+
+async def send_by_reference(
+    msg,
+    final_text,
+    final_entities,
+    reply_ctx,
+    target_chat,
+    log_tag: str,
+    spoiler: bool = False,
+):
+    """
+    Общий путь PHOTO / VIDEO / VOICE / DOCUMENT для незащищённых источников
+    (и для второго и следующих TARGETS): media отправляется по ссылке
+    на уже существующий файл — один RPC на пост.
+
+    Возвращает:
+        - sent → пост отправлен (id map, extra text — уже сделаны)
+        - None → так нельзя (защищённый источник, ошибка RPC),
+                 handler идёт обычным путём download + upload
+    """
+    media = _media_ref(msg, spoiler=spoiler)
+    if media is None:
+        return None
+
+    # -------------------------------------------------
+    # APPLY CAPTION POLICY
+    # -------------------------------------------------
+    base_text = msg.message or ""
+
+    text_data = {
+        "final_text": final_text,
+        "final_entities": final_entities,
+        "base_text": base_text,
+        "base_entities": msg.entities or [],
+        "header_text_len": len(final_text) - len(base_text),
+    }
+
+    caption, caption_entities, extra_text, extra_entities = apply_caption_policy(
+        text_data
+    )
+
+    # -------------------------------------------------
+    # SEND
+    # -------------------------------------------------
+    try:
+        sent = await send_media_ref(
+            chat_id=target_chat,
+            media=media,
+            caption=caption,
+            entities=caption_entities,
+            reply_ctx=reply_ctx,
+        )
+    except FloodWaitError:
+        raise
+    except RPCError as e:
+        logger.warning(
+            f"{log_tag} │ re-send by reference failed "
+            f"({e.__class__.__name__}), falling back to upload"
+        )
+        media_registry.forget(msg)
+        return None
+
+    if not sent:
+        return None
+
+    id_map[msg.id] = sent.id
+    media_registry.remember_sent(msg, sent)
+    logger.info(f"{log_tag} │ sent by reference")
+
+    # -------------------------------------------------
+    # SEND EXTRA TEXT BELOW (IF ANY)
+    # -------------------------------------------------
+    # всегда reply на отправленное media (в topic — с top_msg_id)
+    if extra_text:
+        extra_reply_ctx = ReplyCtx(
+            reply_to_msg_id=sent.id,
+            top_msg_id=getattr(reply_ctx, "top_msg_id", None),
+        )
+
+        await send_text(
+            chat_id=target_chat,
+            text=extra_text,
+            entities=extra_entities,
+            reply_ctx=extra_reply_ctx,
+        )
+
+    return sent
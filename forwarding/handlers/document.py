@@ -3,11 +3,21 @@ import os
 from telethon.tl.types import MessageMediaDocument
 
 from core.ids_map import id_map
+from core.media_registry import media_registry
 from core.client import client
 from core.logger import logger, tag
 from core.progress import make_progress
+from core.transfer import upload_file
 
 from forwarding.media_sender import send_text  # ← ДОБАВИЛИ
+from forwarding.downloader import (
+    download_media,
+    media_size,
+    transfer_key,
+    upload_media,
+    wants_stream,
+)
+from forwarding.handlers.by_reference import send_by_reference
 
 from utils.media import (
     prepare_generic_file,
@@ -16,7 +26,7 @@ from utils.media import (
 
 from utils.caption_policy import apply_caption_policy
 
-from config.settings import DOWNLOAD_DIR, DELETE_FILES_AFTER_SEND
+from config.settings import DELETE_FILES_AFTER_SEND
 
 
 async def handle_document(
@@ -40,11 +50,11 @@ async def handle_document(
     # -------------------------------------------------
     # TYPE CHECK (защита)
     # -------------------------------------------------
-    if not isinstance(msg.media, MessageMediaDocument):
-        return None
-
     file_tag = tag("FILE", msg.id)
 
+    if not isinstance(msg.media, MessageMediaDocument):
+        raise RuntimeError(f"{file_tag} │ wrong media type")
+
     # -------------------------------------------------
     # ORIGINAL NAME
     # -------------------------------------------------
@@ -55,30 +65,65 @@ async def handle_document(
     )
 
     # -------------------------------------------------
-    # DOWNLOAD (UI progress)
+    # RE-SEND BY REFERENCE (source без noforwards)
     # -------------------------------------------------
-    tmp_path = os.path.join(DOWNLOAD_DIR, f"tmp_{msg.id}")
-
-    dl_progress, dl_finish = make_progress(
-        f"{file_tag} │ downloading"
+    sent = await send_by_reference(
+        msg,
+        final_text,
+        final_entities,
+        reply_ctx,
+        target_chat,
+        file_tag,
     )
+    if sent:
+        return sent
 
-    raw_path = await msg.download_media(
-        file=tmp_path,
-        thumb=None,
-        progress_callback=dl_progress,
-    )
+    # -------------------------------------------------
+    # STREAM (source → target без диска)
+    # -------------------------------------------------
+    uploaded = None
+    raw_path = None
 
-    if not raw_path:
-        logger.warning(f"{file_tag} │ download failed")
-        return None
+    if wants_stream(msg):
+        st_progress, st_finish = make_progress(
+            f"{file_tag} │ streaming"
+        )
 
-    dl_time = dl_finish()
-    size_mb = os.path.getsize(raw_path) / (1024 * 1024)
+        uploaded = await upload_media(
+            msg,
+            progress_callback=st_progress,
+        )
 
-    logger.info(
-        f"{file_tag} │ download ({size_mb:.1f} MB, {dl_time:.1f} s)"
-    )
+        st_time = st_finish()
+        size_mb = media_size(msg) / (1024 * 1024)
+
+        if uploaded:
+            logger.info(
+                f"{file_tag} │ stream ({size_mb:.1f} MB, {st_time:.1f} s)"
+            )
+
+    # -------------------------------------------------
+    # DOWNLOAD (UI progress) — если потоком нельзя
+    # -------------------------------------------------
+    if uploaded is None:
+        dl_progress, dl_finish = make_progress(
+            f"{file_tag} │ downloading"
+        )
+
+        raw_path = await download_media(
+            msg,
+            progress_callback=dl_progress,
+        )
+
+        if not raw_path:
+            raise RuntimeError(f"{file_tag} │ download failed")
+
+        dl_time = dl_finish()
+        size_mb = os.path.getsize(raw_path) / (1024 * 1024)
+
+        logger.info(
+            f"{file_tag} │ download ({size_mb:.1f} MB, {dl_time:.1f} s)"
+        )
 
     media = None
     sent = None
@@ -87,10 +132,11 @@ async def handle_document(
         # -------------------------------------------------
         # PREPARE FILE
         # -------------------------------------------------
-        media = prepare_generic_file(
-            path=raw_path,
-            original_name=original_name,
-        )
+        if raw_path:
+            media = prepare_generic_file(
+                path=raw_path,
+                original_name=original_name,
+            )
 
         # -------------------------------------------------
         # APPLY CAPTION POLICY
@@ -120,20 +166,29 @@ async def handle_document(
         if reply_ctx:
             send_reply_to = reply_ctx.reply_to_msg_id or reply_ctx.top_msg_id
 
+        # disk path: заливаем сами — параллельно и с докачкой по частям
+        if uploaded is None:
+            uploaded = await upload_file(
+                media.path,
+                file_name=media.original_name,
+                progress_callback=ul_progress,
+                key=transfer_key(msg, "up"),
+            )
+
         sent = await client.send_file(
             target_chat,
-            media.path,
+            uploaded,  # InputFile (stream или disk)
             caption=caption,
             formatting_entities=caption_entities,
             reply_to=send_reply_to,
             force_document=True,
-            progress_callback=ul_progress,
         )
 
         ul_time = ul_finish()
 
         if sent:
             id_map[msg.id] = sent.id
+            media_registry.remember_sent(msg, sent)
 
         logger.info(
             f"{file_tag} │ sent ({size_mb:.1f} MB, {ul_time:.1f} s)"
@@ -167,4 +222,5 @@ async def handle_document(
         if DELETE_FILES_AFTER_SEND:
             if media and media.path:
                 cleanup_file(media.path)
-            cleanup_file(raw_path)
+            if raw_path:
+                cleanup_file(raw_path)
@@ -7,6 +7,12 @@ from telethon.tl.types import (
     DocumentAttributeAudio,
     DocumentAttributeSticker,
     DocumentAttributeVideo,
+    Photo,
+    Document,
+    InputPhoto,
+    InputDocument,
+    InputMediaPhoto,
+    InputMediaDocument,
 )
 
 
@@ -143,6 +149,65 @@ def detect_media_kind(msg) -> str:
     return "OTHER"
 
 
+# ============================================================
+# RE-SEND BY REFERENCE (без download + upload)
+# ============================================================
+
+def is_protected(msg) -> bool:
+    """
+    Источник запрещает пересылку / сохранение контента (noforwards):
+    флаг стоит либо на сообщении, либо на самом чате.
+    """
+    if getattr(msg, "noforwards", False):
+        return True
+
+    chat = getattr(msg, "chat", None)
+    return bool(getattr(chat, "noforwards", False))
+
+
+def input_media_ref(msg, spoiler: bool = False):
+    """
+    InputMediaPhoto / InputMediaDocument, ссылающийся на файл,
+    который уже лежит на серверах Telegram (как handle_sticker).
+
+    None — если так отправить нельзя:
+      - источник защищён (noforwards)
+      - media с таймером самоуничтожения
+      - не фото / не документ
+    """
+    if is_protected(msg):
+        return None
+
+    media = getattr(msg, "media", None)
+
+    if getattr(media, "ttl_seconds", None):
+        return None
+
+    if isinstance(media, MessageMediaPhoto) and isinstance(media.photo, Photo):
+        photo = media.photo
+        return InputMediaPhoto(
+            id=InputPhoto(
+                id=photo.id,
+                access_hash=photo.access_hash,
+                file_reference=photo.file_reference,
+            ),
+            spoiler=spoiler,
+        )
+
+    if isinstance(media, MessageMediaDocument) and isinstance(media.document, Document):
+        doc = media.document
+        return InputMediaDocument(
+            id=InputDocument(
+                id=doc.id,
+                access_hash=doc.access_hash,
+                file_reference=doc.file_reference,
+            ),
+            spoiler=spoiler,
+        )
+
+    return None
+
+
 # ============================================================
 # FILE HELPERS (names only)
 # ============================================================
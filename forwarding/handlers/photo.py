@@ -1,20 +1,23 @@
 import os
 
 from core.ids_map import id_map
+from core.media_registry import media_registry
 from core.client import client
 from forwarding.media_sender import send_photo, send_text  # ← ДОБАВИЛИ send_text
+from forwarding.downloader import download_media
+from forwarding.handlers.by_reference import send_by_reference
 
 from core.logger import logger, tag
 
 from utils.media import (
     is_media_spoiler,
-    prepare_image_file,
+    prepare_image,
     cleanup_file,
 )
 
 from utils.caption_policy import apply_caption_policy
 
-from config.settings import DOWNLOAD_DIR, DELETE_FILES_AFTER_SEND
+from config.settings import DELETE_FILES_AFTER_SEND
 
 
 async def handle_photo(
@@ -48,18 +51,27 @@ async def handle_photo(
     )
 
     # -------------------------------------------------
-    # DOWNLOAD (NO UI PROGRESS)
+    # RE-SEND BY REFERENCE (source без noforwards)
     # -------------------------------------------------
-    tmp_path = os.path.join(DOWNLOAD_DIR, f"tmp_{msg.id}")
-
-    raw_path = await msg.download_media(
-        file=tmp_path,
-        thumb=None,
+    sent = await send_by_reference(
+        msg,
+        final_text,
+        final_entities,
+        reply_ctx,
+        target_chat,
+        photo_tag,
+        spoiler=spoiler,
     )
+    if sent:
+        return sent
+
+    # -------------------------------------------------
+    # DOWNLOAD (NO UI PROGRESS)
+    # -------------------------------------------------
+    raw_path = await download_media(msg)
 
     if not raw_path:
-        logger.warning(f"{photo_tag} │ download failed")
-        return None
+        raise RuntimeError(f"{photo_tag} │ download failed")
 
     size_mb = os.path.getsize(raw_path) / (1024 * 1024)
 
@@ -74,7 +86,7 @@ async def handle_photo(
         # -------------------------------------------------
         # PREPARE IMAGE
         # -------------------------------------------------
-        media = prepare_image_file(
+        media = await prepare_image(
             path=raw_path,
             original_name=original_name,
         )
@@ -111,6 +123,7 @@ async def handle_photo(
 
         if sent:
             id_map[msg.id] = sent.id
+            media_registry.remember_sent(msg, sent)
 
         logger.info(
             f"{photo_tag} │ sent ({size_mb:.1f} MB)"
@@ -1,8 +1,17 @@
 import os
 
 from core.ids_map import id_map
+from core.media_registry import media_registry
 from core.client import client
 from forwarding.media_sender import send_video  # ничего не меняем: extra_text оставляем через client.send_message
+from forwarding.downloader import (
+    download_media,
+    media_size,
+    transfer_key,
+    upload_media,
+    wants_stream,
+)
+from forwarding.handlers.by_reference import send_by_reference
 
 from core.logger import logger, tag
 from core.progress import make_progress
@@ -15,7 +24,7 @@ from utils.media import (
 
 from utils.caption_policy import apply_caption_policy
 
-from config.settings import DOWNLOAD_DIR, DELETE_FILES_AFTER_SEND
+from config.settings import DELETE_FILES_AFTER_SEND
 
 
 async def handle_video(
@@ -49,30 +58,66 @@ async def handle_video(
     )
 
     # -------------------------------------------------
-    # DOWNLOAD (UI progress)
+    # RE-SEND BY REFERENCE (source без noforwards)
     # -------------------------------------------------
-    tmp_path = os.path.join(DOWNLOAD_DIR, f"tmp_{msg.id}")
-
-    dl_progress, dl_finish = make_progress(
-        f"{video_tag} │ downloading"
+    sent = await send_by_reference(
+        msg,
+        final_text,
+        final_entities,
+        reply_ctx,
+        target_chat,
+        video_tag,
+        spoiler=spoiler,
     )
+    if sent:
+        return sent
 
-    raw_path = await msg.download_media(
-        file=tmp_path,
-        thumb=None,
-        progress_callback=dl_progress,
-    )
+    # -------------------------------------------------
+    # STREAM (source → target без диска)
+    # -------------------------------------------------
+    uploaded = None
+    raw_path = None
 
-    if not raw_path:
-        logger.warning(f"{video_tag} │ download failed")
-        return None
+    if wants_stream(msg):
+        st_progress, st_finish = make_progress(
+            f"{video_tag} │ streaming"
+        )
 
-    dl_time = dl_finish()
-    size_mb = os.path.getsize(raw_path) / (1024 * 1024)
+        uploaded = await upload_media(
+            msg,
+            progress_callback=st_progress,
+        )
 
-    logger.info(
-        f"{video_tag} │ download ({size_mb:.1f} MB, {dl_time:.1f} s)"
-    )
+        st_time = st_finish()
+        size_mb = media_size(msg) / (1024 * 1024)
+
+        if uploaded:
+            logger.info(
+                f"{video_tag} │ stream ({size_mb:.1f} MB, {st_time:.1f} s)"
+            )
+
+    # -------------------------------------------------
+    # DOWNLOAD (UI progress) — если потоком нельзя
+    # -------------------------------------------------
+    if uploaded is None:
+        dl_progress, dl_finish = make_progress(
+            f"{video_tag} │ downloading"
+        )
+
+        raw_path = await download_media(
+            msg,
+            progress_callback=dl_progress,
+        )
+
+        if not raw_path:
+            raise RuntimeError(f"{video_tag} │ download failed")
+
+        dl_time = dl_finish()
+        size_mb = os.path.getsize(raw_path) / (1024 * 1024)
+
+        logger.info(
+            f"{video_tag} │ download ({size_mb:.1f} MB, {dl_time:.1f} s)"
+        )
 
     media = None
     sent = None
@@ -81,10 +126,11 @@ async def handle_video(
         # -------------------------------------------------
         # PREPARE FILE
         # -------------------------------------------------
-        media = prepare_generic_file(
-            path=raw_path,
-            original_name=original_name,
-        )
+        if raw_path:
+            media = prepare_generic_file(
+                path=raw_path,
+                original_name=original_name,
+            )
 
         # -------------------------------------------------
         # APPLY CAPTION POLICY
@@ -112,19 +158,22 @@ async def handle_video(
 
         sent = await send_video(
             chat_id=target_chat,
-            path=media.path,
-            original_name=media.original_name,
+            path=media.path if media else None,
+            original_name=media.original_name if media else original_name,
             caption=caption,
             entities=caption_entities,
             reply_ctx=reply_ctx,
             spoiler=spoiler,
             progress_callback=ul_progress,
+            uploaded=uploaded,
+            upload_key=transfer_key(msg, "up"),
         )
 
         ul_time = ul_finish()
 
         if sent:
             id_map[msg.id] = sent.id
+            media_registry.remember_sent(msg, sent)
 
         logger.info(
             f"{video_tag} │ sent ({size_mb:.1f} MB, {ul_time:.1f} s)"
@@ -150,4 +199,5 @@ async def handle_video(
         if DELETE_FILES_AFTER_SEND:
             if media and media.path:
                 cleanup_file(media.path)
-            cleanup_file(raw_path)
+            if raw_path:
+                cleanup_file(raw_path)
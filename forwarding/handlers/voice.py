@@ -3,10 +3,13 @@ import os
 from telethon.tl.types import MessageMediaDocument, DocumentAttributeAudio
 
 from core.ids_map import id_map
+from core.media_registry import media_registry
 from core.client import client
 from core.logger import logger, tag
 
 from forwarding.media_sender import send_voice  # extra_text оставляем через client.send_message
+from forwarding.downloader import download_media, media_size, transfer_key, upload_media
+from forwarding.handlers.by_reference import send_by_reference
 
 from utils.media import (
     is_media_spoiler,
@@ -16,7 +19,7 @@ from utils.media import (
 
 from utils.caption_policy import apply_caption_policy
 
-from config.settings import DOWNLOAD_DIR, DELETE_FILES_AFTER_SEND
+from config.settings import DELETE_FILES_AFTER_SEND
 
 
 async def handle_voice(
@@ -48,8 +51,7 @@ async def handle_voice(
     # TYPE CHECK
     # -------------------------------------------------
     if not isinstance(msg.media, MessageMediaDocument):
-        logger.warning(f"{voice_tag} │ wrong media type")
-        return None
+        raise RuntimeError(f"{voice_tag} │ wrong media type")
 
     doc = msg.media.document
 
@@ -66,8 +68,7 @@ async def handle_voice(
             break
 
     if not is_voice:
-        logger.warning(f"{voice_tag} │ not a voice message")
-        return None
+        raise RuntimeError(f"{voice_tag} │ not a voice message")
 
     # -------------------------------------------------
     # SPOILER (для закрытых каналов)
@@ -84,18 +85,34 @@ async def handle_voice(
     )
 
     # -------------------------------------------------
-    # DOWNLOAD (NO PROGRESS)
+    # RE-SEND BY REFERENCE (source без noforwards)
     # -------------------------------------------------
-    tmp_path = os.path.join(DOWNLOAD_DIR, f"tmp_{msg.id}")
-
-    raw_path = await msg.download_media(
-        file=tmp_path,
-        thumb=None,
+    sent = await send_by_reference(
+        msg,
+        final_text,
+        final_entities,
+        reply_ctx,
+        target_chat,
+        voice_tag,
+        spoiler=spoiler,
     )
+    if sent:
+        return sent
+
+    # -------------------------------------------------
+    # STREAM (source → target без диска, NO PROGRESS)
+    # -------------------------------------------------
+    raw_path = None
+    uploaded = await upload_media(msg)
 
-    if not raw_path:
-        logger.warning(f"{voice_tag} │ download failed")
-        return None
+    # -------------------------------------------------
+    # DOWNLOAD (NO PROGRESS) — если потоком нельзя
+    # -------------------------------------------------
+    if uploaded is None:
+        raw_path = await download_media(msg)
+
+        if not raw_path:
+            raise RuntimeError(f"{voice_tag} │ download failed")
 
     media = None
     sent = None
@@ -104,10 +121,11 @@ async def handle_voice(
         # -------------------------------------------------
         # PREPARE FILE
         # -------------------------------------------------
-        media = prepare_generic_file(
-            path=raw_path,
-            original_name=original_name,
-        )
+        if raw_path:
+            media = prepare_generic_file(
+                path=raw_path,
+                original_name=original_name,
+            )
 
         # -------------------------------------------------
         # APPLY CAPTION POLICY
@@ -131,17 +149,20 @@ async def handle_voice(
         # -------------------------------------------------
         sent = await send_voice(
             chat_id=target_chat,
-            path=media.path,
-            original_name=media.original_name,
+            path=media.path if media else None,
+            original_name=media.original_name if media else original_name,
             caption=caption,
             entities=caption_entities,
             reply_ctx=reply_ctx,
             spoiler=spoiler,
             duration=duration,
+            uploaded=uploaded,
+            upload_key=transfer_key(msg, "up"),
         )
 
         if sent:
             id_map[msg.id] = sent.id
+            media_registry.remember_sent(msg, sent)
 
         # -------------------------------------------------
         # SEND EXTRA TEXT BELOW (IF ANY)
@@ -157,7 +178,8 @@ async def handle_voice(
         # -------------------------------------------------
         # FINAL LOG
         # -------------------------------------------------
-        size_mb = os.path.getsize(media.path) / (1024 * 1024)
+        size_bytes = os.path.getsize(media.path) if media else media_size(msg)
+        size_mb = size_bytes / (1024 * 1024)
 
         logger.info(
             f"{voice_tag} │ sent ({size_mb:.1f} MB)"
@@ -172,4 +194,5 @@ async def handle_voice(
         if DELETE_FILES_AFTER_SEND:
             if media and media.path:
                 cleanup_file(media.path)
-            cleanup_file(raw_path)
+            if raw_path:
+                cleanup_file(raw_path)
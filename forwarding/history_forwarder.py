@@ -1,16 +1,50 @@
 import asyncio
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import Optional
 
+from telethon import utils
 from telethon.tl.types import MessageService
 from telethon.errors import FloodWaitError
 
 from core.client import client
+from core.ids_map import ScopedIdMap, bind_id_map, store, use_id_map
+from core.checkpoint import Checkpoint, make_job_key
+from core.album_targets import album_targets
+from core.edit_marks import edit_marks
+from core.fingerprints import fingerprints
+from core.job import current_job
+from core.media_registry import media_registry
+from core.shutdown import request_stop, stop_requested
 from core.logger import logger
 from core.progress import make_progress
 
-from config.settings import FORWARD_MODE
+from config.settings import (
+    RESUME,
+    PREFETCH_POSTS,
+    PREFETCH_MAX_MB,
+    HISTORY_READAHEAD,
+    HISTORY_READAHEAD_MB,
+    SYNC_EDITS,
+    DEDUP,
+)
 
+from forwarding import dedup
 from forwarding.filters import iter_posts
+from forwarding.prefetch import prefetch_posts
+from forwarding.readahead import HistoryReader
+from forwarding.live import Deleted, Edited, iter_live_posts
+from forwarding.sync import (
+    edit_ts,
+    remember_edit,
+    remember_sent,
+    sync_delete,
+    sync_edit,
+    sync_post,
+    text_msg,
+)
 from forwarding.album_forwarder import forward_album
+from forwarding.native_forwarder import NativeBatch, can_forward_natively
 from forwarding.message_builder import build_final_text
 from forwarding.reply_handler import handle_reply
 
@@ -36,23 +70,121 @@ from forwarding.handlers.media_utils import (
     is_web_preview,
 )
 
-# =========================================================
-# GLOBAL SEND DELAY (seconds)
-# =========================================================
-SEND_DELAY = 0.2
+@dataclass
+class _Target:
+    """Один target: своя id map, свой checkpoint, свой native-батч."""
+    chat: object
+    topic_id: Optional[int]
+    public_cid: int
+    ids: ScopedIdMap
+    checkpoint: Optional[Checkpoint] = None
+    native: Optional[NativeBatch] = None
+
+    def done(self, post) -> bool:
+        """Пост уже доставлен в этот target (по checkpoint)."""
+        if not self.checkpoint:
+            return False
+
+        last_id = _post_last_id(post)
+        if last_id <= self.checkpoint.last_id:
+            return True
+
+        # прошлый запуск ушёл дальше упавшего поста: то, что есть в id map,
+        # доставлено (кроме недоотправленного альбома — его части досылаются)
+        if not self.checkpoint.delivered_after(last_id):
+            return False
+        if isinstance(post, list) and self.checkpoint.album_parts(post[0].grouped_id):
+            return False
+        return text_msg(post).id in self.ids
+
+
+async def _make_target(source_chat, target_chat, target_topic_id, source_topic_id):
+    target_ent = await client.get_entity(target_chat)
+
+    # id map: source → target (+ topic), хранится в runtime и переживает
+    # перезапуски; недописанный батч сбрасывается и при аварийном выходе (atexit)
+    target = _Target(
+        chat=target_chat,
+        topic_id=target_topic_id,
+        public_cid=abs(getattr(target_ent, "id", target_chat)),
+        ids=bind_id_map(
+            utils.get_peer_id(source_chat),
+            utils.get_peer_id(target_ent),
+            target_topic_id,
+        ),
+    )
+
+    # =========================================================
+    # CHECKPOINT (RESUME AFTER CRASH / STOP)
+    # =========================================================
+    job = current_job()
+
+    if RESUME and job.mode != "post_id":
+        target.checkpoint = Checkpoint(
+            make_job_key(
+                utils.get_peer_id(source_chat),
+                source_topic_id,
+                utils.get_peer_id(target_ent),
+                target_topic_id,
+                job.mode,
+                _mode_params(job),
+            )
+        )
+
+        if target.checkpoint.last_id:
+            logger.info(
+                f"⏩ RESUME │ {target.public_cid}: continuing after message "
+                f"{target.checkpoint.last_id}"
+            )
+
+    # =========================================================
+    # NATIVE FORWARD (FORWARD_STRATEGY = "forward")
+    # =========================================================
+    if job.strategy == "forward":
+        target.native = NativeBatch(source_chat, target_chat, target_topic_id)
+
+    return target
 
 
 async def forward_history(
     source_chat,
-    target_chat,
+    target_chat=None,
     source_post_id=None,
     target_topic_id=None,   # нужно для forum topics (куда постить)
     source_topic_id=None,   # ← ДОБАВИЛИ (откуда читать, если SOURCE указывает topic)
+    targets=None,           # [(target_chat, target_topic_id), ...] — TARGETS
 ):
+    """
+    Пересылает историю source в один или несколько targets.
+
+    Каждый пост читается из source один раз и по очереди уходит во все
+    targets. Media качается и заливается только для первого из них,
+    остальные получают тот же файл по ссылке (core.media_registry).
+    """
     logger.info("🚀 FORWARD │ history started")
 
-    target_ent = await client.get_entity(target_chat)
-    public_cid = abs(getattr(target_ent, "id", target_chat))
+    if targets is None:
+        targets = [(target_chat, target_topic_id)]
+
+    targets = [
+        await _make_target(source_chat, chat, topic_id, source_topic_id)
+        for chat, topic_id in targets
+    ]
+
+    if len(targets) > 1:
+        logger.info(f"🎯 TARGETS │ {len(targets)} targets, media is transferred once")
+
+    # читаем с самого отстающего target; остальные пропускают уже
+    # доставленные им посты
+    checkpoints = [t.checkpoint for t in targets]
+    min_id = None
+    if all(checkpoints):
+        min_id = min(c.last_id for c in checkpoints) or None
+
+    # SYNC_EDITS (batch): диапазон читается целиком, уже отправленные
+    # посты сверяются по edit_date вместо повторной отправки
+    if SYNC_EDITS and current_job().mode not in {"live", "post_id"}:
+        min_id = None
 
     album_counter = 0
 
@@ -62,7 +194,7 @@ async def forward_history(
     prep_task = None
     prep_finish = None
 
-    if FORWARD_MODE in {"last_n", "date_range"}:
+    if current_job().mode in {"last_n", "date_range"}:
         progress, finish = make_progress(
             "Preparing data",
             spinner_only=True,
@@ -79,226 +211,43 @@ async def forward_history(
         prep_task = asyncio.create_task(_prepare_spinner())
         prep_finish = finish
 
-    # =========================================================
-    # MAIN LOOP — ITERATE POSTS, NOT MESSAGES
-    # =========================================================
-    async for post in iter_posts(
-        client,
-        source_chat,
-        post_id=source_post_id,
-        source_topic_id=source_topic_id,  # ← ДОБАВИЛИ
-    ):
-        # -----------------------------------------------------
-        # STOP PREPARING SPINNER BEFORE FIRST REAL SEND
-        # -----------------------------------------------------
-        if prep_task:
-            prep_task.cancel()
-            prep_finish()
-            prep_task = None
-            prep_finish = None
-
+    # ---------------------------------------------------------
+    # ONE POST THROUGH HANDLERS
+    # ---------------------------------------------------------
+    async def _send_post(target, post, album_no):
         try:
-            # ⏱ GLOBAL DELAY BEFORE ANY SEND OPERATION
-            await asyncio.sleep(SEND_DELAY)
+            # темп запросов и FloodWait — в core.ratelimit (client)
 
             # =================================================
             # ALBUM = SINGLE POST
             # =================================================
             if isinstance(post, list):
-                album_counter += 1
                 await forward_album(
                     post,
-                    public_cid,
-                    album_counter,
-                    target_chat,
-                    target_topic_id=target_topic_id,  # ← ДОБАВИЛИ (ВАЖНО для topic)
+                    target.public_cid,
+                    album_no,
+                    target.chat,
+                    target_topic_id=target.topic_id,  # ← ДОБАВИЛИ (ВАЖНО для topic)
+                    checkpoint=target.checkpoint,
                 )
-                continue
 
             # =================================================
             # SINGLE MESSAGE
             # =================================================
-            msg = post
-
-            if isinstance(msg, MessageService):
-                continue
-
-            # -------------------------------------------------
-            # REPLY / QUOTE / ANCHOR
-            # -------------------------------------------------
-            reply_ctx, quote_text, quote_entities = await handle_reply(
-                msg,
-                public_cid,
-                target_chat,
-                target_topic_id=target_topic_id,  # ← ВАЖНО: прокидываем topic id
-            )
-
-            # -------------------------------------------------
-            # BUILD FINAL TEXT
-            # -------------------------------------------------
-            text_data = await build_final_text(
-                msg,
-                quote_text,
-                quote_entities,
-                client,
-            )
-
-            final_text = text_data["final_text"]
-            final_entities = text_data["final_entities"]
-
-            # -------------------------------------------------
-            # POLL
-            # -------------------------------------------------
-            if is_poll(msg):
-                await handle_poll(
-                    msg,
-                    final_text,
-                    final_entities,
-                    reply_ctx,  # ← было reply_new_id
-                    target_chat,
-                    target_topic_id=target_topic_id,
-                )
-                continue
-
-            # -------------------------------------------------
-            # PAID CONTENT
-            # -------------------------------------------------
-            if is_paid(msg):
-                paid_result = await handle_paid(
-                    msg,
-                    final_text,
-                    final_entities,
-                    reply_ctx,  # ← было reply_new_id
-                    target_chat,
-                    target_topic_id=target_topic_id,
-                )
-                if paid_result is None:
-                    continue
-                msg = paid_result
-
-            kind = detect_media_kind(msg)
-
-            # -------------------------------------------------
-            # TEXT
-            # -------------------------------------------------
-            if kind == "TEXT":
-                await handle_text(
-                    msg,
-                    final_text,
-                    final_entities,
-                    reply_ctx,  # ← было reply_new_id
-                    target_chat,
-                    target_topic_id=target_topic_id,
-                )
-                continue
-
-            # -------------------------------------------------
-            # WEB PREVIEW
-            # -------------------------------------------------
-            if is_web_preview(msg):
-                await handle_web_preview(
-                    msg,
-                    final_text,
-                    final_entities,
-                    reply_ctx,  # ← было reply_new_id
-                    target_chat,
-                    target_topic_id=target_topic_id,
-                )
-                continue
-
-            # -------------------------------------------------
-            # STICKER
-            # -------------------------------------------------
-            if is_sticker(msg):
-                await handle_sticker(
-                    msg,
-                    final_text,
-                    final_entities,
-                    reply_ctx,  # ← было reply_new_id
-                    target_chat,
-                    target_topic_id=target_topic_id,
-                )
-                continue
-
-            # -------------------------------------------------
-            # VOICE
-            # -------------------------------------------------
-            is_voice_flag, _ = is_voice(msg)
-            if is_voice_flag:
-                await handle_voice(
-                    msg,
-                    final_text,
-                    final_entities,
-                    reply_ctx,  # ← было reply_new_id
-                    target_chat,
-                    target_topic_id=target_topic_id,
-                )
-                continue
-
-            # -------------------------------------------------
-            # PHOTO
-            # -------------------------------------------------
-            if kind == "PHOTO":
-                await handle_photo(
-                    msg,
-                    final_text,
-                    final_entities,
-                    reply_ctx,  # ← было reply_new_id
-                    target_chat,
-                    target_topic_id=target_topic_id,
-                )
-                continue
-
-            # -------------------------------------------------
-            # VIDEO
-            # -------------------------------------------------
-            if kind == "VIDEO":
-                sent = await handle_video(
-                    msg,
-                    final_text,
-                    final_entities,
-                    reply_ctx,  # ← было reply_new_id
-                    target_chat,
-                    target_topic_id=target_topic_id,
-                )
-                if sent:
-                    continue
-
-            # -------------------------------------------------
-            # DOCUMENT
-            # -------------------------------------------------
-            if kind == "DOCUMENT":
-                await handle_document(
-                    msg,
-                    final_text,
-                    final_entities,
-                    reply_ctx,  # ← было reply_new_id
-                    target_chat,
-                    target_topic_id=target_topic_id,
+            else:
+                await _forward_message(
+                    post,
+                    target.public_cid,
+                    target.chat,
+                    target_topic_id=target.topic_id,
                 )
-                continue
-
-            # -------------------------------------------------
-            # OTHER
-            # -------------------------------------------------
-            await handle_other(
-                msg,
-                final_text,
-                final_entities,
-                reply_ctx,  # ← было reply_new_id
-                target_chat,
-                target_topic_id=target_topic_id,
-            )
 
         # =====================================================
         # 🟥 FLOODWAIT
         # =====================================================
         except FloodWaitError as e:
-            logger.error(
-                f"🟥 FLOOD_WAIT │ Telegram требует подождать {e.seconds} секунд. "
-                f"Скрипт остановлен."
-            )
-            raise SystemExit(1)
+            _stop_on_flood(e)
+            return
 
         except Exception:
             if isinstance(post, list):
@@ -310,4 +259,466 @@ async def forward_history(
                 f"❌ FORWARD │ error processing post {post_id}"
             )
 
-    logger.info("🎉 FORWARD │ history completed")
+            # ошибка залогирована, пост пропущен — но в checkpoint он
+            # не попадает: следующий запуск с RESUME отправит его снова
+            if target.checkpoint:
+                target.checkpoint.fail()
+
+        else:
+            if SYNC_EDITS:
+                remember_sent(post, target)
+            if DEDUP:
+                dedup.remember(target, post)
+
+            if target.checkpoint:
+                target.checkpoint.commit(_post_last_id(post))
+
+    # ---------------------------------------------------------
+    # ACCUMULATED POSTS → ONE ForwardMessagesRequest
+    # ---------------------------------------------------------
+    async def _flush_native(target):
+        if target.native is None:
+            return
+
+        batch = target.native.take()
+        if not batch:
+            return
+
+        use_id_map(target.ids)
+
+        try:
+            await target.native.forward(batch)
+
+        except FloodWaitError as e:
+            _stop_on_flood(e)
+            return
+
+        except Exception as e:
+            # например, источник стал защищённым — шлём эти посты как обычно
+            logger.warning(
+                f"⚠️ FORWARD │ native forward failed ({e.__class__.__name__}), "
+                f"sending {len(batch)} posts via handlers"
+            )
+            for post in batch:
+                await _send_post(target, post, album_counter)
+                # FloodWait: checkpoint не должен уйти дальше недосланного поста
+                if stop_requested():
+                    break
+            return
+
+        for post in batch:
+            if SYNC_EDITS:
+                remember_sent(post, target, native=True)
+            if DEDUP:
+                dedup.remember(target, post)
+
+        if target.checkpoint:
+            target.checkpoint.commit(_post_last_id(batch[-1]))
+
+    # ---------------------------------------------------------
+    # SOURCE EDIT / DELETE → MINIMAL CHANGE IN TARGET (SYNC_EDITS)
+    # ---------------------------------------------------------
+    async def _sync(target, change):
+        use_id_map(target.ids)
+
+        try:
+            if isinstance(change, Edited):
+                if await sync_edit(change.msg, target):
+                    remember_edit(change.msg, target, edit_ts(change.msg))
+            elif isinstance(change, Deleted):
+                await sync_delete(change.ids, target)
+            else:
+                await sync_post(change, target)
+
+        except FloodWaitError as e:
+            _stop_on_flood(e)
+
+        except Exception:
+            logger.exception("❌ SYNC │ failed to apply source change")
+
+    def _already_sent(target, post) -> bool:
+        if target.done(post):
+            return True
+        # RESUME выключен / другой checkpoint — но пост уже есть в id map
+        return SYNC_EDITS and text_msg(post).id in target.ids
+
+    # ---------------------------------------------------------
+    # ONE POST → ONE TARGET (порядок внутри target сохраняется)
+    # ---------------------------------------------------------
+    async def _deliver(target, post):
+        use_id_map(target.ids)
+
+        if target.native is not None and can_forward_natively(post):
+            if not target.native.fits(post):
+                await _flush_native(target)
+            target.native.add(post)
+            return
+
+        # порядок: всё накопленное уходит раньше этого поста
+        await _flush_native(target)
+        if stop_requested():
+            return
+
+        use_id_map(target.ids)
+        await _send_post(target, post, album_counter)
+
+    # первый запуск live: граница «старое / новое» сразу в checkpoint —
+    # иначе без единого нового поста следующий запуск снова стал бы первым
+    # и потерял бы всё, что вышло между запусками
+    def _live_started(start_id: int):
+        for target in targets:
+            if target.checkpoint and not target.checkpoint.last_id:
+                target.checkpoint.commit(start_id)
+                target.checkpoint.save()
+
+    # =========================================================
+    # MAIN LOOP — ITERATE POSTS, NOT MESSAGES
+    # =========================================================
+    # lookahead: media следующих постов качаются, пока текущий отправляется
+    if current_job().mode == "live":
+        # catch-up после checkpoint, дальше — новые посты из событий
+        posts = iter_live_posts(
+            client,
+            source_chat,
+            source_topic_id=source_topic_id,
+            min_id=min_id,
+            on_start=_live_started,
+        )
+        if DEDUP:
+            posts = dedup.skip_duplicates(posts, targets)
+    else:
+        reader = None
+        if HISTORY_READAHEAD:
+            reader = HistoryReader(
+                max_messages=HISTORY_READAHEAD,
+                max_bytes=HISTORY_READAHEAD_MB * 1024 * 1024,
+            )
+
+        posts = iter_posts(
+            client,
+            source_chat,
+            post_id=source_post_id,
+            source_topic_id=source_topic_id,  # ← ДОБАВИЛИ
+            min_id=min_id,
+            pace=reader.pace if reader else None,
+        )
+
+        # страницы истории читаются в фоне, пока посты отправляются
+        if reader:
+            posts = reader.read(posts)
+
+        # дубли отсеиваются до prefetch — их media не качаются
+        if DEDUP:
+            posts = dedup.skip_duplicates(posts, targets)
+
+        # SYNC_EDITS: уже отправленным постам нужен только edit текста,
+        # их media не качаются
+        posts = prefetch_posts(
+            posts,
+            window=PREFETCH_POSTS,
+            max_bytes=PREFETCH_MAX_MB * 1024 * 1024,
+            needed=lambda post: not all(_already_sent(t, post) for t in targets),
+        )
+
+    try:
+        async with aclosing(posts):
+            async for post in posts:
+                # -------------------------------------------------
+                # LIVE: НОВЫХ ПОСТОВ ПОКА НЕТ
+                # -------------------------------------------------
+                # накопленный native-батч уходит сразу, не дожидаясь 100 постов
+                if post is None:
+                    for target in targets:
+                        await _flush_native(target)
+                        if target.checkpoint:
+                            target.checkpoint.save()
+                    if stop_requested():
+                        break
+                    continue
+
+                # -------------------------------------------------
+                # LIVE: ПРАВКА / УДАЛЕНИЕ В SOURCE
+                # -------------------------------------------------
+                if isinstance(post, (Edited, Deleted)):
+                    for target in targets:
+                        # пост мог ещё лежать в native-батче
+                        await _flush_native(target)
+                        await _sync(target, post)
+                    if stop_requested():
+                        break
+                    continue
+
+                # -------------------------------------------------
+                # STOP PREPARING SPINNER BEFORE FIRST REAL SEND
+                # -------------------------------------------------
+                if prep_task:
+                    prep_task.cancel()
+                    prep_finish()
+                    prep_task = None
+                    prep_finish = None
+
+                if isinstance(post, list):
+                    album_counter += 1
+
+                # первый target получает media через download + upload,
+                # следующие — по ссылке на уже залитый файл
+                for target in targets:
+                    if _already_sent(target, post):
+                        if SYNC_EDITS:
+                            await _sync(target, post)
+                        continue
+
+                    # то же содержимое уже есть в этом target (из другого
+                    # source / раньше в истории)
+                    if DEDUP:
+                        # копия ещё в native-батче — сначала отправляем его
+                        if target.native is not None and dedup.copy_pending(
+                            target.native.posts, post
+                        ):
+                            await _flush_native(target)
+                            if stop_requested():
+                                break
+                        if dedup.skip_in_target(target, post):
+                            continue
+
+                    await _deliver(target, post)
+                    if stop_requested():
+                        break
+
+                if stop_requested():
+                    break
+
+        # при остановке недосланный батч не отправляем: он не в checkpoint,
+        # следующий запуск начнёт с него
+        if not stop_requested():
+            for target in targets:
+                await _flush_native(target)
+
+        if stop_requested():
+            logger.warning("⏹ STOP │ stopped, progress saved")
+
+    finally:
+        if prep_task:
+            prep_task.cancel()
+            prep_finish()
+
+        store.flush()
+        edit_marks.flush()
+        album_targets.flush()
+        media_registry.flush()
+        fingerprints.flush()
+        for target in targets:
+            if target.checkpoint:
+                target.checkpoint.save()
+
+    if not stop_requested():
+        logger.info("🎉 FORWARD │ history completed")
+
+
+def _stop_on_flood(e: FloodWaitError) -> None:
+    """
+    FloodWait длиннее FLOOD_MAX_WAIT (короткие пережидает client сам):
+    пост не отмечается в checkpoint, задача мягко останавливается
+    (только эта — остальные JOBS продолжают) — следующий запуск
+    продолжит с него же.
+    """
+    logger.error(
+        f"🟥 FLOOD_WAIT │ Telegram требует подождать {e.seconds} секунд. "
+        f"Остановка, прогресс сохранён."
+    )
+    request_stop()
+
+
+def _mode_params(job) -> str:
+    """Параметры режима, от которых зависит набор постов (для ключа checkpoint)."""
+    if job.mode == "last_n":
+        return str(job.last_n)
+    if job.mode == "date_range":
+        return f"{job.date_from or ''}..{job.date_to or ''}"
+    return ""
+
+
+def _post_last_id(post) -> int:
+    if isinstance(post, list):
+        return max(m.id for m in post)
+    return post.id
+
+
+async def _forward_message(
+    msg,
+    public_cid,
+    target_chat,
+    target_topic_id=None,
+):
+    """
+    Одиночное сообщение (не альбом): reply/quote → финальный текст → handler.
+    """
+    if isinstance(msg, MessageService):
+        return
+
+    # -------------------------------------------------
+    # REPLY / QUOTE / ANCHOR
+    # -------------------------------------------------
+    reply_ctx, quote_text, quote_entities = await handle_reply(
+        msg,
+        public_cid,
+        target_chat,
+        target_topic_id=target_topic_id,  # ← ВАЖНО: прокидываем topic id
+    )
+
+    # -------------------------------------------------
+    # BUILD FINAL TEXT
+    # -------------------------------------------------
+    text_data = await build_final_text(
+        msg,
+        quote_text,
+        quote_entities,
+        client,
+    )
+
+    final_text = text_data["final_text"]
+    final_entities = text_data["final_entities"]
+
+    # -------------------------------------------------
+    # POLL
+    # -------------------------------------------------
+    if is_poll(msg):
+        await handle_poll(
+            msg,
+            final_text,
+            final_entities,
+            reply_ctx,  # ← было reply_new_id
+            target_chat,
+            target_topic_id=target_topic_id,
+        )
+        return
+
+    # -------------------------------------------------
+    # PAID CONTENT
+    # -------------------------------------------------
+    if is_paid(msg):
+        paid_result = await handle_paid(
+            msg,
+            final_text,
+            final_entities,
+            reply_ctx,  # ← было reply_new_id
+            target_chat,
+            target_topic_id=target_topic_id,
+        )
+        if paid_result is None:
+            return
+        msg = paid_result
+
+    kind = detect_media_kind(msg)
+
+    # -------------------------------------------------
+    # TEXT
+    # -------------------------------------------------
+    if kind == "TEXT":
+        await handle_text(
+            msg,
+            final_text,
+            final_entities,
+            reply_ctx,  # ← было reply_new_id
+            target_chat,
+            target_topic_id=target_topic_id,
+        )
+        return
+
+    # -------------------------------------------------
+    # WEB PREVIEW
+    # -------------------------------------------------
+    if is_web_preview(msg):
+        await handle_web_preview(
+            msg,
+            final_text,
+            final_entities,
+            reply_ctx,  # ← было reply_new_id
+            target_chat,
+            target_topic_id=target_topic_id,
+        )
+        return
+
+    # -------------------------------------------------
+    # STICKER
+    # -------------------------------------------------
+    if is_sticker(msg):
+        await handle_sticker(
+            msg,
+            final_text,
+            final_entities,
+            reply_ctx,  # ← было reply_new_id
+            target_chat,
+            target_topic_id=target_topic_id,
+        )
+        return
+
+    # -------------------------------------------------
+    # VOICE
+    # -------------------------------------------------
+    is_voice_flag, _ = is_voice(msg)
+    if is_voice_flag:
+        await handle_voice(
+            msg,
+            final_text,
+            final_entities,
+            reply_ctx,  # ← было reply_new_id
+            target_chat,
+            target_topic_id=target_topic_id,
+        )
+        return
+
+    # -------------------------------------------------
+    # PHOTO
+    # -------------------------------------------------
+    if kind == "PHOTO":
+        await handle_photo(
+            msg,
+            final_text,
+            final_entities,
+            reply_ctx,  # ← было reply_new_id
+            target_chat,
+            target_topic_id=target_topic_id,
+        )
+        return
+
+    # -------------------------------------------------
+    # VIDEO
+    # -------------------------------------------------
+    if kind == "VIDEO":
+        sent = await handle_video(
+            msg,
+            final_text,
+            final_entities,
+            reply_ctx,  # ← было reply_new_id
+            target_chat,
+            target_topic_id=target_topic_id,
+        )
+        if sent:
+            return
+
+    # -------------------------------------------------
+    # DOCUMENT
+    # -------------------------------------------------
+    if kind == "DOCUMENT":
+        await handle_document(
+            msg,
+            final_text,
+            final_entities,
+            reply_ctx,  # ← было reply_new_id
+            target_chat,
+            target_topic_id=target_topic_id,
+        )
+        return
+
+    # -------------------------------------------------
+    # OTHER
+    # -------------------------------------------------
+    await handle_other(
+        msg,
+        final_text,
+        final_entities,
+        reply_ctx,  # ← было reply_new_id
+        target_chat,
+        target_topic_id=target_topic_id,
+    )
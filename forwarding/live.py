@@ -0,0 +1,216 @@
+import asyncio
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, List, Optional, Set, Union
+
+from telethon import events, utils
+from telethon.tl.types import PeerChannel
+
+from config.settings import PREFETCH_MAX_MB, PREFETCH_POSTS, SYNC_EDITS
+from core.album_index import album_index
+from core.logger import logger
+from core.shutdown import stop_requested
+
+from forwarding.filters import Post, iter_posts
+from forwarding.prefetch import prefetch_posts
+
+# -------------------------------------------------
+# TUNING
+# -------------------------------------------------
+STOP_POLL = 1.0   # как часто ожидание событий проверяет stop_requested()
+
+
+@dataclass
+class Edited:
+    """Source-сообщение изменено (SYNC_EDITS)."""
+    msg: object
+
+
+@dataclass
+class Deleted:
+    """Source-сообщения удалены (SYNC_EDITS)."""
+    ids: List[int]
+
+
+LiveItem = Union[Post, Edited, Deleted]
+
+
+def _first_id(post: Post) -> int:
+    return min(m.id for m in post) if isinstance(post, list) else post.id
+
+
+def _last_id(post: Post) -> int:
+    return max(m.id for m in post) if isinstance(post, list) else post.id
+
+
+def _in_topic(msg, topic_id: Optional[int]) -> bool:
+    """Сообщение из нужной темы forum (topic_id=None — любое)."""
+    if not topic_id:
+        return True
+
+    reply_to = getattr(msg, "reply_to", None)
+    if not reply_to or not getattr(reply_to, "forum_topic", False):
+        return False
+
+    top = getattr(reply_to, "reply_to_top_id", None) or reply_to.reply_to_msg_id
+    return top == topic_id
+
+
+async def iter_live_posts(
+    client,
+    source_chat,
+    source_topic_id: Optional[int] = None,
+    min_id: Optional[int] = None,
+    on_start: Optional[Callable[[int], None]] = None,
+) -> AsyncIterator[Optional[LiveItem]]:
+    """
+    Поток постов режима live (бесконечный, до stop_requested()).
+
+    1) подписка на events.NewMessage / events.Album source-чата —
+       сразу, чтобы ничего не потерять, пока догоняем историю
+       (первый запуск: последний id source читается до подписки
+       и сразу уходит в on_start — checkpoint, чтобы следующий запуск
+       догнал всё, что выйдет после него)
+    2) catch-up: всё после min_id (последний отправленный пост)
+       обычным iter_posts; min_id=None — первый запуск, история не
+       пересылается, только новые посты
+    3) дальше — посты из событий, в порядке id
+
+    Пропуск в id канала (разрыв соединения, событие не дошло) добирается
+    iter_posts(min_id, max_id) — только недостающий кусок, без скана.
+    Пропуском считаются только id, которых не было ни в одном событии
+    чата: сообщения других тем forum его не создают.
+
+    SYNC_EDITS: правки и удаления source приходят в том же потоке
+    (Edited / Deleted), строго после поста, к которому относятся.
+
+    None в потоке — «новых постов пока нет»: потребителю пора отправить
+    накопленное (native-батч), а не ждать следующего поста.
+    """
+    peer_id = utils.get_peer_id(source_chat)
+
+    # id в канале / супергруппе идут подряд — по ним виден пропуск
+    sequential = isinstance(utils.get_peer(source_chat), PeerChannel)
+
+    queue: "asyncio.Queue[LiveItem]" = asyncio.Queue()
+
+    # id всех новых сообщений чата (любой темы) после last_id
+    seen: Set[int] = set()
+
+    async def _on_message(event):
+        msg = event.message
+        seen.add(msg.id)
+        if msg.grouped_id is None and _in_topic(msg, source_topic_id):
+            queue.put_nowait(msg)
+
+    async def _on_album(event):
+        msgs = sorted(event.messages, key=lambda m: m.id)
+        if msgs and _in_topic(msgs[0], source_topic_id):
+            queue.put_nowait(msgs)
+
+    async def _on_edit(event):
+        if _in_topic(event.message, source_topic_id):
+            queue.put_nowait(Edited(event.message))
+
+    async def _on_delete(event):
+        queue.put_nowait(Deleted(list(event.deleted_ids)))
+
+    handlers = [
+        (_on_message, events.NewMessage(chats=source_chat)),
+        (_on_album, events.Album(chats=source_chat)),
+    ]
+    if SYNC_EDITS:
+        handlers += [
+            (_on_edit, events.MessageEdited(chats=source_chat)),
+            (_on_delete, events.MessageDeleted(chats=source_chat)),
+        ]
+
+    # первый запуск: граница «старое / новое» — до подписки; пост, вышедший
+    # между ними, придёт событием (id больше) или доберётся по пропуску
+    if min_id is None:
+        latest = await client.get_messages(source_chat, limit=1)
+        start_id = latest[0].id if latest else 0
+        if on_start:
+            on_start(start_id)
+
+    for callback, event in handlers:
+        client.add_event_handler(callback, event)
+
+    def _has_gap(after: int, before: int) -> bool:
+        """Между after и before есть id, не пришедшие событием."""
+        between = sum(1 for i in seen if after < i < before)
+        return between < before - after - 1
+
+    def _history(after: int, before: Optional[int] = None):
+        return prefetch_posts(
+            iter_posts(
+                client,
+                source_chat,
+                source_topic_id=source_topic_id,
+                min_id=after,
+                max_id=before,
+            ),
+            window=PREFETCH_POSTS,
+            max_bytes=PREFETCH_MAX_MB * 1024 * 1024,
+        )
+
+    try:
+        # -------------------------------------------------
+        # CATCH-UP
+        # -------------------------------------------------
+        if min_id is None:
+            last_id = start_id
+        else:
+            last_id = min_id
+            logger.info(f"📡 LIVE │ catching up after message {last_id}")
+
+            async with aclosing(_history(last_id)) as posts:
+                async for post in posts:
+                    last_id = max(last_id, _last_id(post))
+                    yield post
+                    if stop_requested():
+                        return
+
+        logger.info("📡 LIVE │ listening for new posts")
+
+        # -------------------------------------------------
+        # EVENTS
+        # -------------------------------------------------
+        while not stop_requested():
+            if queue.empty():
+                yield None
+
+            try:
+                post = await asyncio.wait_for(queue.get(), STOP_POLL)
+            except asyncio.TimeoutError:
+                continue
+
+            if isinstance(post, (Edited, Deleted)):
+                yield post
+                continue
+
+            # уже отдан (catch-up / добор пропуска)
+            if _last_id(post) <= last_id:
+                continue
+
+            items = post if isinstance(post, list) else [post]
+            for m in items:
+                album_index.observe(peer_id, m)
+
+            # ---------- пропуск в id → добираем историей ----------
+            if sequential and _has_gap(last_id, _first_id(post)):
+                async with aclosing(_history(last_id, _first_id(post))) as posts:
+                    async for missed in posts:
+                        last_id = max(last_id, _last_id(missed))
+                        yield missed
+                        if stop_requested():
+                            return
+
+            last_id = max(last_id, _last_id(post))
+            seen.difference_update([i for i in seen if i <= last_id])
+            yield post
+
+    finally:
+        for callback, event in handlers:
+            client.remove_event_handler(callback, event)
+        album_index.flush()
@@ -1,17 +1,33 @@
+import os
+
 from core.client import client
+from core.logger import logger
 from utils.helpers import extract_msg
 from core.progress import make_progress
-
-from telethon.tl.functions.messages import SendMediaRequest, SendMessageRequest
+from core.transfer import upload_file
+from forwarding.reply_handler import ReplyCtx
+
+from telethon import utils
+from telethon.errors import BadRequestError
+from telethon.tl.functions.messages import (
+    SendMediaRequest,
+    SendMessageRequest,
+    SendMultiMediaRequest,
+    UploadMediaRequest,
+)
 from telethon.tl.types import (
     InputMediaUploadedPhoto,
     InputMediaUploadedDocument,
+    InputMediaPhoto,
+    InputMediaDocument,
     DocumentAttributeVideo,
     DocumentAttributeAudio,
     InputMediaPoll,
     Poll,
     PollAnswer,
     InputReplyToMessage,
+    InputSingleMedia,
+    UpdateMessageID,
 )
 
 
@@ -99,21 +115,48 @@ async def send_text(chat_id, text, entities, reply_ctx, link_preview=None):
 
 
 # ============================================================
-# SEND PHOTO (NO PROGRESS)
+# INTERNAL: SendMediaRequest WITH INLINE CAPTION
 # ============================================================
-async def send_photo(chat_id, path, original_name, caption, entities, reply_ctx, spoiler):
-    uploaded = await client.upload_file(
-        path,
-        file_name=original_name,
-    )
+# caption, который Telegram не принял вместе с media
+_CAPTION_ERRORS = {
+    "MEDIA_CAPTION_TOO_LONG",
+    "ENTITY_BOUNDS_INVALID",
+    "ENTITIES_TOO_LONG",
+}
 
-    media = InputMediaUploadedPhoto(
-        file=uploaded,
-        spoiler=spoiler,
-    )
 
+async def _send_media(chat_id, media, caption, entities, reply_ctx):
+    """
+    Media + caption + entities одним SendMediaRequest.
+
+    Fallback: если Telegram отверг именно caption — media уходит без
+    текста, а caption — отдельным сообщением reply ниже (как extra text
+    caption policy). Тот же caption через edit_message упал бы так же.
+    Entities не приняты и там — текст уходит без них; не удалось и это —
+    media всё равно отправлено, caption теряется с предупреждением.
+    """
     reply_to_obj = _build_reply_to_obj(reply_ctx)
 
+    try:
+        updates = await client(
+            SendMediaRequest(
+                peer=chat_id,
+                media=media,
+                message=caption or "",
+                entities=entities or None,
+                reply_to=reply_to_obj,
+            )
+        )
+        return await extract_msg(updates)
+
+    except BadRequestError as e:
+        if not caption or e.message not in _CAPTION_ERRORS:
+            raise
+
+        logger.warning(
+            f"⚠️ CAPTION │ rejected inline ({e.message}), sending it below the media"
+        )
+
     updates = await client(
         SendMediaRequest(
             peer=chat_id,
@@ -127,16 +170,115 @@ async def send_photo(chat_id, path, original_name, caption, entities, reply_ctx,
     if not msg:
         return None
 
-    await client.edit_message(
-        chat_id,
-        msg.id,
-        caption,
-        formatting_entities=entities,
+    below_ctx = ReplyCtx(
+        reply_to_msg_id=msg.id,
+        top_msg_id=getattr(reply_ctx, "top_msg_id", None),
     )
 
+    for text_entities in (entities or None, None):
+        try:
+            await send_text(chat_id, caption, text_entities, below_ctx)
+            return msg
+        except BadRequestError as e:
+            error = e.message
+            if not text_entities:
+                break
+
+    logger.warning(
+        f"⚠️ CAPTION │ text below failed ({error}), media sent without caption"
+    )
     return msg
 
 
+# ============================================================
+# SEND MEDIA BY REFERENCE (NO DOWNLOAD / UPLOAD)
+# ============================================================
+async def send_media_ref(chat_id, media, caption, entities, reply_ctx):
+    """
+    Отправка уже существующего на серверах файла
+    (InputMediaPhoto / InputMediaDocument) одним SendMediaRequest,
+    caption + entities сразу внутри запроса.
+    """
+    return await _send_media(chat_id, media, caption, entities, reply_ctx)
+
+
+# ============================================================
+# SEND ALBUM (ONE sendMultiMedia, CAPTION INLINE)
+# ============================================================
+async def upload_album_media(chat_id, media):
+    """
+    InputMediaUploadedPhoto / InputMediaUploadedDocument →
+    InputMediaPhoto / InputMediaDocument.
+
+    sendMultiMedia принимает только уже загруженные в чат media,
+    поэтому каждый элемент альбома сначала проходит messages.uploadMedia.
+    Ссылки (InputMediaPhoto / InputMediaDocument) возвращаются как есть.
+    """
+    if isinstance(media, (InputMediaPhoto, InputMediaDocument)):
+        return media
+
+    result = await client(UploadMediaRequest(peer=chat_id, media=media))
+    return utils.get_input_media(result)
+
+
+async def send_album(chat_id, media, caption, entities, reply_ctx):
+    """
+    Весь альбом одним messages.sendMultiMedia:
+    caption + entities сразу на первом элементе (без edit_message).
+
+    Возвращает id отправленных сообщений в порядке media
+    (None — если id элемента не пришёл в updates).
+    """
+    reply_to_obj = _build_reply_to_obj(reply_ctx)
+
+    random_ids = [
+        int.from_bytes(os.urandom(8), "big", signed=True)
+        for _ in media
+    ]
+
+    multi_media = [
+        InputSingleMedia(
+            media=m,
+            random_id=random_id,
+            message=caption if i == 0 else "",
+            entities=entities if i == 0 else None,
+        )
+        for i, (m, random_id) in enumerate(zip(media, random_ids))
+    ]
+
+    updates = await client(
+        SendMultiMediaRequest(
+            peer=chat_id,
+            multi_media=multi_media,
+            reply_to=reply_to_obj,
+        )
+    )
+
+    by_random = {
+        u.random_id: u.id
+        for u in getattr(updates, "updates", [])
+        if isinstance(u, UpdateMessageID)
+    }
+    return [by_random.get(r) for r in random_ids]
+
+
+# ============================================================
+# SEND PHOTO (NO PROGRESS)
+# ============================================================
+async def send_photo(chat_id, path, original_name, caption, entities, reply_ctx, spoiler):
+    uploaded = await upload_file(
+        path,
+        file_name=original_name,
+    )
+
+    media = InputMediaUploadedPhoto(
+        file=uploaded,
+        spoiler=spoiler,
+    )
+
+    return await _send_media(chat_id, media, caption, entities, reply_ctx)
+
+
 # ============================================================
 # SEND VIDEO (WITH UPLOAD PROGRESS)
 # ============================================================
@@ -150,20 +292,26 @@ async def send_video(
     spoiler,
     progress_callback=None,
     progress_prefix=None,
+    uploaded=None,
+    upload_key=None,
 ):
-    finish = None
-
-    if progress_callback is None and progress_prefix:
-        progress_callback, finish = make_progress(progress_prefix)
-
-    uploaded = await client.upload_file(
-        path,
-        file_name=original_name,
-        progress_callback=progress_callback,
-    )
+    # uploaded — уже залитый потоком InputFile (stream path), path не нужен
+    # upload_key — докачка большого файла по частям (core.transfer_state)
+    if uploaded is None:
+        finish = None
+
+        if progress_callback is None and progress_prefix:
+            progress_callback, finish = make_progress(progress_prefix)
+
+        uploaded = await upload_file(
+            path,
+            file_name=original_name,
+            progress_callback=progress_callback,
+            key=upload_key,
+        )
 
-    if finish:
-        finish()
+        if finish:
+            finish()
 
     media = InputMediaUploadedDocument(
         file=uploaded,
@@ -179,29 +327,7 @@ async def send_video(
         ],
     )
 
-    reply_to_obj = _build_reply_to_obj(reply_ctx)
-
-    updates = await client(
-        SendMediaRequest(
-            peer=chat_id,
-            media=media,
-            message="",
-            reply_to=reply_to_obj,
-        )
-    )
-
-    msg = await extract_msg(updates)
-    if not msg:
-        return None
-
-    await client.edit_message(
-        chat_id,
-        msg.id,
-        caption,
-        formatting_entities=entities,
-    )
-
-    return msg
+    return await _send_media(chat_id, media, caption, entities, reply_ctx)
 
 
 # ============================================================
@@ -216,11 +342,15 @@ async def send_voice(
     reply_ctx,
     spoiler,
     duration=1,
+    uploaded=None,
+    upload_key=None,
 ):
-    uploaded = await client.upload_file(
-        path,
-        file_name=original_name,
-    )
+    if uploaded is None:
+        uploaded = await upload_file(
+            path,
+            file_name=original_name,
+            key=upload_key,
+        )
 
     media = InputMediaUploadedDocument(
         file=uploaded,
@@ -234,29 +364,7 @@ async def send_voice(
         ],
     )
 
-    reply_to_obj = _build_reply_to_obj(reply_ctx)
-
-    updates = await client(
-        SendMediaRequest(
-            peer=chat_id,
-            media=media,
-            message="",
-            reply_to=reply_to_obj,
-        )
-    )
-
-    msg = await extract_msg(updates)
-    if not msg:
-        return None
-
-    await client.edit_message(
-        chat_id,
-        msg.id,
-        caption,
-        formatting_entities=entities,
-    )
-
-    return msg
+    return await _send_media(chat_id, media, caption, entities, reply_ctx)
 
 
 # ============================================================
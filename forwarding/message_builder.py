@@ -1,3 +1,4 @@
+from core.peer_cache import peer_cache
 from utils.entities import clone_entities
 from telethon.tl.types import (
     MessageEntityItalic,
@@ -20,15 +21,14 @@ async def get_forward_header(msg, client):
     if getattr(fwd, "from_name", None):
         name = fwd.from_name
     else:
-        try:
-            ent = await client.get_entity(fwd.from_id)
-            name = (
-                getattr(ent, "title", None)
-                or getattr(ent, "first_name", None)
-                or "Источник"
-            )
-        except Exception:
-            name = "Источник"
+        # обычно уже в peer_cache (entities пришли вместе со страницей истории)
+        info = None
+        if fwd.from_id is not None:
+            info = await peer_cache.get(fwd.from_id, client)
+
+        name = "Источник"
+        if info and (info.title or info.first_name):
+            name = info.title or info.first_name
 
     header_text = f"Переслано от {name}\n"
     header_entities = []
@@ -78,20 +78,17 @@ async def build_final_text(msg, quote_text, quote_entities, client):
     # ------------------------------------------------------------
     sender_part = ""
 
-    try:
-        chat = await msg.get_chat()
-        is_channel = getattr(chat, "broadcast", False)
-    except Exception:
-        is_channel = False
-
-    if not is_channel:
-        sender = await msg.get_sender()
-        if sender:
-            first = getattr(sender, "first_name", "") or ""
-            last = getattr(sender, "last_name", "") or ""
-            full_name = " ".join(x for x in (first, last) if x).strip()
-            if full_name:
-                sender_part = full_name
+    # chat / sender / источник пересылки — из entities самого сообщения,
+    # сеть только для peer, которых ещё не видели
+    peer_cache.remember_message(msg)
+
+    chat = await peer_cache.get(msg.peer_id, client)
+    is_channel = bool(chat and chat.broadcast)
+
+    if not is_channel and msg.sender_id:
+        sender = await peer_cache.get(msg.sender_id, client)
+        if sender and sender.full_name:
+            sender_part = sender.full_name
 
     # ------------------------------------------------------------
     # HEADER LINE (ITALIC)
@@ -0,0 +1,109 @@
+import os
+from typing import List
+
+from telethon.tl.functions.messages import ForwardMessagesRequest
+from telethon.tl.types import MessageService, UpdateMessageID
+
+from core.client import client
+from core.ids_map import id_map
+from core.logger import logger, tag
+
+from forwarding.filters import Post
+from forwarding.handlers.media_utils import is_paid, is_protected
+
+# messages.forwardMessages принимает не больше 100 id за раз
+MAX_BATCH = 100
+
+
+def _items(post: Post) -> list:
+    return post if isinstance(post, list) else [post]
+
+
+def can_forward_natively(post: Post) -> bool:
+    """
+    Можно ли отправить пост server-side forward'ом (drop_author).
+
+    Нет, если хоть одно сообщение поста:
+      - из защищённого источника (noforwards)
+      - сервисное
+      - reply / quote (нужна подмена reply_to и цитат → handlers)
+      - само переслано (нужен заголовок "Переслано от ..." → handlers)
+      - платное (stub / разлочка → handlers)
+    """
+    for m in _items(post):
+        if isinstance(m, MessageService):
+            return False
+        if is_protected(m) or is_paid(m):
+            return False
+        if m.reply_to or m.fwd_from:
+            return False
+    return True
+
+
+class NativeBatch:
+    """
+    Накопитель подряд идущих постов для одного ForwardMessagesRequest.
+
+    - альбом никогда не разрезается между запросами
+    - id новых сообщений берутся из UpdateMessageID (по random_id)
+      и пишутся в id map — replies последующих постов работают как обычно
+    """
+
+    def __init__(self, source_chat, target_chat, target_topic_id=None):
+        self.source_chat = source_chat
+        self.target_chat = target_chat
+        self.target_topic_id = target_topic_id
+        self.posts: List[Post] = []
+
+    @property
+    def size(self) -> int:
+        return sum(len(_items(p)) for p in self.posts)
+
+    def fits(self, post: Post) -> bool:
+        return self.size + len(_items(post)) <= MAX_BATCH
+
+    def add(self, post: Post) -> None:
+        self.posts.append(post)
+
+    def take(self) -> List[Post]:
+        posts, self.posts = self.posts, []
+        return posts
+
+    async def forward(self, posts: List[Post]) -> None:
+        """Один ForwardMessagesRequest на все сообщения posts."""
+        src_ids = [m.id for p in posts for m in _items(p)]
+        if not src_ids:
+            return
+
+        random_ids = [
+            int.from_bytes(os.urandom(8), "big", signed=True)
+            for _ in src_ids
+        ]
+        by_random = dict(zip(random_ids, src_ids))
+
+        # General (1) — это не настоящий топик, top_msg_id не нужен
+        top_msg_id = self.target_topic_id
+        if top_msg_id == 1:
+            top_msg_id = None
+
+        updates = await client(
+            ForwardMessagesRequest(
+                from_peer=self.source_chat,
+                id=src_ids,
+                to_peer=self.target_chat,
+                random_id=random_ids,
+                drop_author=True,
+                top_msg_id=top_msg_id,
+            )
+        )
+
+        mapped = 0
+        for u in getattr(updates, "updates", []):
+            if isinstance(u, UpdateMessageID) and u.random_id in by_random:
+                id_map[by_random[u.random_id]] = u.id
+                mapped += 1
+
+        logger.info(
+            f"{tag('BATCH', src_ids[0])} │ forwarded {len(src_ids)} messages "
+            f"(#{src_ids[0]}–#{src_ids[-1]}, {mapped} mapped)"
+        )
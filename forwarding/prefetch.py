@@ -0,0 +1,107 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, List, Optional
+
+from telethon.tl.types import Message
+
+from forwarding import downloader
+from forwarding.filters import Post
+
+
+@dataclass
+class _Slot:
+    post: Post
+    msgs: List[Message] = field(default_factory=list)  # что передаём заранее
+    size: int = 0
+    started: bool = False
+
+
+def _make_slot(post: Post, needed: Optional[Callable[[Post], bool]]) -> _Slot:
+    items = post if isinstance(post, list) else [post]
+    msgs = [m for m in items if downloader.needs_transfer(m)]
+    if msgs and needed is not None and not needed(post):
+        msgs = []
+    return _Slot(
+        post=post,
+        msgs=msgs,
+        size=sum(downloader.media_size(m) for m in msgs),
+    )
+
+
+async def prefetch_posts(
+    posts: AsyncIterator[Post],
+    window: int,
+    max_bytes: int,
+    needed: Optional[Callable[[Post], bool]] = None,
+) -> AsyncIterator[Post]:
+    """
+    Lookahead-окно поверх iter_posts.
+
+    - читает до `window` постов вперёд
+    - для них в фоне качает media на диск или сразу переливает потоком
+      в target (downloader.prefetch), пока текущий пост отправляется
+    - одновременно заранее скачано / качается не больше max_bytes
+      (пост, который один больше лимита, качается уже handler'ом, с progress)
+    - посты отдаются строго в исходном порядке; отправка остаётся
+      последовательной у потребителя (forward_history)
+    - needed(post) == False — пост отправлять не будут (уже есть во всех
+      targets), его media не передаются
+
+    Пройденный пост освобождает своё место в окне: невостребованные
+    загрузки отменяются, tmp-файлы удаляются.
+    Генератор нужно закрывать (contextlib.aclosing), чтобы при остановке
+    не остались висящие загрузки.
+    """
+
+    if window <= 0:
+        async for post in posts:
+            yield post
+        return
+
+    buf: "deque[_Slot]" = deque()
+    in_flight = 0
+    exhausted = False
+
+    def _start_fitting():
+        nonlocal in_flight
+        for slot in buf:
+            if slot.started or not slot.msgs:
+                continue
+            if slot.size > max_bytes:
+                continue
+            if in_flight + slot.size > max_bytes:
+                break  # порядок важнее: не обгоняем пост, который не влез
+            for m in slot.msgs:
+                downloader.prefetch(m)
+            slot.started = True
+            in_flight += slot.size
+
+    def _release(slot: _Slot):
+        nonlocal in_flight
+        for m in slot.msgs:
+            downloader.discard(m)
+        if slot.started:
+            in_flight -= slot.size
+
+    try:
+        while True:
+            while not exhausted and len(buf) <= window:
+                try:
+                    buf.append(_make_slot(await posts.__anext__(), needed))
+                except StopAsyncIteration:
+                    exhausted = True
+
+            if not buf:
+                return
+
+            _start_fitting()
+
+            slot = buf.popleft()
+            try:
+                yield slot.post
+            finally:
+                _release(slot)
+
+    finally:
+        while buf:
+            _release(buf.popleft())
@@ -0,0 +1,144 @@
+import asyncio
+import time
+from typing import AsyncIterator, Optional
+
+from forwarding.filters import Post
+
+# -------------------------------------------------
+# TUNING
+# -------------------------------------------------
+PAGE_SIZE = 100            # сообщений в странице истории (максимум Telegram)
+MESSAGE_OVERHEAD = 2048    # примерный размер Message в памяти без текста, байт
+MAX_PAGE_WAIT = 2.0        # дольше между страницами не ждём, s
+SMOOTHING = 0.2            # вес нового замера в скорости потребителя
+
+_DONE = object()
+
+
+def _items(post: Post) -> list:
+    return post if isinstance(post, list) else [post]
+
+
+def _post_bytes(post: Post) -> int:
+    return sum(
+        MESSAGE_OVERHEAD + 2 * len(getattr(m, "message", None) or "")
+        for m in _items(post)
+    )
+
+
+class HistoryReader:
+    """
+    Фоновое чтение истории в ограниченную очередь.
+
+    Producer-task крутит iter_posts (страницы истории, сборка альбомов)
+    и складывает готовые посты в очередь, пока в ней не больше
+    max_messages сообщений и max_bytes байт. Потребитель (forward_history)
+    берёт посты из очереди и на RPC истории не ждёт, пока producer
+    успевает.
+
+    pace() — wait_time для следующей страницы (iter_posts отдаёт его
+    telethon): пока очередь заполнена меньше чем наполовину — 0,
+    дальше — по скорости потребителя, чтобы не тратить бюджет
+    history-запросов (общий с другими JOBS) раньше, чем он нужен.
+    """
+
+    def __init__(self, max_messages: int, max_bytes: int):
+        self.max_messages = max(1, max_messages)
+        self.max_bytes = max(1, max_bytes)
+
+        self._queue: "asyncio.Queue" = asyncio.Queue()
+        self._space = asyncio.Condition()
+        self._messages = 0
+        self._bytes = 0
+
+        self._per_message: Optional[float] = None   # s на сообщение у потребителя
+        self._last_take: Optional[float] = None
+
+    # ---------------------------------------------
+    # PACING
+    # ---------------------------------------------
+    def pace(self) -> float:
+        if self._per_message is None or self._messages < self.max_messages // 2:
+            return 0.0
+        return min(MAX_PAGE_WAIT, self._per_message * PAGE_SIZE / 2)
+
+    def _observe_take(self, count: int) -> None:
+        now = time.monotonic()
+        if self._last_take is not None and count:
+            sample = (now - self._last_take) / count
+            if self._per_message is None:
+                self._per_message = sample
+            else:
+                self._per_message += SMOOTHING * (sample - self._per_message)
+        self._last_take = now
+
+    # ---------------------------------------------
+    # PRODUCER
+    # ---------------------------------------------
+    def _full(self) -> bool:
+        return self._messages >= self.max_messages or self._bytes >= self.max_bytes
+
+    async def _produce(self, posts: AsyncIterator[Post]) -> None:
+        try:
+            async for post in posts:
+                size = _post_bytes(post)
+                count = len(_items(post))
+
+                async with self._space:
+                    # пустая очередь принимает пост любого размера
+                    await self._space.wait_for(
+                        lambda: not self._full() or self._queue.empty()
+                    )
+                    self._messages += count
+                    self._bytes += size
+
+                self._queue.put_nowait((post, count, size))
+
+            self._queue.put_nowait((_DONE, 0, 0))
+
+        except asyncio.CancelledError:
+            raise
+
+        except BaseException as e:
+            # ошибка чтения истории — потребителю, как при обычной итерации
+            self._queue.put_nowait((e, 0, 0))
+
+        finally:
+            aclose = getattr(posts, "aclose", None)
+            if aclose:
+                await aclose()
+
+    # ---------------------------------------------
+    # CONSUMER
+    # ---------------------------------------------
+    async def read(self, posts: AsyncIterator[Post]) -> AsyncIterator[Post]:
+        """
+        Посты из posts в том же порядке, прочитанные заранее.
+        Генератор нужно закрывать (contextlib.aclosing): producer
+        останавливается вместе с ним.
+        """
+        producer = asyncio.create_task(self._produce(posts))
+
+        try:
+            while True:
+                post, count, size = await self._queue.get()
+
+                if post is _DONE:
+                    return
+                if isinstance(post, BaseException):
+                    raise post
+
+                async with self._space:
+                    self._messages -= count
+                    self._bytes -= size
+                    self._space.notify_all()
+
+                self._observe_take(count)
+                yield post
+
+        finally:
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
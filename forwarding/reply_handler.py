@@ -4,7 +4,7 @@ from dataclasses import dataclass
 from typing import Optional, Tuple, List
 
 from core.ids_map import id_map
-from config.settings import FORWARD_MODE
+from core.job import current_job
 
 from telethon.tl.types import (
     MessageEntityBlockquote,
@@ -164,7 +164,7 @@ async def handle_reply(
     # ---------------------------------------------
     # 2.2 ОРИГИНАЛ ВНЕ ДИАПАЗОНА → FALLBACK
     # ---------------------------------------------
-    if FORWARD_MODE != "all":
+    if current_job().mode != "all":
         # Ответ на anchor в том же чате/топике.
         reply_ctx.reply_to_msg_id = await get_or_create_anchor(
             target_chat,
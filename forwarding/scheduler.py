@@ -0,0 +1,89 @@
+import asyncio
+
+from config.settings import JOB_CONCURRENCY
+from core.job import JobOptions, bind_job
+from core.logger import logger
+from core.shutdown import bind_job_stop, stop_requested
+
+from forwarding.history_forwarder import forward_history
+from utils.resolve import resolve_source, resolve_target
+
+
+def job_targets(job: dict) -> list:
+    """"targets" (список) или "target" (одна ссылка) записи JOBS."""
+    if job.get("targets"):
+        return list(job["targets"])
+    return [job["target"]]
+
+
+def job_options(job: dict) -> JobOptions:
+    """Режим задачи: поля записи JOBS поверх глобальных settings."""
+    return JobOptions.from_settings(
+        mode=job.get("mode"),
+        strategy=job.get("strategy"),
+        last_n=job.get("last_n"),
+        date_from=job.get("date_from"),
+        date_to=job.get("date_to"),
+    )
+
+
+async def _run_job(job: dict) -> None:
+    """
+    Одна задача SOURCE → TARGET(S), в своей asyncio task:
+    id map, checkpoint, режим и остановка (долгий FloodWait)
+    привязаны к её контексту.
+    """
+    bind_job(job_options(job))
+    bind_job_stop()
+
+    source_entity, source_post_id, source_topic_id = await resolve_source(job["source"])
+    targets = [
+        await resolve_target(target)
+        for target in job_targets(job)
+    ]
+
+    await forward_history(
+        source_chat=source_entity,
+        source_post_id=source_post_id,
+        source_topic_id=source_topic_id,
+        targets=targets,
+    )
+
+
+async def run_jobs(jobs: list) -> None:
+    """
+    Выполняет задачи одновременно на одном client.
+
+    - не больше JOB_CONCURRENCY задач за раз, остальные ждут очереди
+    - общий бюджет запросов и FloodWait — в core.ratelimit: token
+      buckets общие для всех задач и раздают токены по очереди
+    - внутри задачи посты идут строго по порядку
+    - ошибка одной задачи логируется и не останавливает остальные
+      (единственная задача — пробрасывается, как раньше)
+    """
+    semaphore = asyncio.Semaphore(JOB_CONCURRENCY)
+
+    async def _slot(job_no: int, job: dict) -> None:
+        async with semaphore:
+            if stop_requested():
+                return
+
+            if len(jobs) > 1:
+                logger.info(f"🧩 JOB │ #{job_no} {job['source']} started")
+
+            try:
+                await _run_job(job)
+            except Exception:
+                if len(jobs) == 1:
+                    raise
+                logger.exception(f"❌ JOB │ #{job_no} {job['source']} failed")
+                return
+
+            if len(jobs) > 1 and not stop_requested():
+                logger.info(f"🧩 JOB │ #{job_no} {job['source']} done")
+
+    # каждая задача — своя asyncio task (свой контекст id_map / job)
+    await asyncio.gather(*(
+        asyncio.create_task(_slot(job_no, job))
+        for job_no, job in enumerate(jobs, start=1)
+    ))
@@ -0,0 +1,194 @@
+from datetime import timezone
+from typing import Iterable
+
+from telethon.errors import FloodWaitError, MessageNotModifiedError, RPCError
+
+from core.album_targets import album_targets
+from core.client import client
+from core.edit_marks import edit_marks
+from core.logger import logger
+
+from forwarding import dedup
+from forwarding.filters import Post
+from forwarding.message_builder import build_final_text
+from forwarding.reply_handler import handle_reply
+from forwarding.handlers.media_utils import detect_media_kind
+from forwarding.handlers.text import TEXT_LIMIT
+
+from utils.caption_policy import apply_caption_policy
+
+
+# ============================================================
+# HELPERS
+# ============================================================
+def _items(post: Post) -> list:
+    return post if isinstance(post, list) else [post]
+
+
+def text_msg(post: Post):
+    """Сообщение поста, чей текст стоит в target (у альбома — с caption)."""
+    items = sorted(_items(post), key=lambda m: m.id)
+    return next((m for m in items if m.message), items[-1])
+
+
+def edit_ts(post: Post) -> int:
+    """Последний edit_date поста (unix time, 0 — не правился)."""
+    stamps = [
+        int(m.edit_date.replace(tzinfo=m.edit_date.tzinfo or timezone.utc).timestamp())
+        for m in _items(post)
+        if getattr(m, "edit_date", None)
+    ]
+    return max(stamps, default=0)
+
+
+def remember_sent(post: Post, target, native: bool = False) -> None:
+    """Пост ушёл в target — запоминаем, какую версию отправили и как."""
+    edit_marks.put(target.ids.scope, text_msg(post).id, edit_ts(post), native)
+
+
+def remember_edit(msg, target, stamp: int) -> None:
+    """Edit применён в target — новая версия, способ отправки прежний."""
+    scope = target.ids.scope
+    edit_marks.put(scope, msg.id, stamp, edit_marks.native(scope, msg.id))
+
+
+# ============================================================
+# EDIT
+# ============================================================
+async def _text_data(msg, target) -> dict:
+    """Текст поста так же, как при copy-отправке: заголовок + цитата."""
+    _, quote_text, quote_entities = await handle_reply(
+        msg,
+        target.public_cid,
+        target.chat,
+        target_topic_id=target.topic_id,
+    )
+    return await build_final_text(msg, quote_text, quote_entities, client)
+
+
+async def sync_edit(msg, target) -> bool:
+    """
+    Переносит текст изменённого source-сообщения в target одним edit:
+    текст собирается заново тем же build_final_text (заголовок, цитата),
+    media не трогаем. Пост, ушедший server-side forward'ом, заголовка
+    не имел — ему текст source как есть.
+
+    Возвращает True, если target теперь совпадает с source.
+    """
+    target_id = target.ids.get(msg.id)
+    if not target_id:
+        return False
+
+    # элемент альбома без текста: caption альбома живёт не в нём
+    if getattr(msg, "grouped_id", None) and not msg.message:
+        return False
+
+    if edit_marks.native(target.ids.scope, msg.id):
+        text, entities = msg.message or "", msg.entities
+
+    elif detect_media_kind(msg) in ("TEXT", "WEB"):
+        text_data = await _text_data(msg, target)
+        text, entities = text_data["final_text"], text_data["final_entities"]
+
+        if len(text) > TEXT_LIMIT:
+            logger.warning(
+                f"✏️ EDIT │ {msg.id}: text is split into several messages "
+                f"in target, not synced"
+            )
+            return False
+    else:
+        text_data = await _text_data(msg, target)
+        text, entities, extra_text, _ = apply_caption_policy(text_data)
+
+        if extra_text:
+            logger.warning(
+                f"✏️ EDIT │ {msg.id}: text is sent below the media "
+                f"in target, not synced"
+            )
+            return False
+
+    try:
+        await client.edit_message(
+            target.chat,
+            target_id,
+            text,
+            formatting_entities=entities,
+            link_preview=detect_media_kind(msg) == "WEB",
+        )
+
+    except MessageNotModifiedError:
+        return True
+
+    except FloodWaitError:
+        raise
+
+    except RPCError as e:
+        logger.warning(
+            f"✏️ EDIT │ {msg.id} → {target_id}: edit failed ({e.__class__.__name__})"
+        )
+        return False
+
+    logger.info(f"✏️ EDIT │ {msg.id} → {target_id}: updated")
+    return True
+
+
+async def sync_post(post: Post, target) -> None:
+    """
+    Batch (SYNC_EDITS): пост уже есть в target — правим, только если
+    source менялся после того, как мы его отправили / поправили.
+    """
+    stamp = edit_ts(post)
+    msg = text_msg(post)
+
+    if stamp <= edit_marks.get(target.ids.scope, msg.id):
+        return
+
+    if await sync_edit(msg, target):
+        remember_edit(msg, target, stamp)
+
+
+# ============================================================
+# DELETE
+# ============================================================
+async def sync_delete(source_ids: Iterable[int], target) -> None:
+    """
+    Удаляет в target то, что удалено в source.
+
+    Элементы альбома ведут на его первое сообщение target — альбом
+    (все его сообщения в target) удаляется, только когда удалены все
+    source-сообщения, которые на него ведут.
+    """
+    deleted = set(source_ids)
+    first_ids = set()
+
+    for source_id in deleted:
+        target_id = target.ids.get(source_id)
+        if target_id and set(target.ids.sources_of(target_id)) <= deleted:
+            first_ids.add(target_id)
+
+    if not first_ids:
+        return
+
+    scope = target.ids.scope
+    target_ids = {
+        mid for first_id in first_ids for mid in album_targets.get(scope, first_id)
+    }
+
+    try:
+        await client.delete_messages(target.chat, sorted(target_ids))
+
+    except FloodWaitError:
+        raise
+
+    except RPCError as e:
+        logger.warning(
+            f"🗑 DELETE │ {sorted(target_ids)}: delete failed ({e.__class__.__name__})"
+        )
+        return
+
+    for first_id in first_ids:
+        album_targets.forget(scope, first_id)
+    # то же содержимое из source снова можно отправить
+    dedup.forget(target, target_ids)
+
+    logger.info(f"🗑 DELETE │ {sorted(deleted)} → {sorted(target_ids)}")
@@ -1,27 +1,28 @@
 import asyncio
 
 from core.client import client
-from forwarding.history_forwarder import forward_history
+from core.shutdown import install_signal_handlers
+from core.takeout import takeout_session
+from forwarding.scheduler import run_jobs
 
-from config.settings import SOURCE, TARGET
+from config.settings import JOBS, SOURCE, TARGET, TARGETS
 from config.validate_settings import validate_settings
-from utils.resolve import resolve_source, resolve_target
 
 
 async def main():
     validate_settings()
 
     async with client:
-        source_entity, source_post_id, source_topic_id = await resolve_source(SOURCE)  # ← ИЗМЕНИЛИ
-        target_entity, target_topic_id = await resolve_target(TARGET)
-
-        await forward_history(
-            source_chat=source_entity,
-            target_chat=target_entity,
-            source_post_id=source_post_id,
-            target_topic_id=target_topic_id,
-            source_topic_id=source_topic_id,  # ← ДОБАВИЛИ
-        )
+        # после логина: Ctrl-C на вводе кода должен работать как обычно
+        install_signal_handlers()
+
+        # JOBS (если задан) — много задач в одном процессе на одном client;
+        # иначе одна задача SOURCE → TARGET / TARGETS
+        jobs = JOBS or [{"source": SOURCE, "targets": TARGETS or [TARGET]}]
+
+        # TAKEOUT (если включён) — на все задачи сразу
+        async with takeout_session(client):
+            await run_jobs(jobs)
 
 
 if __name__ == "__main__":
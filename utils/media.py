@@ -1,11 +1,30 @@
 import os
+import asyncio
 import imghdr
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
+from typing import Optional, Tuple
 from PIL import Image
 from telethon.tl.types import DocumentAttributeVideo
 
 
 from config.settings import DOWNLOAD_DIR
+from core.logger import logger
+
+
+# ============================================================
+# TUNING
+# ============================================================
+
+IMAGE_WORKERS = max(1, min(4, os.cpu_count() or 1))   # процессов для Pillow
+IMAGE_QUEUE = IMAGE_WORKERS * 2                        # картинок в работе одновременно
+
+# JPEG, который Telegram примет как фото без перекодирования
+PHOTO_MAX_BYTES = 10 * 1024 * 1024
+PHOTO_MAX_SIDES = 10_000     # width + height
+PHOTO_MAX_RATIO = 20
 
 
 # ============================================================
@@ -49,27 +68,169 @@ def cleanup_file(path: str):
 # IMAGE
 # ============================================================
 
-def prepare_image_file(path: str, original_name: str) -> PreparedMedia:
+def _reencode_jpeg(path: str, final_path: str) -> Optional[str]:
     """
-    Приводит изображение к JPEG и сохраняет
-    без .jpg.jpg
+    Pillow: decode → RGB → JPEG. Работает в процессе пула — вместо
+    логирования возвращает текст ошибки (None — получилось).
     """
+    try:
+        img = Image.open(path)
+        img.convert("RGB").save(final_path, "JPEG", quality=95)
+    except Exception as e:
+        return str(e) or e.__class__.__name__
 
-    base_name, _ = os.path.splitext(original_name)
+    return None
+
+
+# SOF0 / SOF1 / SOF2: baseline / extended / progressive Huffman
+_JPEG_SOF = {0xC0, 0xC1, 0xC2}
+# остальные SOF (lossless, arithmetic) — Telegram их не покажет
+_JPEG_SOF_OTHER = {0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _jpeg_header(path: str) -> Optional[Tuple[int, int, int]]:
+    """
+    (width, height, components) из заголовка JPEG — без декодирования.
+    None — не JPEG или JPEG, который лучше перекодировать.
+    """
+    with open(path, "rb") as f:
+        if f.read(2) != b"\xff\xd8":
+            return None
+
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+
+            code = marker[1]
+            while code == 0xFF:          # fill bytes
+                byte = f.read(1)
+                if not byte:
+                    return None
+                code = byte[0]
+
+            if code == 0x01 or 0xD0 <= code <= 0xD8:
+                continue                 # маркеры без длины
+            if code in (0xD9, 0xDA) or code in _JPEG_SOF_OTHER:
+                return None              # EOI / SOS раньше SOF
+
+            length = int.from_bytes(f.read(2), "big")
+            if length < 2:
+                return None
+
+            if code in _JPEG_SOF:
+                data = f.read(6)         # precision, height, width, components
+                if len(data) < 6:
+                    return None
+                height = int.from_bytes(data[1:3], "big")
+                width = int.from_bytes(data[3:5], "big")
+                return width, height, data[5]
+
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def is_sendable_jpeg(path: str) -> bool:
+    """JPEG уже годится как фото Telegram — перекодировать незачем."""
+    try:
+        if os.path.getsize(path) > PHOTO_MAX_BYTES:
+            return False
+        header = _jpeg_header(path)
+    except OSError:
+        return False
+
+    if header is None:
+        return False
+
+    width, height, components = header
+    if components not in (1, 3) or not width or not height:
+        return False
+    if width + height > PHOTO_MAX_SIDES:
+        return False
+    return max(width, height) / min(width, height) <= PHOTO_MAX_RATIO
+
+
+_image_pool: Optional[ProcessPoolExecutor] = None
+_image_slots: Optional[asyncio.Semaphore] = None
+
+
+async def prepare_image(path: str, original_name: str) -> PreparedMedia:
+    """
+    Приводит изображение к JPEG (без .jpg.jpg), не блокируя event loop.
+
+    - JPEG, который Telegram и так примет (проверяется только заголовок),
+      уходит как есть: без потери качества и лишних байт
+    - остальное перекодирует Pillow в пуле процессов (IMAGE_WORKERS);
+      в работе не больше IMAGE_QUEUE картинок, следующие ждут
+    - файл, ушедший без перекодирования (в т.ч. если Pillow не справился),
+      переименовывается в <имя>.jpg, как и перекодированный
+    """
+    global _image_pool, _image_slots
 
+    base_name, _ = os.path.splitext(original_name)
     final_path = generate_unique_path(base_name, ".jpg")
 
+    if is_sendable_jpeg(path):
+        os.rename(path, final_path)
+        return PreparedMedia(path=final_path, original_name=original_name)
+
+    # занимаем имя сразу: параллельная картинка не выберет тот же путь
+    open(final_path, "wb").close()
+
+    if _image_slots is None:
+        _image_slots = asyncio.Semaphore(IMAGE_QUEUE)
+
     try:
-        img = Image.open(path)
-        img.convert("RGB").save(final_path, "JPEG", quality=95)
-    except Exception as e:
-        print("⚠ image convert error:", e)
-        final_path = path
+        async with _image_slots:
+            if _image_pool is None:
+                # spawn, не fork: форк процесса с живым event loop и потоками
+                # (telethon, sqlite) может зависнуть на чужой блокировке
+                _image_pool = ProcessPoolExecutor(
+                    max_workers=IMAGE_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
 
-    return PreparedMedia(
-        path=final_path,
-        original_name=original_name
-    )
+            try:
+                error = await _run_reencode(_image_pool, path, final_path)
+            except BrokenProcessPool:
+                # процесс пула умер — пул пересоздаётся, эта картинка — в потоке
+                _image_pool = None
+                error = await _run_reencode(None, path, final_path)
+
+            if error:
+                logger.warning(f"⚠️ IMAGE │ convert failed ({error}), sending as is")
+                os.replace(path, final_path)
+
+    except BaseException:
+        # отмена (стоп, discard) в очереди или во время перекодирования:
+        # пустой / недописанный final_path не должен остаться в downloads/
+        cleanup_file(final_path)
+        raise
+
+    return PreparedMedia(path=final_path, original_name=original_name)
+
+
+async def _run_reencode(pool, path: str, final_path: str) -> Optional[str]:
+    """
+    _reencode_jpeg в pool (None — в потоке). Отмену ждущего не видит
+    уже начатая работа: она допишет final_path, поэтому после неё
+    файл тоже удаляем.
+    """
+    loop = asyncio.get_running_loop()
+    if pool is None:
+        future = loop.run_in_executor(None, _reencode_jpeg, path, final_path)
+    else:
+        future = asyncio.wrap_future(pool.submit(_reencode_jpeg, path, final_path))
+
+    def _cleanup(f: asyncio.Future):
+        if not f.cancelled():
+            f.exception()  # результат уже не нужен, но помечаем прочитанным
+        cleanup_file(final_path)
+
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        future.add_done_callback(_cleanup)
+        raise
 
 
 # ============================================================